@@ -0,0 +1,729 @@
+# Benchmarks for the stages of the redirect generation pipeline
+#
+# Usage: python benchmark.py <benchmark> [--lines N] [--jobs N]
+import argparse
+import functools
+import json
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    ACCESS_COUNT,
+    REQUEST_METHOD,
+    REQUEST_REFERER,
+    REQUEST_TIMESTAMP,
+    REQUEST_URI,
+    REQUEST_URI_CANONICAL,
+    REQUEST_USER_AGENT,
+    RESPONSE_STATUS,
+    TIME_LOCAL_FORMAT,
+)
+from generate_redirects import (
+    CANONICALIZATION_RULES,
+    DEFAULT_RULES,
+    TRANSFORMATION_RULES,
+    aggregate_by_request_uri,
+    apply_canonicalization,
+    apply_default_redirects,
+    apply_hugo_urls_and_aliases,
+    apply_transformation,
+    canonicalize_uris,
+    clean_uris,
+    default_redirect_uris,
+    finalize_redirects,
+    get_recent_frequent_redirects,
+    split_uris,
+    transform_uris,
+)
+from lib import convert_access_log_types, copy_on_write_option
+from hyperloglog import HyperLogLog, precision_for_error
+import log_format
+import process_access_log
+from process_access_log import (
+    access_log_dataframe,
+    iter_log_entries,
+    log_state_columns,
+    process_log_file,
+    time_local_seconds,
+)
+from redirects_resolver import RedirectsResolver, compile_source
+import rule_cache
+from rule_cache import RuleCache, apply_rules_cached
+from rules import (
+    compile_first_match_rules,
+    compile_rewrite_rules,
+    rewrite_uris,
+    rewrite_uris_first_match,
+)
+
+SYNTHETIC_PATHS = [
+    "/about/",
+    "/articles/2011/02/18/time-machine-volume-uuid",
+    "/articles/os-x-lion/",
+    "/hints/macosx/server/",
+    "/publications/dissertation",
+    "/tags/time-machine/",
+    "/wp-admin/setup-config.php",
+    "/index.php?option=com_content",
+] + [f"/articles/article-{i}/" for i in range(1000)]
+
+SYNTHETIC_USER_AGENTS = [
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "curl/8.4.0",
+]
+
+
+SYNTHETIC_URI_TEMPLATES = [
+    "/articles/2011/02/18/article-{i}",
+    "/articles/article-{i}/index.html",
+    "/Page(/articles/article-{i}/_index.md)",
+    "/tags/tag_{i}/page/2/",
+    "/hints/macosx_{i}",
+    "/research/publication-{i}.pdf",
+    "/articles/article-{i}/atom.xml",
+    "/articles/article-{i}/",
+]
+
+
+def synthetic_uris(count, seed=0):
+    # Distinct URIs, as URIs are unique once aggregated by `aggregate_by_request_uri`
+    rng = random.Random(seed)
+    return pd.Series(
+        [rng.choice(SYNTHETIC_URI_TEMPLATES).format(i=i) for i in range(count)]
+    )
+
+
+def write_synthetic_log(file_path, lines, seed=0):
+    # Write an access log in nginx combined format with `lines` lines
+    rng = random.Random(seed)
+    with open(file_path, "w", encoding="utf-8") as file:
+        for index in range(lines):
+            remote_addr = f"198.51.{rng.randrange(256)}.{rng.randrange(256)}"
+            second = index % 60
+            file.write(
+                f"{remote_addr} - - [18/Feb/2011:10:{index // 60 % 60:02d}:{second:02d} +0100] "
+                f'"GET {rng.choice(SYNTHETIC_PATHS)} HTTP/1.1" 200 {rng.randrange(100000)} '
+                f'"-" "{rng.choice(SYNTHETIC_USER_AGENTS)}"\n'
+            )
+
+
+def write_synthetic_json_log(file_path, lines, seed=0):
+    # Write the same access log as `write_synthetic_log` in JSON lines with the keys
+    # of `LOG_FORMAT_COMBINED_JSON`
+    rng = random.Random(seed)
+    with open(file_path, "w", encoding="utf-8") as file:
+        for index in range(lines):
+            remote_addr = f"198.51.{rng.randrange(256)}.{rng.randrange(256)}"
+            second = index % 60
+            entry = {
+                "remote_addr": remote_addr,
+                "remote_user": "-",
+                "time_local": f"18/Feb/2011:10:{index // 60 % 60:02d}:{second:02d} +0100",
+                "request": f"GET {rng.choice(SYNTHETIC_PATHS)} HTTP/1.1",
+                "status": "200",
+                "body_bytes_sent": str(rng.randrange(100000)),
+                "http_referer": "-",
+                "http_user_agent": rng.choice(SYNTHETIC_USER_AGENTS),
+            }
+            file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def timed(label, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s")
+    return result, elapsed
+
+
+def benchmark_parse(args):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file = Path(temp_dir) / "access.log"
+        write_synthetic_log(log_file, args.lines)
+        print(f"Parsing {args.lines} lines ({log_file.stat().st_size >> 20} MiB)")
+
+        _, elapsed_serial = timed(
+            "process_log_file (1 process)", process_log_file, log_file
+        )
+        _, elapsed_parallel = timed(
+            f"process_log_file ({args.jobs} processes)",
+            process_log_file,
+            log_file,
+            args.jobs,
+        )
+        print(f"Speedup: {elapsed_serial / elapsed_parallel:.2f}")
+
+
+# Regular expression `iter_log_entries` searched each line with before log lines were
+# matched from their beginning and log formats were configurable
+log_pattern = re.compile(
+    r'(\d+\.\d+\.\d+\.\d+) - (\S+) \[(.*?)\] "(GET|POST|PUT|DELETE|HEAD) (\S+) HTTP/\d\.\d" (\d{3}) (\d+) "(.*?)" "(.*?)"'
+)
+
+
+def iter_log_entries_search(lines):
+    # Implementation of `iter_log_entries` before lines were matched from their beginning
+    for line in lines:
+        match = log_pattern.search(line)
+        if match:
+            yield match.groups()
+
+
+def count_log_entries(log_file, iter_entries):
+    with open(log_file, "r", encoding="utf-8") as file:
+        return sum(1 for _ in iter_entries(file))
+
+
+def benchmark_tokenize(args):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file = Path(temp_dir) / "access.log"
+        write_synthetic_log(log_file, args.lines)
+        print(f"Tokenizing {args.lines} lines ({log_file.stat().st_size >> 20} MiB)")
+
+        # Read the file once so that both runs read it from the page cache
+        count_log_entries(log_file, iter)
+        entries_search, elapsed_search = timed(
+            "log_pattern.search", count_log_entries, log_file, iter_log_entries_search
+        )
+        entries, elapsed = timed(
+            "iter_log_entries", count_log_entries, log_file, iter_log_entries
+        )
+        assert entries == entries_search == args.lines
+        print(f"log_pattern.search: {args.lines / elapsed_search:,.0f} lines/s")
+        print(f"iter_log_entries:   {args.lines / elapsed:,.0f} lines/s")
+        print(f"Speedup: {elapsed_search / elapsed:.2f}")
+
+
+def json_decoder_name():
+    # Name of the module `JsonLogFormat` decodes lines with
+    if log_format.msgspec is not None:
+        return "msgspec"
+    if log_format.orjson is not None:
+        return "orjson"
+    return "json"
+
+
+def benchmark_json(args):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file = Path(temp_dir) / "access.log"
+        json_log_file = Path(temp_dir) / "access.json.log"
+        write_synthetic_log(log_file, args.lines)
+        write_synthetic_json_log(json_log_file, args.lines)
+        print(
+            f"Tokenizing {args.lines} lines ({log_file.stat().st_size >> 20} MiB text, "
+            f"{json_log_file.stat().st_size >> 20} MiB JSON, decoded by {json_decoder_name()})"
+        )
+
+        # Read the files once so that both runs read them from the page cache
+        count_log_entries(log_file, iter)
+        count_log_entries(json_log_file, iter)
+        entries, elapsed = timed(
+            "iter_log_entries (text)", count_log_entries, log_file, iter_log_entries
+        )
+        json_log_format = log_format.compile_log_format("json")
+        entries_json, elapsed_json = timed(
+            "iter_log_entries (JSON)",
+            count_log_entries,
+            json_log_file,
+            json_log_format.iter_entries,
+        )
+        assert entries == entries_json == args.lines
+        print(f"text: {args.lines / elapsed:,.0f} lines/s")
+        print(f"JSON: {args.lines / elapsed_json:,.0f} lines/s")
+
+
+def traced_peak(label, function, *args, **kwargs):
+    # Like `timed`, but the peak of the memory allocated while running the function
+    # is measured in a second run, as tracing slows it down
+    result, elapsed = timed(label, function, *args, **kwargs)
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'':<40} {peak / 2**20:8.1f} MiB peak")
+    return result, elapsed, peak
+
+
+def traced_size(function, *args, **kwargs):
+    # Memory the result of a function takes up, which excludes the caches of recent
+    # timestamps and hashes as they are small and bounded
+    tracemalloc.start()
+    result = function(*args, **kwargs)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def benchmark_distinct(args):
+    # Every path is requested from random addresses of a /16 network, as by bots
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_file = Path(temp_dir) / "access.log"
+        write_synthetic_log(log_file, args.lines)
+        print(f"Counting distinct remote addresses of {args.lines} lines")
+
+        precision = precision_for_error(args.error)
+        remote_addrs_factory = functools.partial(HyperLogLog, precision)
+        log_state, _ = timed("sets", process_log_file, log_file)
+        sketch_log_state, _ = timed(
+            f"HyperLogLog (error {args.error}, precision {precision})",
+            process_log_file,
+            log_file,
+            remote_addrs_factory=remote_addrs_factory,
+        )
+        errors = [
+            abs(len(sketch_log_state[path][1]) / len(remote_addrs) - 1)
+            for path, (_, remote_addrs, *_) in log_state.items()
+        ]
+        del log_state, sketch_log_state
+
+        size = traced_size(process_log_file, log_file)
+        sketch_size = traced_size(
+            process_log_file, log_file, remote_addrs_factory=remote_addrs_factory
+        )
+        print(f"Log state with sets:        {size / 2**20:8.1f} MiB")
+        print(f"Log state with HyperLogLog: {sketch_size / 2**20:8.1f} MiB")
+        print(
+            f"Relative error of estimates: mean {sum(errors) / len(errors):.4f}, "
+            f"max {max(errors):.4f}"
+        )
+
+
+def synthetic_cleaned_access_log(rows, seed=0):
+    # Access log as returned by `clean_uris` with about 10 rows per REQUEST_URI
+    rng = np.random.default_rng(seed)
+    uris = synthetic_uris(max(rows // 10, 1), seed)
+    return pd.DataFrame(
+        {
+            REQUEST_URI: uris.to_numpy()[rng.integers(len(uris), size=rows)],
+            REQUEST_TIMESTAMP: pd.to_datetime(
+                rng.integers(1_600_000_000, 1_700_000_000, size=rows),
+                unit="s",
+                utc=True,
+            ),
+            REQUEST_METHOD: pd.Categorical.from_codes(
+                rng.integers(2, size=rows), ["GET", "HEAD"]
+            ),
+            RESPONSE_STATUS: pd.Categorical.from_codes(
+                rng.integers(3, size=rows), [200, 301, 404]
+            ),
+            REQUEST_REFERER: "-",
+            REQUEST_USER_AGENT: np.array(SYNTHETIC_USER_AGENTS, dtype=object)[
+                rng.integers(len(SYNTHETIC_USER_AGENTS), size=rows)
+            ],
+            ACCESS_COUNT: rng.integers(1, 100, size=rows),
+        }
+    )
+
+
+def aggregate_by_request_uri_sort(df):
+    # Implementation of `aggregate_by_request_uri` before rows were aggregated in a
+    # single pass, without the column `index` it added
+    df_sorted_by_request_timestamp = df.sort_values(
+        by=[REQUEST_URI, REQUEST_TIMESTAMP], ascending=[True, False]
+    )
+    aggregation_functions = {col: "first" for col in df.columns}
+    aggregation_functions[ACCESS_COUNT] = "sum"
+    df_aggregated = df_sorted_by_request_timestamp.groupby(
+        REQUEST_URI, as_index=False
+    ).agg(aggregation_functions)
+    return df_aggregated.sort_values(
+        by=[ACCESS_COUNT, REQUEST_TIMESTAMP], ascending=[False, False]
+    ).copy()
+
+
+def benchmark_aggregate(args):
+    df = synthetic_cleaned_access_log(args.lines)
+    print(f"Aggregating {args.lines} rows of {df[REQUEST_URI].nunique()} URIs")
+
+    df_sort, elapsed_sort, peak_sort = traced_peak(
+        "sort and groupby first", aggregate_by_request_uri_sort, df
+    )
+    df_aggregated, elapsed, peak = traced_peak(
+        "groupby idxmax and sum", aggregate_by_request_uri, df
+    )
+    pd.testing.assert_frame_equal(df_aggregated, df_sort)
+    print(f"Speedup: {elapsed_sort / elapsed:.2f}")
+    print(f"Peak memory: {peak_sort / peak:.2f} times less")
+
+
+def synthetic_log_state(rows, seed=0):
+    # Log state as returned by `process_log_file` with one entry per distinct URI,
+    # some of which are rejected by the filter rules or have a query string
+    rng = random.Random(seed)
+    uris = synthetic_uris(rows, seed)
+    log_state = {}
+    for index, uri in enumerate(uris):
+        if index % 10 == 0:
+            uri += "?page=2"
+        elif index % 10 == 1:
+            uri += ".php"
+        seconds = rng.randrange(1_600_000_000, 1_700_000_000)
+        entry = (
+            f"198.51.{rng.randrange(256)}.{rng.randrange(256)}",
+            "-",
+            time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime(seconds)),
+            rng.choice(["GET", "HEAD"]),
+            uri,
+            rng.choice(["200", "301", "404"]),
+            str(rng.randrange(100000)),
+            "-",
+            rng.choice(SYNTHETIC_USER_AGENTS),
+        )
+        log_state[uri] = [entry, {entry[0]}, rng.randrange(1, 100), seconds, seconds]
+    return log_state
+
+
+def synthetic_access_log(rows, seed=0):
+    return access_log_dataframe(synthetic_log_state(rows, seed))
+
+
+def copying(stage):
+    # Stage as it was before the stages were made copy-on-write-aware, when it copied
+    # the whole frame before deriving its result from it
+    @functools.wraps(stage)
+    def copying_stage(df, *args):
+        return stage(df.copy(), *args)
+
+    return copying_stage
+
+
+def run_stages(df_initial, df_hugo_valid_uris, copy=False):
+    # Run the stages of `generate_redirects_from_access_log` in sequence, yielding the
+    # name of each stage once it has run while keeping the results of all stages
+    # With `copy`, the stages that copied their input before still do so
+    stage = copying if copy else lambda stage: stage
+    results = {}
+    results["split"], _ = stage(split_uris)(df_initial)
+    yield "split_uris"
+    results["cleaned"] = stage(clean_uris)(results["split"])
+    yield "clean_uris"
+    results["aggregated"] = aggregate_by_request_uri(results["cleaned"])
+    yield "aggregate_by_request_uri"
+    results["canonicalized"] = stage(apply_canonicalization)(results["aggregated"])
+    yield "apply_canonicalization"
+    results["transformed"] = stage(apply_transformation)(results["canonicalized"])
+    yield "apply_transformation"
+    results["hugo"] = stage(apply_hugo_urls_and_aliases)(
+        results["transformed"], df_hugo_valid_uris
+    )
+    yield "apply_hugo_urls_and_aliases"
+    results["defaulted"] = stage(apply_default_redirects)(results["hugo"])
+    yield "apply_default_redirects"
+    results["complete"], _ = stage(finalize_redirects)(
+        results["defaulted"], "https://example.org/"
+    )
+    yield "finalize_redirects"
+    results["recent_frequent"] = stage(get_recent_frequent_redirects)(
+        results["complete"]
+    )
+    yield "get_recent_frequent_redirects"
+
+
+def trace_stages(df_initial, df_hugo_valid_uris, copy=False):
+    # Peak of the memory allocated by each stage and the memory its result and
+    # those of all previous stages take up
+    stages = {}
+    tracemalloc.start()
+    for stage in run_stages(df_initial, df_hugo_valid_uris, copy):
+        size, peak = tracemalloc.get_traced_memory()
+        stages[stage] = (peak, size)
+        tracemalloc.reset_peak()
+    tracemalloc.stop()
+    return stages
+
+
+def benchmark_stages(args):
+    df_initial = synthetic_access_log(args.lines)
+    df_hugo_valid_uris = pd.DataFrame(
+        {REQUEST_URI: [f"/articles/article-{i}/" for i in range(0, args.lines, 2)]}
+    )
+    print(f"Generating redirects from {args.lines} URIs")
+
+    # The stages copying their input ran without copy-on-write, which pandas 3 always
+    # has on, and the current stages run with it
+    stages = {}
+    for copy, label in [(True, "copying"), (False, "copy-on-write")]:
+        with copy_on_write_option(not copy):
+            _, elapsed = timed(
+                f"all stages ({label})",
+                lambda: list(run_stages(df_initial, df_hugo_valid_uris, copy)),
+            )
+            stages[copy] = trace_stages(df_initial, df_hugo_valid_uris, copy)
+
+    print(f"{'Peak / retained MiB':<30} {'copying':>20} {'copy-on-write':>20}")
+    for stage in stages[True]:
+        print(
+            f"{stage:<30}"
+            + "".join(
+                f"{peak / 2**20:11.1f} /{size / 2**20:7.1f}"
+                for peak, size in (stages[True][stage], stages[False][stage])
+            )
+        )
+
+
+def apply_canonicalization_row_wise(df):
+    # Implementation of `apply_canonicalization` before the rules were precompiled
+    def canonicalize_url(row):
+        canonical_url = row[REQUEST_URI]
+        for pattern, search_pattern, replacement in CANONICALIZATION_RULES:
+            if re.match(pattern, canonical_url):
+                canonical_url = re.sub(
+                    search_pattern if search_pattern else pattern,
+                    replacement,
+                    canonical_url,
+                )
+        return canonical_url
+
+    df_canonicalized = df.copy()
+    df_canonicalized[REQUEST_URI_CANONICAL] = df.apply(canonicalize_url, axis=1)
+    return df_canonicalized
+
+
+def benchmark_canonicalize(args):
+    df = pd.DataFrame({REQUEST_URI: synthetic_uris(args.lines)})
+    print(f"Canonicalizing {args.lines} URIs")
+
+    # Only the computation of the canonical URIs is compared, not the sorting
+    # and reordering of columns that `apply_canonicalization` does in addition
+    df_row_wise, elapsed_row_wise = timed(
+        "row-wise apply", apply_canonicalization_row_wise, df
+    )
+    canonicalization_rules = compile_rewrite_rules(CANONICALIZATION_RULES)
+    canonical_uris, elapsed_compiled = timed(
+        "compiled rules on Series",
+        rewrite_uris,
+        df[REQUEST_URI],
+        canonicalization_rules,
+    )
+    assert canonical_uris.equals(df_row_wise[REQUEST_URI_CANONICAL])
+    print(f"Speedup: {elapsed_row_wise / elapsed_compiled:.2f}")
+
+
+def rewrite_uris_first_match_row_wise(uris):
+    # Implementation of `apply_default_redirects` before the rules were vectorized
+    def default_url(uri):
+        for pattern, replacement in DEFAULT_RULES:
+            if re.match(pattern, uri):
+                return re.sub(pattern, replacement, uri)
+        return uri
+
+    return uris.apply(default_url)
+
+
+def benchmark_first_match(args):
+    uris = synthetic_uris(args.lines)
+    print(f"Applying the first matching default rule to {args.lines} URIs")
+
+    rewritten_uris_row_wise, elapsed_row_wise = timed(
+        "row-wise apply", rewrite_uris_first_match_row_wise, uris
+    )
+    default_rules = compile_first_match_rules(DEFAULT_RULES)
+    (rewritten_uris, _), elapsed_vectorized = timed(
+        "vectorized rules on Series", rewrite_uris_first_match, uris, default_rules
+    )
+    assert rewritten_uris.equals(rewritten_uris_row_wise)
+    print(f"Speedup: {elapsed_row_wise / elapsed_vectorized:.2f}")
+
+
+def time_local_seconds_strptime(time_local, start_of_days, time_local_cache):
+    # Implementation of `time_local_seconds` before the fields were taken from their
+    # positions, which parses the beginning of each day and UTC offset with `strptime`
+    seconds = time_local_cache.get(time_local)
+    if seconds is not None:
+        return seconds
+
+    day = time_local[:11] + time_local[20:]
+    start_of_day = start_of_days.get(day)
+    try:
+        if start_of_day is None:
+            start_of_day = int(
+                datetime.strptime(
+                    f"{time_local[:11]}:00:00:00{time_local[20:]}", TIME_LOCAL_FORMAT
+                ).timestamp()
+            )
+            start_of_days[day] = start_of_day
+        seconds = (
+            start_of_day
+            + int(time_local[12:14]) * 3600
+            + int(time_local[15:17]) * 60
+            + int(time_local[18:20])
+        )
+    except ValueError:
+        return None
+
+    if len(time_local_cache) >= process_access_log.MAX_CACHED_TIMESTAMPS:
+        time_local_cache.clear()
+    time_local_cache[time_local] = seconds
+    return seconds
+
+
+def access_log_dataframe_parsing_strings(log_state):
+    # Implementation of `access_log_dataframe` before the timestamps were taken from
+    # the log state rather than parsed from the strings of the entries
+    return convert_access_log_types(pd.DataFrame(log_state_columns(log_state)))
+
+
+def benchmark_timestamps(args):
+    # Timestamps of distinct days and UTC offsets, none of which are cached
+    rng = random.Random(0)
+    time_locals = [
+        time.strftime("%d/%b/%Y:%H:%M:%S", time.gmtime(seconds))
+        + rng.choice([" +0000", " +0100", " -0700", " +0530"])
+        for seconds in sorted(
+            rng.randrange(1_600_000_000, 1_700_000_000) for _ in range(args.lines)
+        )
+    ]
+    print(f"Converting {args.lines} timestamps of $time_local")
+
+    process_access_log.time_local_cache.clear()
+    process_access_log.start_of_days.clear()
+    process_access_log.utc_offsets.clear()
+    start_of_days, time_local_cache = {}, {}
+    seconds_strptime, elapsed_strptime = timed(
+        "strptime per day",
+        lambda: [
+            time_local_seconds_strptime(t, start_of_days, time_local_cache)
+            for t in time_locals
+        ],
+    )
+    seconds, elapsed = timed(
+        "fixed positions",
+        lambda: [time_local_seconds(t) for t in time_locals],
+    )
+    assert seconds == seconds_strptime
+    print(f"Speedup: {elapsed_strptime / elapsed:.2f}")
+
+    log_state = synthetic_log_state(args.lines)
+    print(f"Building the access log of {args.lines} URIs")
+    df_strings, elapsed_strings = timed(
+        "parsing strings with pd.to_datetime",
+        access_log_dataframe_parsing_strings,
+        log_state,
+    )
+    df, elapsed = timed("seconds from the log state", access_log_dataframe, log_state)
+    assert df[REQUEST_TIMESTAMP].equals(df_strings[REQUEST_TIMESTAMP])
+    print(f"Speedup: {elapsed_strings / elapsed:.2f}")
+
+
+def apply_all_rules(uris, cache=None, cached=True):
+    # Canonicalization, transformation and default rules as applied by the stages
+    if not cached:
+        canonical_uris = canonicalize_uris(uris)
+        return transform_uris(canonical_uris), default_redirect_uris(canonical_uris)
+    canonical_uris = apply_rules_cached(
+        uris, "canonicalization", CANONICALIZATION_RULES, canonicalize_uris, cache
+    )
+    return (
+        apply_rules_cached(
+            canonical_uris,
+            "transformation",
+            TRANSFORMATION_RULES,
+            transform_uris,
+            cache,
+        ),
+        apply_rules_cached(
+            canonical_uris, "default", DEFAULT_RULES, default_redirect_uris, cache
+        ),
+    )
+
+
+def benchmark_rule_cache(args):
+    uris = synthetic_uris(args.lines)
+    print(f"Applying the rules to {args.lines} URIs")
+    # Keep the results of all URIs in memory
+    rule_cache.MAX_CACHED_RESULTS = max(rule_cache.MAX_CACHED_RESULTS, args.lines)
+
+    (expected_redirect_uris, expected_default_uris), elapsed_uncached = timed(
+        "rules without cache", apply_all_rules, uris, cached=False
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_file = Path(temp_dir) / "rule_cache.sqlite"
+        for label in ["first run", "next run"]:
+            rule_cache.cached_results.clear()
+            with RuleCache(database_file) as cache:
+                (redirect_uris, default_uris), _ = timed(
+                    f"persisted cache ({label})", apply_all_rules, uris, cache
+                )
+            assert redirect_uris.equals(expected_redirect_uris)
+            assert default_uris.equals(expected_default_uris)
+        print(f"Size of the database: {database_file.stat().st_size / 2**20:.1f} MiB")
+    _, elapsed_memo = timed("in-memory cache (same run)", apply_all_rules, uris)
+    print(f"Speedup of the in-memory cache: {elapsed_uncached / elapsed_memo:.2f}")
+
+
+def resolve_first_match_linear(compiled_redirects, uri):
+    # Match the redirects one after another as listed in the `_redirects` file
+    for pattern, destination, status in compiled_redirects:
+        if pattern.fullmatch(uri):
+            return status, destination
+    return None
+
+
+def benchmark_resolver(args):
+    # Static redirects of distinct URIs followed by a few dynamic ones
+    uris = list(synthetic_uris(args.lines))
+    redirects = [(uri, uri.rstrip("/") + "/new/", 301) for uri in uris] + [
+        ("/tag/:tag/", "/tags/:tag/", 301),
+        ("/feed/*", "/index.xml", 301),
+    ]
+    resolver, _ = timed("indexing redirects", RedirectsResolver, redirects, uris)
+    print(f"Resolving {len(uris)} URIs")
+    _, elapsed = timed("indexed", lambda: [resolver.resolve(uri) for uri in uris])
+    print(f"URIs per second: {len(uris) / elapsed:,.0f}")
+
+    # Matching linearly takes time proportional to the number of redirects per URI
+    sample = uris[:: max(len(uris) // 1000, 1)]
+    compiled_redirects = [
+        (compile_source(source), destination, status)
+        for source, destination, status in redirects
+    ]
+    _, elapsed_linear = timed(
+        f"linear first match of {len(sample)} URIs",
+        lambda: [resolve_first_match_linear(compiled_redirects, uri) for uri in sample],
+    )
+    _, elapsed_indexed = timed(
+        f"indexed of {len(sample)} URIs",
+        lambda: [resolver.resolve(uri) for uri in sample],
+    )
+    print(f"Speedup: {elapsed_linear / elapsed_indexed:.2f}")
+
+
+BENCHMARKS = {
+    "parse": benchmark_parse,
+    "tokenize": benchmark_tokenize,
+    "json": benchmark_json,
+    "distinct": benchmark_distinct,
+    "canonicalize": benchmark_canonicalize,
+    "first-match": benchmark_first_match,
+    "aggregate": benchmark_aggregate,
+    "stages": benchmark_stages,
+    "rule-cache": benchmark_rule_cache,
+    "timestamps": benchmark_timestamps,
+    "resolver": benchmark_resolver,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages")
+    parser.add_argument("benchmark", choices=BENCHMARKS)
+    parser.add_argument("--lines", type=int, default=1_000_000, help="Number of rows")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Number of processes")
+    parser.add_argument(
+        "--error", type=float, default=0.02, help="Error of distinct counts"
+    )
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
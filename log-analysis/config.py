@@ -1,3 +1,4 @@
+import importlib.util
 import logging
 import os
 import sys
@@ -7,19 +8,27 @@ import dotenv
 
 
 from constants import (
+    ACCESS_LOG_FILE_NAME_PATTERN,
     HUGO_GENERATED_ALIASES_FILE,
     HUGO_GENERATED_URLS_FILE,
     INTERMEDIATE_DIR,
+    INTERMEDIATE_FORMAT_CSV,
+    INTERMEDIATE_FORMAT_PARQUET,
+    LOG_FORMAT_COMBINED,
     OUTPUT_DIR,
     VALIDATION_DIR,
 )
-from lib import dbg, errxit, sanitize_path_component
+from lib import dbg, errxit, sanitize_path_component, wrn
+from hyperloglog import precision_for_error
+from log_format import compile_log_format
 
 
 # Initialize logging
-def initialize_logging(level=logging.WARN):
+def initialize_logging(level=logging.WARN, prefix=""):
+    # Messages are prefixed with `prefix`, e.g., the name of the access log file
+    # processed alongside others
     # logging.basicConfig(format="%(levelname)s:  %(message)s", level=logging.NOTSET)
-    logging.basicConfig(format="%(message)s", level=logging.NOTSET)
+    logging.basicConfig(format=prefix + "%(message)s", level=logging.NOTSET)
     logger = logging.getLogger()
     logger.setLevel(level)
     # Set the logging level for asyncio to WARNING to suppress informational messages
@@ -52,6 +61,79 @@ def parse_arguments():
         "--prefix", default="", help="Prefix for file names of generated files"
     )
 
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Number of processes for parsing access log files (0: one per CPU, "
+        + "default: one per CPU with --merge and 1 otherwise)",
+    )
+
+    parser.add_argument(
+        "--parallel-files",
+        type=int,
+        default=1,
+        help="Number of processes running the pipeline for separate access log files, "
+        + "e.g., of unrelated sites, concurrently (0: one per CPU), with the files "
+        + "generated for each log file in the same directory put in a subdirectory "
+        + "named after it",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only parse log lines added since the previous run and merge them "
+        + "into the state persisted in the intermediate directory",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Parse all access log files concurrently in a pool of processes, one "
+        + "per CPU unless --jobs is given, and generate one set of redirects from "
+        + "their combined requests rather than one per file",
+    )
+    parser.add_argument(
+        "--log-format",
+        default=None,
+        help="Format of the access log lines as in the nginx directive `log_format`, "
+        + "which may include $request_time, $upstream_response_time and $host, "
+        + 'or of JSON lines, e.g., \'{"status":"$status",...}\' or `json` for the '
+        + "`combined` format as JSON (default: the predefined `combined` format)",
+    )
+    parser.add_argument(
+        "--keep-rejected",
+        action="store_true",
+        help="Keep log lines with request URIs rejected by the filter rules while "
+        + "parsing, e.g., to audit the rejected URIs with --debug",
+    )
+    parser.add_argument(
+        "--distinct-error",
+        type=float,
+        default=None,
+        help="Estimate the number of distinct remote addresses per request URI with "
+        + "a HyperLogLog sketch of this relative standard error, e.g., 0.01, which "
+        + "takes up a fixed amount of memory per URI (default: count exactly)",
+    )
+    parser.add_argument(
+        "--rule-cache",
+        action="store_true",
+        help="Persist the results of the canonicalization, transformation and default "
+        + "rules for each request URI in the intermediate directory, so that they are "
+        + "only applied to URIs not seen in previous runs until the rules change",
+    )
+    parser.add_argument(
+        "--write-intermediate",
+        action="store_true",
+        help="Write the processed access log to the intermediate directory",
+    )
+    parser.add_argument(
+        "--intermediate-format",
+        choices=[INTERMEDIATE_FORMAT_PARQUET, INTERMEDIATE_FORMAT_CSV],
+        default=INTERMEDIATE_FORMAT_PARQUET,
+        help="Format of the processed access log in the intermediate directory",
+    )
+
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     parser.add_argument("--debug", action="store_true", help="Debug output")
     parser.add_argument(
@@ -103,7 +185,11 @@ def parse_arguments():
         if logfile_path.exists():
             if logfile_path.is_dir():
                 logfile_paths.extend(
-                    [Path(f).resolve() for f in logfile_path.glob("**/*.log")]
+                    sorted(
+                        f.resolve()
+                        for f in logfile_path.glob("**/*")
+                        if ACCESS_LOG_FILE_NAME_PATTERN.search(f.name) and f.is_file()
+                    )
                 )
             else:
                 logfile_paths.append(logfile_path.resolve())
@@ -148,6 +234,49 @@ def parse_arguments():
 
     generated_file_prefix = sanitize_path_component(args.prefix) if args.prefix else ""
 
+    if args.merge and args.incremental:
+        errxit(
+            1,
+            "--merge cannot be combined with --incremental, "
+            + "which merges the access log files of each site",
+        )
+
+    if args.parallel_files != 1 and (args.merge or args.incremental):
+        errxit(
+            1,
+            "--parallel-files only applies to processing each access log file "
+            + "separately, i.e., neither with --merge nor with --incremental",
+        )
+
+    # Files are parsed in a pool of processes by default only if they are merged
+    jobs = args.jobs
+    if jobs is None:
+        jobs = 0 if args.merge else 1
+
+    try:
+        log_format = compile_log_format(
+            args.log_format or os.getenv("LOG_FORMAT", None) or LOG_FORMAT_COMBINED
+        )
+    except ValueError as e:
+        errxit(1, str(e))
+
+    if args.distinct_error is not None:
+        try:
+            precision_for_error(args.distinct_error)
+        except ValueError as e:
+            errxit(1, str(e))
+
+    intermediate_format = args.intermediate_format
+    if (
+        intermediate_format == INTERMEDIATE_FORMAT_PARQUET
+        and not importlib.util.find_spec("pyarrow")
+    ):
+        wrn(
+            "Writing the processed access log as Parquet requires the package 'pyarrow', "
+            + "falling back to CSV"
+        )
+        intermediate_format = INTERMEDIATE_FORMAT_CSV
+
     # Return all the constants
     params = {
         "root_dir": root_dir,
@@ -159,6 +288,16 @@ def parse_arguments():
         "target_uri_prefix": target_uri_prefix,
         "generated_directory_prefix": generated_directory_prefix,
         "generated_file_prefix": generated_file_prefix,
+        "jobs": jobs,
+        "parallel_files": args.parallel_files,
+        "log_format": log_format,
+        "incremental": args.incremental,
+        "merge": args.merge,
+        "keep_rejected": args.keep_rejected,
+        "distinct_error": args.distinct_error,
+        "rule_cache": args.rule_cache,
+        "write_intermediate": args.write_intermediate,
+        "intermediate_format": intermediate_format,
         "verbose": args.verbose,
         "debug": args.debug,
         "dry_run": args.dry_run,
@@ -170,23 +309,59 @@ def parse_arguments():
     return params
 
 
-def get_config(args, access_log):
-    root_dir = args["root_dir"] if args["root_dir"] else access_log.parent
+def site_name(access_log):
+    # Name of the site of an access log file, i.e., its name without the suffixes of
+    # access log files, e.g., `example.org` for `example.org.log.1.gz`
+    return sanitize_path_component(
+        ACCESS_LOG_FILE_NAME_PATTERN.sub("", access_log.name)
+    )
+
+
+def get_config(args, access_log, site=None):
+    # If merging, `access_log` is the directory all access log files are in
+    # If given, the files of the site are put in a subdirectory named after it, so
+    # that the files of several sites can be generated in the same directory
+    if args["root_dir"]:
+        root_dir = args["root_dir"]
+    elif access_log.is_dir():
+        root_dir = access_log
+    else:
+        root_dir = access_log.parent
     if args["generated_directory_prefix"]:
         root_dir = root_dir / args["generated_directory_prefix"]
+    if site:
+        root_dir = root_dir / site
     validation_dir = root_dir / VALIDATION_DIR
 
     intermediate_dir = root_dir / INTERMEDIATE_DIR
     output_dir = root_dir / OUTPUT_DIR
 
     intermediate_access_log_processed = (
-        intermediate_dir / "intermediate_access_log_processed.csv"
+        intermediate_dir
+        / f"intermediate_access_log_processed.{args['intermediate_format']}"
     )
 
+    # Processed access log as CSV for debugging if the intermediate format is not CSV
+    intermediate_access_log_processed_csv = (
+        intermediate_dir
+        / f"intermediate_access_log_processed.{INTERMEDIATE_FORMAT_CSV}"
+    )
+
+    # State aggregated from all access log files parsed in previous runs
+    intermediate_access_log_state = intermediate_dir / "access_log_state.sqlite"
+
+    # Results of the rules for each request URI from previous runs
+    intermediate_rule_cache = intermediate_dir / "rule_cache.sqlite"
+
     intermediate_aggregated_uris_file = (
         output_dir / f"{args['generated_file_prefix']}uris.csv"
     )
 
+    # URIs rejected by the filter rules in `generate-redirects.py` with the rule rejecting them
+    intermediate_rejected_uris_file = (
+        output_dir / f"{args['generated_file_prefix']}uris_rejected.csv"
+    )
+
     # Redirects generated by rules in `generate-redirects.py`
     intermediate_redirects_from_rules_file = (
         output_dir / f"{args['generated_file_prefix']}redirects_from_log.csv"
@@ -253,9 +428,9 @@ def get_config(args, access_log):
             hugo_public_dir / HUGO_GENERATED_ALIASES_FILE
         )
         # The above file needs to be moved into the Hugo data dir at the following location
-        # However, this does only make sense if we are operating on a single log file,
-        # otherwise this file will be written to multiple times
-        if len(args["access_log_files"]) == 1:
+        # However, this does only make sense if we are operating on a single log file
+        # or merging all of them, otherwise this file will be written to multiple times
+        if len(args["access_log_files"]) == 1 or args["merge"]:
             output_to_hugo_data_redirects_json_file = hugo_data_dir / "redirects.json"
 
     return {
@@ -265,7 +440,11 @@ def get_config(args, access_log):
         "input_hugo_generated_aliases_file": input_hugo_generated_aliases_file,
         "intermediate_dir": intermediate_dir,
         "intermediate_access_log_processed": intermediate_access_log_processed,
+        "intermediate_access_log_processed_csv": intermediate_access_log_processed_csv,
+        "intermediate_access_log_state": intermediate_access_log_state,
+        "intermediate_rule_cache": intermediate_rule_cache,
         "intermediate_aggregated_uris_file": intermediate_aggregated_uris_file,
+        "intermediate_rejected_uris_file": intermediate_rejected_uris_file,
         "intermediate_redirects_from_rules_file": intermediate_redirects_from_rules_file,
         "intermediate_complete_redirects_file": intermediate_complete_redirects_file,
         "intermediate_hugo_data_redirects_csv_file": intermediate_hugo_data_redirects_csv_file,
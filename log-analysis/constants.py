@@ -30,6 +30,12 @@ HUGO_GENERATED_ALIASES_FILE = "_aliases"
 # in VALIDATION_DIR with the following file name prefix
 VALIDATION_FILE_NAME_PREFIX = ""
 
+# Access log files, including those rotated and compressed by logrotate, e.g.,
+# `access.log`, `access.log.1`, `access.log.2.gz` or `access.log-20240101.zst`
+ACCESS_LOG_FILE_NAME_PATTERN = re.compile(
+    r"\.log(?:[.-][0-9]+)*(?:\.(?:gz|bz2|xz|zst))?$"
+)
+
 #
 # Generated files
 #
@@ -40,6 +46,28 @@ ACCESS_LOG_PROCESSED_FILE = "access_log.csv"
 GENERATED_FILE_NAME_PREFIX = ""  # f"{ORIGINAL_HOSTNAME}_"
 
 
+# Format of the timestamps in the access log, i.e., nginx `$time_local`
+TIME_LOCAL_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Predefined `combined` log format of nginx, which is used unless another is given
+LOG_FORMAT_COMBINED = (
+    '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+    + '"$http_referer" "$http_user_agent"'
+)
+
+# Counterpart of LOG_FORMAT_COMBINED for JSON lines written with `escape=json`,
+# which is used for the log format `json`
+LOG_FORMAT_COMBINED_JSON = (
+    '{"remote_addr":"$remote_addr","remote_user":"$remote_user",'
+    + '"time_local":"$time_local","request":"$request","status":"$status",'
+    + '"body_bytes_sent":"$body_bytes_sent","http_referer":"$http_referer",'
+    + '"http_user_agent":"$http_user_agent"}'
+)
+
+# Formats of the processed access log written to INTERMEDIATE_DIR
+INTERMEDIATE_FORMAT_CSV = "csv"
+INTERMEDIATE_FORMAT_PARQUET = "parquet"
+
 # Access log column names
 REMOTE_ADDR = "Remote address"
 REMOTE_USER = "Remote user"
@@ -51,10 +79,19 @@ REQUEST_USER_AGENT = "Request User Agent"
 RESPONSE_STATUS = "Response Status"
 RESPONSE_BYTES_SENT = "Response Body Bytes Sent"
 
+# Optional access log column names for variables in custom log formats
+REQUEST_TIME = "Request time"
+UPSTREAM_RESPONSE_TIME = "Upstream response time"
+REQUEST_HOST = "Request host"
+
 # Generated column names
 REQUEST_URI_WITHOUT_QUERY = "URI without query"
 REQUEST_URI_CANONICAL = "Canonical URI"
 ACCESS_COUNT = "Total Access Count"
+REMOTE_ADDR_COUNT = "Distinct remote addresses"
+FIRST_REQUEST_TIMESTAMP = "First request timestamp"
+# Name of the filter rule a URI has been rejected by, if any
+REJECTING_RULE = "Rejecting rule"
 
 # Generated redirects
 REDIRECT_URI = "Redirect URI"
@@ -77,6 +114,17 @@ COLUMNS_ACCESS_LOG = [
     REQUEST_USER_AGENT,
 ]
 
+# Columns counting the requests of each request URI while parsing, which follow
+# the columns of its most recent entry
+COLUMNS_REQUEST_COUNTS = [
+    ACCESS_COUNT,
+    REMOTE_ADDR_COUNT,
+    FIRST_REQUEST_TIMESTAMP,
+]
+
+# Access log aggregated by request URI while parsing
+COLUMNS_ACCESS_LOG_AGGREGATED = COLUMNS_ACCESS_LOG + COLUMNS_REQUEST_COUNTS
+
 COLUMNS_FOR_ANALYSIS = [
     REQUEST_URI,
     REQUEST_TIMESTAMP,
@@ -1,13 +1,24 @@
 # %%
 
 # Read data from aggregated nginx access log file
-import re
+from pathlib import Path
 from lib import (
+    convert_access_log_types,
     sort_and_order_columns,
     sort_by_column_ignoring_case,
     url_without_query,
 )
+import numpy as np
 import pandas as pd
+from rule_cache import apply_rules_cached
+from rules import (
+    compile_first_match_rules,
+    compile_filter_rules,
+    compile_rewrite_rules,
+    rejecting_rules,
+    rewrite_uris,
+    rewrite_uris_first_match,
+)
 
 from constants import (
     COLUMNS_COMPLETE,
@@ -16,207 +27,191 @@ from constants import (
     HTTP_STATUS_NOT_FOUND,
     HTTP_STATUS_OK,
     HTTP_STATUS_REDIRECT,
+    INTERMEDIATE_FORMAT_PARQUET,
     REQUEST_URI,
     REQUEST_URI_CANONICAL,
     REDIRECT_URI,
     REDIRECT_STATUS,
     ACCESS_COUNT,
+    FIRST_REQUEST_TIMESTAMP,
+    REMOTE_ADDR_COUNT,
     REQUEST_TIMESTAMP,
-    REQUEST_URI_WITHOUT_QUERY,
+    REJECTING_RULE,
+    RESPONSE_STATUS,
 )
 
 
 def load_access_log(process_access_log):
+    # Parquet files store the columns with their types, so nothing needs to be parsed
+    if Path(process_access_log).suffix == f".{INTERMEDIATE_FORMAT_PARQUET}":
+        df = pd.read_parquet(process_access_log)
+        # Integer categories are stored as plain integers in Parquet
+        df[RESPONSE_STATUS] = df[RESPONSE_STATUS].astype("category")
+        return df
+
     # Load the data from CSV
     df = pd.read_csv(process_access_log)
-    # Convert REQUEST_DATETIME to a datetime object
-    df[REQUEST_TIMESTAMP] = pd.to_datetime(
-        df[REQUEST_TIMESTAMP], format="%d/%b/%Y:%H:%M:%S %z", utc=True
-    )
-    return df
-
-
-# Consider only URLs that look valid
-def filter_uris(df):
+    # Files written before aggregation during parsing contain one row per
+    # remote address and request URI, i.e., each row counts as a single access
+    if ACCESS_COUNT not in df.columns:
+        df[ACCESS_COUNT] = 1
+    # Files written before requests were counted hold the number of distinct
+    # remote addresses as access count and no time of the first request
+    if REMOTE_ADDR_COUNT not in df.columns:
+        df[REMOTE_ADDR_COUNT] = df[ACCESS_COUNT]
+    if FIRST_REQUEST_TIMESTAMP not in df.columns:
+        df[FIRST_REQUEST_TIMESTAMP] = pd.NA
+    # Convert REQUEST_DATETIME to a datetime object and all other columns to their types
+    return convert_access_log_types(df)
+
+
+# Rules to consider only URLs that look valid, each of which rejects URLs matching its
+# first pattern unless they match its second pattern, evaluated case-insensitively
+FILTER_RULES = [
     # Ignore URLs that contain malicious code
-    malicous_regex = (
+    (
+        "malicious",
         r"^/(?:admin|backup|blog|cms|console|data|debug|mailman|api|_?error)"
         + r"|\.(?:js|exe)\b"
         + r"|['\"+&]|\\x22|select*|/RK=0|/RS=\^"
-        + r"|non-existing|\.well-known|81gzm|/wp[-_0-9]*|2000/00/99|/basic-tex|wordpress|2wCEAAgGBgcGB|autodiscover/|clientaccesspolicy|DbXmlInfo|php(?:unit|info)|vWfM6kbCUIv|fa3c615d773|iVBORw0KGgo"
-    )
-    malicious_mask = df[REQUEST_URI].str.contains(
-        malicous_regex, na=False, case=False, regex=True
-    )
-
+        + r"|non-existing|\.well-known|81gzm|/wp[-_0-9]*|2000/00/99|/basic-tex|wordpress|2wCEAAgGBgcGB|autodiscover/|clientaccesspolicy|DbXmlInfo|php(?:unit|info)|vWfM6kbCUIv|fa3c615d773|iVBORw0KGgo",
+        None,
+    ),
     # Ignore URLs that contain URL-encoded characters such as %20|%23|%C3%(?:83|AE|AF|A2|82|html)|%E6%88|%22%20class=%22|...
-    encoded_mask_to_ignore = df[REQUEST_URI].str.contains(
-        r"%[0-9A-F]{2}", na=False, case=False, regex=True
-    )
     # ...but keep URLs that contain `Page%28[^%]+%29` as those occur in URLs of the form `Page(/articles/_index.md)`
-    encoded_mask_to_keep = df[REQUEST_URI].str.contains(
-        r"Page%28[^%]+index\.md%29", na=False, case=False, regex=True
-    )
-    encoded_mask = encoded_mask_to_ignore & ~encoded_mask_to_keep
-
+    ("encoded", r"%[0-9A-F]{2}", r"Page%28[^%]+index\.md%29"),
     # Ignore URLs that contain 'http:' or 'https:'...
-    http_mask_to_ignore = df[REQUEST_URI].str.contains(
-        r"https?:", na=False, case=False, regex=True
-    )
-    http_mask = http_mask_to_ignore
-
-    # Ignore URLs that contain '.php'...
-    php_mask_to_ignore = df[REQUEST_URI].str.contains(
-        ".php", na=False, case=False, regex=False
-    )
-    # ... unless they contain 'doku.php'
-    doku_php_mask_to_keep = df[REQUEST_URI].str.contains(
-        "/doku.php", na=False, case=False, regex=False
-    )
-    php_mask = php_mask_to_ignore & ~doku_php_mask_to_keep
-
-    # Ignore URLs that contain a file extension...
-    file_extension_mask_to_ignore = df[REQUEST_URI].str.contains(
-        r".", na=False, case=False, regex=False
-    )
-    # ...unless they ontain '.pdf' or '.md'
-    file_extension_mask_to_keep = df[REQUEST_URI].str.contains(
-        r"\.(?:xml|html|pdf|md)", na=False, case=False, regex=True
+    ("http", r"https?:", None),
+    # Ignore URLs that contain '.php' unless they contain 'doku.php'
+    ("php", r"\.php", r"/doku\.php"),
+    # Ignore URLs that contain a file extension unless they contain '.pdf' or '.md'
+    ("file_extension", r"\.", r"\.(?:xml|html|pdf|md)"),
+]
+filter_rules = compile_filter_rules(FILTER_RULES)
+
+
+# Split URLs into those that look valid and those rejected by a filter rule
+def split_uris(df):
+    # All rules are evaluated in a single pass over the distinct URIs
+    rejecting_rule = rejecting_rules(df[REQUEST_URI], filter_rules)
+    reject_mask = rejecting_rule.notna()
+
+    df_keep = df[~reject_mask]
+    # Name the first rule rejecting each URL for auditing
+    df_rejected = df[reject_mask].assign(
+        **{REJECTING_RULE: rejecting_rule[reject_mask]}
     )
-    file_extension_mask = file_extension_mask_to_ignore & ~file_extension_mask_to_keep
+    return df_keep, df_rejected
 
-    ignore_mask = (
-        malicious_mask | encoded_mask | http_mask | php_mask | file_extension_mask
-    )
-
-    # Split the DataFrame into two parts: valid and invalid URLs
-    # df_invalid_raw = df[ignore_mask]
-    df_keep = df[~ignore_mask].copy()
 
+# Consider only URLs that look valid
+def filter_uris(df):
+    df_keep, _ = split_uris(df)
     return df_keep
 
 
 # Clean up the valid URLs and remove the query string
 def clean_uris(df):
-    # Apply the function to create a new column
-    df_cleaned_raw = df
-    df_cleaned_raw[REQUEST_URI_WITHOUT_QUERY] = df_cleaned_raw[REQUEST_URI].apply(
-        url_without_query
-    )
-
-    # Create a mask to keep only non-None entries in REQUEST_URI_WITHOUT_QUERY
-    valid_url_mask = df_cleaned_raw[REQUEST_URI_WITHOUT_QUERY].notnull()
-
-    # Apply the mask to filter the DataFrame
-    df_cleaned = df_cleaned_raw[valid_url_mask]
+    # Determine the URIs without query string, which are `None` for invalid URIs
+    uris_without_query = df[REQUEST_URI].apply(url_without_query)
+    valid_url_mask = uris_without_query.notnull()
 
-    # Replace column REQUEST_URI by REQUEST_URI_WITHOUT_QUERY
-    # Drop the original REQUEST_URI column
-    df_cleaned = df_cleaned.drop(columns=[REQUEST_URI])
-
-    # Rename REQUEST_URI_WITHOUT_QUERY to REQUEST_URI
-    df_cleaned = df_cleaned.rename(columns={REQUEST_URI_WITHOUT_QUERY: REQUEST_URI})
-
-    # Reorder the columns
-    df_cleaned = df_cleaned[COLUMNS_FOR_ANALYSIS]
-    return df_cleaned.copy()
+    # Keep the valid URIs with the columns for analysis and the access count from
+    # parsing for aggregation, replacing REQUEST_URI by the URI without query string
+    # Rows and columns are selected at once and the input is left unchanged
+    df_cleaned = df.loc[valid_url_mask, COLUMNS_FOR_ANALYSIS + [ACCESS_COUNT]]
+    return df_cleaned.assign(**{REQUEST_URI: uris_without_query[valid_url_mask]})
 
 
 # Aggregate the cleaned URLs
 def aggregate_by_request_uri(df):
-    # Sort by REQUEST_URI and then by REQUEST_TIMESTAMP in descending order
-    df_sorted_by_request_timestamp = df.sort_values(
-        by=[REQUEST_URI, REQUEST_TIMESTAMP], ascending=[True, False]
-    )
-
-    # Create an aggregation dictionary for all columns
-    aggregation_functions = {col: "first" for col in df.columns}
-
-    # Perform the groupby and aggregation
-    df_aggregated = df_sorted_by_request_timestamp.groupby(
-        REQUEST_URI, as_index=False
-    ).agg(aggregation_functions)
-
-    # Create a Series with the count of each REQUEST_URI
-    uri_count = df.groupby(REQUEST_URI).size()
-
-    # Merge the count series into the aggregated DataFrame
-    df_aggregated = df_aggregated.merge(uri_count.rename(ACCESS_COUNT), on=REQUEST_URI)
-
-    # Reset the index to turn the grouped column (REQUEST_URI) back into a regular column
-    df_aggregated = df_aggregated.reset_index()
+    # Keep the most recent row of each REQUEST_URI and add up the access counts of
+    # all URIs that were cleaned into the same REQUEST_URI, hashing the rows into
+    # groups only once instead of sorting all of them
+    # Of rows with the same most recent REQUEST_TIMESTAMP, the first one is kept
+    groups = df.groupby(REQUEST_URI)
+    most_recent_rows = groups[REQUEST_TIMESTAMP].idxmax()
+    df_aggregated = df.loc[most_recent_rows.to_numpy()].reset_index(drop=True)
+    df_aggregated[ACCESS_COUNT] = groups[ACCESS_COUNT].sum().to_numpy()
 
     # Sort by ACCESS_COUNT from most frequent down and then by REQUEST_DATETIME from most recent down
     df_aggregated = df_aggregated.sort_values(
         by=[ACCESS_COUNT, REQUEST_TIMESTAMP], ascending=[False, False]
-    ).copy()
+    )
     return df_aggregated
 
 
-def apply_canonicalization(df):
-    # Add a column that contains a canonicalized form of the URL
-    canonicalization_rules = [
-        (
-            r"^/Page(?:[(]|%28)(.*)(?:(/[^./]*)|(?:/_?index\.md))(?:[)]|%29)$",
-            None,
-            r"\1\2/",
-        ),
-        (r"^(/articles/)(?:[0-9]{4}/[0-9]{2}/[0-9]{2}/)([^/]+).*$", None, r"\1\2/"),
-        (r"(.*?/)(?:atom|index|start|null).*", None, r"\1"),
-        (r"(.*?/)page/[1-9].*", None, r"\1"),
-        (r"^/(?:hints|(?:de/)?(?:categories|series|tags))", r"_", r"-"),
-        (r"(.*?)(?:/index)?\.html.*", None, r"\1/"),
-        (r"(^.*/[^./]+)$", None, r"\1/"),
-    ]
+# Rules to canonicalize URLs, which are applied in sequence
+CANONICALIZATION_RULES = [
+    (
+        r"^/Page(?:[(]|%28)(.*)(?:(/[^./]*)|(?:/_?index\.md))(?:[)]|%29)$",
+        None,
+        r"\1\2/",
+    ),
+    (r"^(/articles/)(?:[0-9]{4}/[0-9]{2}/[0-9]{2}/)([^/]+).*$", None, r"\1\2/"),
+    (r"(.*?/)(?:atom|index|start|null).*", None, r"\1"),
+    (r"(.*?/)page/[1-9].*", None, r"\1"),
+    (r"^/(?:hints|(?:de/)?(?:categories|series|tags))", r"_", r"-"),
+    (r"(.*?)(?:/index)?\.html.*", None, r"\1/"),
+    (r"(^.*/[^./]+)$", None, r"\1/"),
+]
+canonicalization_rules = compile_rewrite_rules(CANONICALIZATION_RULES)
 
-    def canonicalize_url(row):
-        canonical_url = row[REQUEST_URI]
-        # Apply all canonicalization rules in sequence
-        for pattern, search_pattern, replacement in canonicalization_rules:
-            if re.match(pattern, canonical_url):
-                canonical_url = re.sub(
-                    search_pattern if search_pattern else pattern,
-                    replacement,
-                    canonical_url,
-                )
-        return canonical_url
-
-    # Apply the function and create 'df_canonicalized'
-    df_canonicalized = df.copy()
-    df_canonicalized[REQUEST_URI_CANONICAL] = df.apply(canonicalize_url, axis=1)
+
+def canonicalize_uris(uris):
+    return rewrite_uris(uris, canonicalization_rules)
+
+
+def apply_canonicalization(df, rule_cache=None):
+    # Add a column that contains a canonicalized form of the URL
+    # Results of the rules are cached, and persisted in `rule_cache` if given
+    canonical_uris = apply_rules_cached(
+        df[REQUEST_URI],
+        "canonicalization",
+        CANONICALIZATION_RULES,
+        canonicalize_uris,
+        rule_cache,
+    )
+    df_canonicalized = df.assign(**{REQUEST_URI_CANONICAL: canonical_uris})
     df_canonicalized = sort_and_order_columns(df_canonicalized, COLUMNS_PROCESSING)
     return df_canonicalized
 
 
-def apply_transformation(df):
-    # Apply transformation to account for relocations of entire sections
-    transformation_rules = [
-        (
-            r"^/(?:_media/)?(?:work/)?(?:publications/)?(dissertation|characterizing-networks|forwarding-paradigms).*",
-            r"/research/\1/",
-        ),
-        (r"^/(?:_media/)?(?:work/)?(publications/.*)", r"/research/\1"),
-    ]
+# Rules to account for relocations of entire sections, of which the first matching one is applied
+TRANSFORMATION_RULES = [
+    (
+        r"^/(?:_media/)?(?:work/)?(?:publications/)?(dissertation|characterizing-networks|forwarding-paradigms).*",
+        r"/research/\1/",
+    ),
+    (r"^/(?:_media/)?(?:work/)?(publications/.*)", r"/research/\1"),
+]
+transformation_rules = compile_first_match_rules(TRANSFORMATION_RULES)
 
-    def transform_url(row):
-        url = row[REQUEST_URI_CANONICAL]
 
-        # Apply transformation rules
-        for search_pattern, replacement in transformation_rules:
-            if re.match(search_pattern, url):
-                transformed_url = re.sub(search_pattern, replacement, url)
-                return transformed_url
+def transform_uris(uris):
+    # URIs no rule matches are unchanged
+    redirect_uris, _ = rewrite_uris_first_match(uris, transformation_rules)
+    return redirect_uris
 
-        return url
 
-    # Apply the function and create 'df_redirects'
-    df_transformed = df.copy()
-    df_transformed[REDIRECT_URI] = df.apply(transform_url, axis=1)
-    df_transformed[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
+def apply_transformation(df, rule_cache=None):
+    # Apply transformation to account for relocations of entire sections
+    # Results of the rules are cached, and persisted in `rule_cache` if given
+    redirect_uris = apply_rules_cached(
+        df[REQUEST_URI_CANONICAL],
+        "transformation",
+        TRANSFORMATION_RULES,
+        transform_uris,
+        rule_cache,
+    )
+    df_transformed = df.assign(
+        **{REDIRECT_URI: redirect_uris, REDIRECT_STATUS: HTTP_STATUS_REDIRECT}
+    )
 
-    # Filter to create 'df_transformed'
-    df_transformed = df_transformed[df_transformed[REDIRECT_URI].notnull()]
-    df_transformed = df_transformed[COLUMNS_COMPLETE].reset_index()
+    # Filter to create 'df_transformed', selecting rows and columns at once
+    df_transformed = df_transformed.loc[
+        df_transformed[REDIRECT_URI].notnull(), COLUMNS_COMPLETE
+    ].reset_index()
     return df_transformed
 
 
@@ -260,150 +255,140 @@ def load_hugo_aliases(aliases_file):
 
 def apply_hugo_urls_and_aliases(df, df_hugo_valid_urls, df_hugo_alias_redirects=None):
     # Apply Hugo-generated redirects based on "aliases" key in front matter of pages
-    merged_redirects_list = []
-
-    for index, row in df.iterrows():
-        new_row = row.to_dict()
-
-        # Default to no redirect, i.e., column REDIRECT_URI is `None` and status is `200`
-        new_row[REDIRECT_URI] = None
-        new_row[REDIRECT_STATUS] = HTTP_STATUS_OK
-
-        # 1. Determine if the URL we try to redirect is a valid page, in which case it should not be redirected
-        url_match = df_hugo_valid_urls[
-            df_hugo_valid_urls[REQUEST_URI] == row[REQUEST_URI]
-        ]
-        if url_match.empty:
-            #
-            # The URL in the REQUEST_URI column is not a valid page URL
-            # It still might be a valid URL for another media type
-            #
-
-            # 2. Determine if the canonical version of the URL is a valid page URL
-            # If so, the URL should be redirected to its canonical version
-            canonical_match = df_hugo_valid_urls[
-                df_hugo_valid_urls[REQUEST_URI] == row[REQUEST_URI_CANONICAL]
-            ]
-            if not canonical_match.empty:
-                # The URL in the REQUEST_URI_CANONICAL column is a valid URL and we should redirect to it
-                new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                new_row[REDIRECT_URI] = row[REQUEST_URI_CANONICAL]
-            elif not df_hugo_alias_redirects.empty:
-                # Check if there is a redirect mapping from an alias in `df_hugo_alias_redirects` for the canonical URL
-                alias_match = df_hugo_alias_redirects[
-                    df_hugo_alias_redirects[REQUEST_URI] == row[REQUEST_URI]
-                ]
-                if not alias_match.empty:
-                    new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                    new_row[REDIRECT_URI] = alias_match.iloc[0][
-                        REDIRECT_URI
-                    ]  # First matching record's Redirect URL
-                else:
-                    # 3. Determine if the current redirect URL is a valid URL and the original URL should be redirected
-                    redirect_match = df_hugo_valid_urls[
-                        df_hugo_valid_urls[REQUEST_URI] == row[REDIRECT_URI]
-                    ]
-                    if not redirect_match.empty:
-                        #  Current redirect URL is valid as the URL exists in df_hugo_valid_urls
-                        new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                        new_row[REDIRECT_URI] = row[REDIRECT_URI]
-                    else:
-                        # Check if there is a redirect mapping from an alias in `df_hugo_alias_redirects` for the canonical URL
-                        canonical_alias_match = df_hugo_alias_redirects[
-                            df_hugo_alias_redirects[REQUEST_URI]
-                            == row[REQUEST_URI_CANONICAL]
-                        ]
-                        if not canonical_alias_match.empty:
-                            new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                            new_row[REDIRECT_URI] = canonical_alias_match.iloc[0][
-                                REDIRECT_URI
-                            ]  # First matching record's Redirect URL
-                        else:
-                            redirect_alias_match = df_hugo_alias_redirects[
-                                df_hugo_alias_redirects[REQUEST_URI]
-                                == row[REDIRECT_URI]
-                            ]
-                            if not redirect_alias_match.empty:
-                                new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                                new_row[REDIRECT_URI] = redirect_alias_match.iloc[0][
-                                    REDIRECT_URI
-                                ]  # First matching record's Redirect URL
-                            else:
-                                # No page to redirect to found.
-                                # If the URL corresponds to a file, we blindly redirect
-                                if (
-                                    re.match(
-                                        r".*\.[a-z0-9]+$",
-                                        row[REQUEST_URI_CANONICAL],
-                                        flags=re.IGNORECASE,
-                                    )
-                                    and row[REDIRECT_URI] != row[REQUEST_URI]
-                                ):
-                                    new_row[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
-                                    new_row[REDIRECT_URI] = row[REDIRECT_URI]
-                                else:
-                                    # Redirect to the canonical URL as all the default rules below are based on canonical URLs
-                                    new_row[REDIRECT_STATUS] = HTTP_STATUS_NOT_FOUND
-                                    new_row[REDIRECT_URI] = row[REQUEST_URI_CANONICAL]
-
-        # Append the new row to the list
-        merged_redirects_list.append(new_row)
-
-    # Convert the list of dictionaries to a DataFrame
-    df_merged_redirects = pd.DataFrame(merged_redirects_list)
-    return df_merged_redirects
-
-
-def apply_default_redirects(df):
-    # Redirect a selection of obsoleted URLs to the most relevant category or section to avoid 404 errors
-    default_rules = [
-        (r"^/private/.*", r"/about/"),
-        (
-            r"^/articles.*time-machine-volume-uuid.*",
-            r"/technology/time-machine-volume-uuid/",
-        ),
-        (
-            r"^/articles.*time-machine.*",
-            r"/technology/time-machine-inherit-backup-using-tmutil/",
-        ),
-        (r"^/public/tips/macosx/.*", r"/technology/"),
-        (r"^/(?:work|software)/.*", r"/technology/"),
-        (r"^/hints/macosx(?:/server)?.*", r"/technology/"),
-        (r"^/hints.*", r"/technology/"),
+    # Valid URLs and aliases are looked up in a set and a dict rather than by scanning
+    # the Hugo data frames for every URI
+    valid_uris = set(df_hugo_valid_urls[REQUEST_URI])
+    if df_hugo_alias_redirects is None:
+        alias_redirects = {}
+    else:
+        # The first record wins if an alias occurs more than once
+        df_first_alias_redirects = df_hugo_alias_redirects.drop_duplicates(REQUEST_URI)
+        alias_redirects = dict(
+            zip(
+                df_first_alias_redirects[REQUEST_URI],
+                df_first_alias_redirects[REDIRECT_URI],
+            )
+        )
+
+    request_uris = df[REQUEST_URI]
+    canonical_uris = df[REQUEST_URI_CANONICAL]
+    redirect_uris = df[REDIRECT_URI]
+    alias_uris = request_uris.map(alias_redirects)
+    canonical_alias_uris = canonical_uris.map(alias_redirects)
+    redirect_alias_uris = redirect_uris.map(alias_redirects)
+
+    # The decisions for each URI, of which the first that applies is taken
+    # If no decision applies, the URI is redirected to its canonical version with status
+    # `404` as all the default rules applied subsequently are based on canonical URLs
+    decisions = [
+        # 1. The URL is a valid page and is not redirected
+        (request_uris.isin(valid_uris), None, HTTP_STATUS_OK),
+        # 2. The canonical version of the URL is a valid page URL and we redirect to it
+        (canonical_uris.isin(valid_uris), canonical_uris, HTTP_STATUS_REDIRECT),
+        # Without aliases, URLs not found so far are not redirected either
+        (pd.Series(not alias_redirects, index=df.index), None, HTTP_STATUS_OK),
+        # There is a redirect mapping from an alias for the URL
+        (alias_uris.notna(), alias_uris, HTTP_STATUS_REDIRECT),
+        # 3. The current redirect URL is a valid URL
+        (redirect_uris.isin(valid_uris), redirect_uris, HTTP_STATUS_REDIRECT),
+        # There is a redirect mapping from an alias for the canonical URL...
+        (canonical_alias_uris.notna(), canonical_alias_uris, HTTP_STATUS_REDIRECT),
+        # ... or for the current redirect URL
+        (redirect_alias_uris.notna(), redirect_alias_uris, HTTP_STATUS_REDIRECT),
+        # No page to redirect to found. If the URL corresponds to a file, we blindly redirect
         (
-            r"^/tags/(?:ios|ipad|matlab|nginx|perl|programming|time-machine).*",
-            r"/technology/",
+            canonical_uris.str.match(r".*\.[a-z0-9]+$", case=False, na=False)
+            & (redirect_uris != request_uris),
+            redirect_uris,
+            HTTP_STATUS_REDIRECT,
         ),
-        (r"^/articles/os-x.*", r"/technology/"),
-        (r"^/articles/style.*", r"/digitization/"),
-        (r"^/articles/.*", r"/technology/"),
-        (r"^/tool/.*", r"/technology/"),
     ]
-
-    def default_url(row):
-        redirect_uri = row[REDIRECT_URI]
-        redirect_status = row[REDIRECT_STATUS]
-
-        if redirect_status == HTTP_STATUS_NOT_FOUND:
-            canonical_uri = row[REQUEST_URI_CANONICAL]
-
-            # Apply transformation rules
-            for search_pattern, replacement in default_rules:
-                if re.match(search_pattern, canonical_uri):
-                    redirect_uri = re.sub(search_pattern, replacement, canonical_uri)
-                    redirect_status = HTTP_STATUS_REDIRECT
-                    return pd.Series([redirect_uri, redirect_status])
-
-        return pd.Series([redirect_uri, redirect_status])
-
-    df_defaulted_redirects = df.copy()
-    df_defaulted_redirects[
-        [REDIRECT_URI, REDIRECT_STATUS]
-    ] = df_defaulted_redirects.apply(default_url, axis=1, result_type="expand")
-    # Ensure that column `Redirect Status` contains only integers
-    df_defaulted_redirects[REDIRECT_STATUS] = df_defaulted_redirects[
-        REDIRECT_STATUS
-    ].astype(int)
+    conditions = [condition.to_numpy(dtype=bool) for condition, _, _ in decisions]
+
+    df_merged_redirects = df.assign(
+        **{
+            REDIRECT_URI: np.select(
+                conditions,
+                [
+                    (
+                        np.full(len(df), None, dtype=object)
+                        if uris is None
+                        else uris.to_numpy()
+                    )
+                    for _, uris, _ in decisions
+                ],
+                canonical_uris.to_numpy(),
+            ),
+            REDIRECT_STATUS: np.select(
+                conditions,
+                [status for _, _, status in decisions],
+                HTTP_STATUS_NOT_FOUND,
+            ),
+        }
+    )
+    return df_merged_redirects.reset_index(drop=True)
+
+
+# Rules to redirect a selection of obsoleted URLs to the most relevant category or section,
+# of which the first matching one is applied
+DEFAULT_RULES = [
+    (r"^/private/.*", r"/about/"),
+    (
+        r"^/articles.*time-machine-volume-uuid.*",
+        r"/technology/time-machine-volume-uuid/",
+    ),
+    (
+        r"^/articles.*time-machine.*",
+        r"/technology/time-machine-inherit-backup-using-tmutil/",
+    ),
+    (r"^/public/tips/macosx/.*", r"/technology/"),
+    (r"^/(?:work|software)/.*", r"/technology/"),
+    (r"^/hints/macosx(?:/server)?.*", r"/technology/"),
+    (r"^/hints.*", r"/technology/"),
+    (
+        r"^/tags/(?:ios|ipad|matlab|nginx|perl|programming|time-machine).*",
+        r"/technology/",
+    ),
+    (r"^/articles/os-x.*", r"/technology/"),
+    (r"^/articles/style.*", r"/digitization/"),
+    (r"^/articles/.*", r"/technology/"),
+    (r"^/tool/.*", r"/technology/"),
+]
+default_rules = compile_first_match_rules(DEFAULT_RULES)
+
+
+def default_redirect_uris(uris):
+    # URIs no rule matches have no redirect URI
+    redirect_uris, redirect_mask = rewrite_uris_first_match(uris, default_rules)
+    return redirect_uris.where(redirect_mask)
+
+
+def apply_default_redirects(df, rule_cache=None):
+    # Redirect a selection of obsoleted URLs to the most relevant category or section to avoid 404 errors
+    # Results of the rules are cached, and persisted in `rule_cache` if given
+
+    # Default rules only apply to URLs for which no page to redirect to has been found
+    not_found_mask = df[REDIRECT_STATUS] == HTTP_STATUS_NOT_FOUND
+    redirect_uris = apply_rules_cached(
+        df.loc[not_found_mask, REQUEST_URI_CANONICAL],
+        "default",
+        DEFAULT_RULES,
+        default_redirect_uris,
+        rule_cache,
+    )
+    redirect_uris = redirect_uris[redirect_uris.notnull()]
+    redirected_mask = df.index.isin(redirect_uris.index)
+
+    # Only the two redirect columns are replaced, ensuring that column
+    # `Redirect Status` contains only integers
+    df_defaulted_redirects = df.assign(
+        **{
+            REDIRECT_URI: df[REDIRECT_URI].mask(redirected_mask, redirect_uris),
+            REDIRECT_STATUS: df[REDIRECT_STATUS]
+            .mask(redirected_mask, HTTP_STATUS_REDIRECT)
+            .astype(int),
+        }
+    )
     return df_defaulted_redirects
 
 
@@ -416,10 +401,10 @@ def finalize_redirects(df, target_uri_prefix=""):
     if target_uri_prefix:
         # Store URIs that still exist for later validation that no redirect occurs
         redirects_to_existing_mask = df[REDIRECT_STATUS] == HTTP_STATUS_OK
-        df_redirects_to_existing = df[redirects_to_existing_mask].copy()
-        df_redirects_to_existing.loc[:, REDIRECT_URI] = df_redirects_to_existing[
-            REQUEST_URI
-        ]
+        df_redirects_to_existing = df[redirects_to_existing_mask]
+        df_redirects_to_existing = df_redirects_to_existing.assign(
+            **{REDIRECT_URI: df_redirects_to_existing[REQUEST_URI]}
+        )
 
         df_redirects_complete = pd.concat(
             [df_redirects_required, df_redirects_to_existing], ignore_index=True
@@ -430,15 +415,12 @@ def finalize_redirects(df, target_uri_prefix=""):
 
 
 def get_recent_frequent_redirects(df, year=2021, count=10):
-    # Prepare data frame with recent and frequent redirects
-    df_recent_frequent = df.copy()
-
-    # Accessed since the given year or later...
-    df_recent_frequent = df_recent_frequent[
-        df_recent_frequent[REQUEST_TIMESTAMP].dt.year >= year
-    ]
+    # Prepare data frame with recent and frequent redirects, i.e., those
+    # accessed since the given year or later...
+    recent_mask = df[REQUEST_TIMESTAMP].dt.year >= year
     # ... at least count times
-    df_recent_frequent = df_recent_frequent[df_recent_frequent[ACCESS_COUNT] > count]
+    frequent_mask = df[ACCESS_COUNT] > count
+    df_recent_frequent = df[recent_mask & frequent_mask]
     return df_recent_frequent
 
 
@@ -472,8 +454,9 @@ def get_complete_recent_frequent_redirects(
     # Concatenate all existing URIs with recent and frequent redirects
     if target_uri_prefix:
         #
-        df_redirects_to_existing_target = df_redirects_to_existing.copy()
-        df_redirects_to_existing_target[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
+        df_redirects_to_existing_target = df_redirects_to_existing.assign(
+            **{REDIRECT_STATUS: HTTP_STATUS_REDIRECT}
+        )
         df_complete_recent_frequent_redirects = pd.concat(
             [df_redirects_to_existing_target, df_required_recent_frequent_redirects],
             ignore_index=True,
@@ -0,0 +1,168 @@
+import hashlib
+import math
+
+import numpy as np
+
+# Range of the precision, i.e., of the binary logarithm of the number of registers
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+# Distinct values are held as hashes until there are more than the number of
+# registers divided by this, at which point they take up about as much memory
+SPARSE_FRACTION = 32
+
+# Maximum number of values whose hashes are kept for reuse, as the same remote
+# addresses occur in many log lines
+MAX_CACHED_HASHES = 100_000
+value_hashes = {}
+
+# Marks the beginning of `HyperLogLog.to_bytes` holding the registers
+DENSE = 1
+SPARSE = 0
+
+
+def precision_for_error(error):
+    """
+    Determine the precision of a HyperLogLog sketch with a given relative standard error.
+
+    :param error: Relative standard error of the estimated number of distinct values,
+        e.g., 0.01 for 1%
+    :return: Precision of a sketch with at most that error, or the maximum precision
+    """
+    if not 0 < error < 1:
+        raise ValueError(
+            f"The error of distinct counts must be between 0 and 1, not {error}"
+        )
+    precision = math.ceil(math.log2((1.04 / error) ** 2))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def hash_value(value):
+    # 64-bit hash of a string, which is the same in every process unlike `hash`
+    value_hash = value_hashes.get(value)
+    if value_hash is None:
+        if len(value_hashes) >= MAX_CACHED_HASHES:
+            value_hashes.clear()
+        value_hash = value_hashes[value] = int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        )
+    return value_hash
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch estimating the number of distinct strings added to it with a
+    fixed amount of memory, which may be used in place of a set of strings: strings are
+    added with `add` and `update`, sketches are merged with `|=`, and `len` is the
+    estimated number of distinct strings.
+
+    Strings are held as 64-bit hashes until there are too many of them, so the number
+    of few distinct strings is exact and sketches of rare strings remain small.
+    """
+
+    def __init__(self, precision=14):
+        """
+        :param precision: Binary logarithm of the number of registers, each of which
+            takes up one byte, as returned by `precision_for_error`
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f"The precision must be between {MIN_PRECISION} and {MAX_PRECISION}"
+            )
+        self.precision = precision
+        self.hashes = set()
+        self.registers = None
+
+    def __repr__(self):
+        return f"HyperLogLog(precision={self.precision}, len={len(self)})"
+
+    def __eq__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        if (self.registers is None) != (other.registers is None):
+            return False
+        if self.registers is None:
+            return self.precision == other.precision and self.hashes == other.hashes
+        return self.precision == other.precision and np.array_equal(
+            self.registers, other.registers
+        )
+
+    def add(self, value):
+        if self.registers is None:
+            self.hashes.add(hash_value(value))
+            if len(self.hashes) > (1 << self.precision) // SPARSE_FRACTION:
+                self.densify()
+        else:
+            self.add_hash(hash_value(value))
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def add_hash(self, value_hash):
+        # The first bits of the hash select the register, which keeps the maximum
+        # position of the first 1 bit among the remaining bits of all hashes
+        rank_bits = 64 - self.precision
+        index = value_hash >> rank_bits
+        rank = rank_bits - (value_hash & ((1 << rank_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def densify(self):
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        for value_hash in self.hashes:
+            self.add_hash(value_hash)
+        self.hashes = None
+
+    def __ior__(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Only sketches with the same precision can be merged")
+        if other.registers is None:
+            if self.registers is None:
+                self.hashes |= other.hashes
+                if len(self.hashes) > (1 << self.precision) // SPARSE_FRACTION:
+                    self.densify()
+            else:
+                for value_hash in other.hashes:
+                    self.add_hash(value_hash)
+        else:
+            if self.registers is None:
+                self.densify()
+            np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def __len__(self):
+        if self.registers is None:
+            return len(self.hashes)
+
+        register_count = 1 << self.precision
+        if register_count >= 128:
+            alpha = 0.7213 / (1 + 1.079 / register_count)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[register_count]
+        estimate = (
+            alpha
+            * register_count**2
+            / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        )
+        # Small cardinalities are estimated more accurately by linear counting
+        zero_registers = register_count - np.count_nonzero(self.registers)
+        if estimate <= 2.5 * register_count and zero_registers:
+            estimate = register_count * math.log(register_count / zero_registers)
+        return round(estimate)
+
+    def to_bytes(self):
+        if self.registers is None:
+            hashes = np.array(sorted(self.hashes), dtype=">u8")
+            return bytes([self.precision, SPARSE]) + hashes.tobytes()
+        return bytes([self.precision, DENSE]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls(data[0])
+        if data[1] == DENSE:
+            sketch.hashes = None
+            sketch.registers = np.frombuffer(data[2:], dtype=np.uint8).copy()
+        else:
+            sketch.hashes = set(np.frombuffer(data[2:], dtype=">u8").tolist())
+        return sketch
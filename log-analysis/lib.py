@@ -1,3 +1,4 @@
+import contextlib
 import logging
 import re
 import sys
@@ -8,18 +9,53 @@ from urllib.parse import urlparse
 import pandas as pd
 
 from constants import (
+    ACCESS_COUNT,
     COLUMN_MAP_REDIRECTS_FILE,
     COLUMNS_PROCESSING,
+    FIRST_REQUEST_TIMESTAMP,
     HTTP_STATUS_OK,
     REDIRECTS_FILE_REDIRECT_STATUS,
     REDIRECTS_FILE_REDIRECT_URI,
     REDIRECTS_FILE_REQUEST_URI,
+    REMOTE_ADDR,
+    REMOTE_ADDR_COUNT,
+    REQUEST_HOST,
+    REQUEST_METHOD,
+    REQUEST_REFERER,
+    REQUEST_TIME,
+    REQUEST_TIMESTAMP,
     REQUEST_URI,
+    REQUEST_USER_AGENT,
     REDIRECT_URI,
     REDIRECT_STATUS,
+    RESPONSE_BYTES_SENT,
+    RESPONSE_STATUS,
     SCRIPT_PATH,
+    TIME_LOCAL_FORMAT,
+    UPSTREAM_RESPONSE_TIME,
 )
 
+# Type of the timestamps of the access log
+TIMESTAMP_DTYPE = "datetime64[ns, UTC]"
+
+# Whether pandas always copies on write, as it does as of pandas 3, which deprecates
+# the option to turn copy-on-write on or off
+ALWAYS_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+
+def copy_on_write_option(enabled):
+    # Context in which copy-on-write is on or off, which leaves the option alone if
+    # pandas always copies on write
+    if ALWAYS_COPY_ON_WRITE:
+        return contextlib.nullcontext()
+    return pd.option_context("mode.copy_on_write", enabled)
+
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 class Colors:
     PASTEL_YELLOW = "\033[38;5;229m"
@@ -156,6 +192,72 @@ def ask_user_confirmation(prompt):
     return response in ["yes", "y"]
 
 
+def convert_access_log_types(df):
+    """
+    Convert the columns of a parsed access log from strings to their proper types.
+
+    :param df: Access log with columns COLUMNS_ACCESS_LOG_AGGREGATED and optionally
+        columns of variables in custom log formats
+    :return: The same dataframe with typed columns
+    """
+    # Timestamps are given in seconds since the epoch if parsed while aggregating
+    # and otherwise in the format of $time_local
+    # Their resolution is set explicitly, as that of `pd.to_datetime` depends on the
+    # version of pandas, so that all ways of loading the access log give the same type
+    if pd.api.types.is_integer_dtype(df[REQUEST_TIMESTAMP]):
+        timestamps = pd.to_datetime(df[REQUEST_TIMESTAMP], unit="s", utc=True)
+    else:
+        timestamps = pd.to_datetime(
+            df[REQUEST_TIMESTAMP], format=TIME_LOCAL_FORMAT, utc=True
+        )
+    df[REQUEST_TIMESTAMP] = timestamps.astype(TIMESTAMP_DTYPE)
+    # Columns with few distinct values are categorical, so that each value is held
+    # only once and copies of the dataframe in later stages only copy the codes
+    for column in [REMOTE_ADDR, REQUEST_METHOD, REQUEST_REFERER, REQUEST_USER_AGENT]:
+        df[column] = df[column].astype("category")
+    df[RESPONSE_STATUS] = df[RESPONSE_STATUS].astype("int64").astype("category")
+    df[RESPONSE_BYTES_SENT] = df[RESPONSE_BYTES_SENT].astype("int64")
+    df[ACCESS_COUNT] = df[ACCESS_COUNT].astype("int64")
+    df[REMOTE_ADDR_COUNT] = df[REMOTE_ADDR_COUNT].astype("int64")
+    # The time of the first request is given in seconds since the epoch
+    df[FIRST_REQUEST_TIMESTAMP] = pd.to_datetime(
+        df[FIRST_REQUEST_TIMESTAMP], unit="s", utc=True
+    ).astype(TIMESTAMP_DTYPE)
+    # Times are missing (`-`) if no upstream server has been contacted and are kept
+    # as missing if the request has been passed to more than one upstream server
+    for column in [REQUEST_TIME, UPSTREAM_RESPONSE_TIME]:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    if REQUEST_HOST in df.columns:
+        df[REQUEST_HOST] = df[REQUEST_HOST].astype("category")
+    return df
+
+
+def peak_rss():
+    # Peak resident set size of the process in bytes or `None` if it is unknown
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The size is given in bytes on macOS and in KiB elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def report_memory_usage(stage, df):
+    # Report the memory a dataframe takes up after a stage of the pipeline along with
+    # the peak resident set size of the process so far, if debugging as determining
+    # the size of strings requires visiting all of them
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    message = (
+        f"{stage}: {len(df)} rows, "
+        + f"{df.memory_usage(deep=True).sum() / 2**20:.1f} MiB"
+    )
+    peak = peak_rss()
+    if peak is not None:
+        message += f", peak RSS {peak / 2**20:.1f} MiB"
+    dbg(message)
+
+
 def sort_by_column_ignoring_case(df, column):
     df = df.sort_values(by=column, key=lambda x: x.str.lower(), ascending=True)
     return df
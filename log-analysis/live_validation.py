@@ -0,0 +1,169 @@
+import asyncio
+import time
+from urllib.parse import urljoin, urlsplit
+
+import pandas as pd
+
+from constants import (
+    HTTP_STATUS_OK,
+    REDIRECT_STATUS,
+    REDIRECT_URI,
+    REQUEST_URI,
+    REQUEST_URI_CANONICAL,
+    VALIDATION_STATUS_FINAL,
+    VALIDATION_STATUS_INITIAL,
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Number of requests in flight at a time unless another is given
+DEFAULT_CONCURRENCY = 32
+
+# Maximum number of redirects followed from a request URI
+MAX_REDIRECTS = 10
+
+# Seconds after which a request is given up
+REQUEST_TIMEOUT = 30
+
+# Statuses of responses whose `Location` is followed
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class HostRateLimiter:
+    """
+    Spacing of the requests to each host, so that at most a given number of
+    requests per second is sent to any host.
+
+    Requests are assigned the next free time of their host when they wait, which
+    needs no lock as the event loop does not switch tasks in between.
+    """
+
+    def __init__(self, requests_per_second=None):
+        """
+        :param requests_per_second: Maximum number of requests per second to each
+            host, or `None` to not limit the rate
+        """
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_request_times = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        request_time = max(self.next_request_times.get(host, now), now)
+        self.next_request_times[host] = request_time + self.interval
+        if request_time > now:
+            await asyncio.sleep(request_time - now)
+
+
+def validation_mismatch(row, status_initial, status_final):
+    # Row of a validation file with the initial and final status of its URI if the
+    # initial status does not match REDIRECT_STATUS, otherwise `None`
+    if status_final != HTTP_STATUS_OK:
+        print(
+            f"Redirect {row[REQUEST_URI]} -> {row[REDIRECT_URI]}: initial: expected {row[REDIRECT_STATUS]}, got {status_initial} final: {status_final}"
+        )
+    if status_initial == row[REDIRECT_STATUS]:
+        return None
+    return {
+        REQUEST_URI: row[REQUEST_URI],
+        REQUEST_URI_CANONICAL: row[REQUEST_URI_CANONICAL],
+        REDIRECT_URI: row[REDIRECT_URI],
+        REDIRECT_STATUS: row[REDIRECT_STATUS],
+        VALIDATION_STATUS_INITIAL: status_initial,
+        VALIDATION_STATUS_FINAL: status_final,
+    }
+
+
+async def fetch_status(session, url, rate_limiter):
+    # Status and `Location` of the response to `url` without following redirects
+    await rate_limiter.wait(urlsplit(url).netloc)
+    async with session.get(url, allow_redirects=False) as response:
+        # Read the body, so that the connection is returned to the pool
+        await response.read()
+        return response.status, response.headers.get("Location")
+
+
+async def follow_redirects(session, url, rate_limiter, max_redirects=MAX_REDIRECTS):
+    # Status of the response to `url` and the final status at the end of the chain of
+    # redirects, which is followed from the first response rather than requesting
+    # `url` again, so each URL of the chain is requested only once
+    status_initial, location = await fetch_status(session, url, rate_limiter)
+    status = status_initial
+    for _ in range(max_redirects):
+        if status not in REDIRECT_STATUSES or not location:
+            break
+        url = urljoin(url, location)
+        status, location = await fetch_status(session, url, rate_limiter)
+    return status_initial, status
+
+
+async def validate_redirects_async(
+    base_url, df, concurrency=DEFAULT_CONCURRENCY, requests_per_second=None
+):
+    """
+    Request the URIs of a validation file from a live site concurrently.
+
+    :param base_url: Base URL of the site, e.g., `https://example.org/`
+    :param df: Validation data with the columns REQUEST_URI, REQUEST_URI_CANONICAL,
+        REDIRECT_URI and REDIRECT_STATUS
+    :param concurrency: Maximum number of requests in flight at a time, which is also
+        the maximum number of connections kept open
+    :param requests_per_second: Maximum number of requests per second to each host,
+        or `None` to not limit the rate
+    :return: List of the rows whose initial status does not match REDIRECT_STATUS,
+        with the initial and final status
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = HostRateLimiter(requests_per_second)
+
+    async def validate_row(session, row):
+        # Requests wait for the semaphore rather than for a connection of the pool,
+        # so that the time waiting does not count towards their timeout
+        async with semaphore:
+            try:
+                status_initial, status_final = await follow_redirects(
+                    session, urljoin(base_url, row[REQUEST_URI]), rate_limiter
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Error checking {row[REQUEST_URI]}: {e!r}")
+                return None
+
+        return validation_mismatch(row, status_initial, status_final)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    ) as session:
+        mismatches = await asyncio.gather(
+            *(validate_row(session, row) for row in df.to_dict("records"))
+        )
+    return [mismatch for mismatch in mismatches if mismatch is not None]
+
+
+def validate_redirects_live(
+    base_url, csv_file, concurrency=DEFAULT_CONCURRENCY, requests_per_second=None
+):
+    """
+    Request the URIs of a validation file from a live site and compare the status of
+    the responses to the expected REDIRECT_STATUS.
+
+    :param base_url: Base URL of the site, e.g., `https://example.org/`
+    :param csv_file: Validation file as written by `generate_validation_data`
+    :param concurrency: Maximum number of requests in flight at a time
+    :param requests_per_second: Maximum number of requests per second to each host,
+        or `None` to not limit the rate
+    :return: List of the mismatching rows as returned by `validate_redirects_async`
+    """
+    if aiohttp is None:
+        raise ImportError(
+            "Validating redirects against a live site requires the package 'aiohttp': "
+            + "pip install aiohttp"
+        )
+    df = pd.read_csv(csv_file)
+    return asyncio.run(
+        validate_redirects_async(base_url, df, concurrency, requests_per_second)
+    )
@@ -0,0 +1,452 @@
+import json
+import re
+import typing
+from operator import attrgetter, itemgetter
+
+from constants import (
+    COLUMNS_ACCESS_LOG,
+    LOG_FORMAT_COMBINED_JSON,
+    REMOTE_ADDR,
+    REMOTE_USER,
+    REQUEST_HOST,
+    REQUEST_METHOD,
+    REQUEST_REFERER,
+    REQUEST_TIME,
+    REQUEST_TIMESTAMP,
+    REQUEST_URI,
+    REQUEST_USER_AGENT,
+    RESPONSE_BYTES_SENT,
+    RESPONSE_STATUS,
+    UPSTREAM_RESPONSE_TIME,
+)
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Variables in nginx `log_format` strings, i.e., `$name` or `${name}`
+VARIABLE_PATTERN = re.compile(r"\$(?:\{(\w+)\}|(\w+))")
+
+# Regular expressions matching the values of variables that are more specific than
+# any text up to the next delimiter, which is what all other variables match
+VARIABLE_PATTERNS = {
+    "remote_addr": r"\d+\.\d+\.\d+\.\d+|[0-9A-Fa-f]*:[0-9A-Fa-f:.]+",
+    "remote_user": r"\S+",
+    "request_method": r"[A-Z]+",
+    "request_uri": r"\S+",
+    "status": r"\d{3}",
+    "body_bytes_sent": r"\d+",
+    "request_time": r"[\d.]+",
+    # Times of more than one upstream server are separated by `, ` or, if the request
+    # has been redirected internally, by ` : `, e.g., `0.500, 1.000`
+    "upstream_response_time": r"-|[\d.]+(?:(?:, | : )[\d.]+)*",
+}
+
+# `$request` comprises the method, the URI and the protocol, of which the method and
+# the URI are captured as separate fields
+REQUEST_PATTERN = r"([A-Z]+) (\S+) HTTP/\d\.\d"
+
+# Maximum number of requests of JSON lines whose method and URI are kept for reuse
+MAX_CACHED_REQUESTS = 100_000
+
+# Keys of JSON objects and the variables of their values in `log_format` strings for
+# JSON lines, e.g., `"status":"$status"` or `"status":$status`
+JSON_FIELD_PATTERN = re.compile(r'"(\w+)"\s*:\s*"?\$(?:\{(\w+)\}|(\w+))')
+
+# Columns of COLUMNS_ACCESS_LOG holding the values of variables
+VARIABLE_COLUMNS = {
+    "remote_addr": REMOTE_ADDR,
+    "remote_user": REMOTE_USER,
+    "time_local": REQUEST_TIMESTAMP,
+    "request_method": REQUEST_METHOD,
+    "request_uri": REQUEST_URI,
+    "status": RESPONSE_STATUS,
+    "body_bytes_sent": RESPONSE_BYTES_SENT,
+    "http_referer": REQUEST_REFERER,
+    "http_user_agent": REQUEST_USER_AGENT,
+}
+
+# Columns appended to COLUMNS_ACCESS_LOG for variables in a log format
+EXTRA_VARIABLE_COLUMNS = {
+    "request_time": REQUEST_TIME,
+    "upstream_response_time": UPSTREAM_RESPONSE_TIME,
+    "host": REQUEST_HOST,
+}
+
+# Values of the columns of COLUMNS_ACCESS_LOG for variables missing from a log format
+# All other columns are required
+DEFAULT_VALUES = {
+    REMOTE_ADDR: "-",
+    REMOTE_USER: "-",
+    REQUEST_METHOD: "-",
+    RESPONSE_BYTES_SENT: "0",
+    REQUEST_REFERER: "-",
+    REQUEST_USER_AGENT: "-",
+}
+
+
+class LogFormat:
+    """
+    nginx `log_format` compiled once into the regular expressions matching its lines.
+
+    Fields are yielded in the order of `columns`, i.e., those of COLUMNS_ACCESS_LOG
+    followed by the columns of the variables in EXTRA_VARIABLE_COLUMNS the format contains.
+    Lines are matched from their beginning with bracketed and quoted fields ending at
+    their first delimiter, and only if that fails anywhere in the line with non-greedy
+    fields, as lines of the combined format have always been matched.
+    """
+
+    def __init__(self, log_format):
+        """
+        :param log_format: Format string as in the `log_format` directive of nginx
+        :raise ValueError: If the format lacks the variables of required columns
+        """
+        self.log_format = log_format
+
+        line_pattern = ""
+        pattern = ""
+        group_columns = []
+        segments = VARIABLE_PATTERN.split(log_format)
+        # Segments alternate between literal text and the two groups of a variable
+        for index in range(0, len(segments), 3):
+            literal = segments[index]
+            line_pattern += re.escape(literal)
+            pattern += re.escape(literal)
+            if index + 1 >= len(segments):
+                break
+            variable = segments[index + 1] or segments[index + 2]
+            column = VARIABLE_COLUMNS.get(variable) or EXTRA_VARIABLE_COLUMNS.get(
+                variable
+            )
+
+            # Any text up to the delimiter following the variable
+            delimiter = segments[index + 3][:1] if index + 3 < len(segments) else ""
+            if delimiter:
+                line_variable_pattern = f"[^{re.escape(delimiter)}]*"
+                variable_pattern = ".*?"
+            else:
+                line_variable_pattern = variable_pattern = ".*"
+            line_variable_pattern = VARIABLE_PATTERNS.get(
+                variable, line_variable_pattern
+            )
+            variable_pattern = VARIABLE_PATTERNS.get(variable, variable_pattern)
+
+            if variable == "request" and not {
+                REQUEST_METHOD,
+                REQUEST_URI,
+            } & set(group_columns):
+                line_pattern += REQUEST_PATTERN
+                pattern += REQUEST_PATTERN
+                group_columns += [REQUEST_METHOD, REQUEST_URI]
+            elif column and column not in group_columns:
+                line_pattern += f"({line_variable_pattern})"
+                pattern += f"({variable_pattern})"
+                group_columns.append(column)
+            else:
+                line_pattern += f"(?:{line_variable_pattern})"
+                pattern += f"(?:{variable_pattern})"
+
+        missing_columns = [
+            column
+            for column in COLUMNS_ACCESS_LOG
+            if column not in group_columns and column not in DEFAULT_VALUES
+        ]
+        if missing_columns:
+            raise ValueError(
+                f"Log format '{log_format}' lacks variables for {missing_columns}"
+            )
+
+        self.line_pattern = re.compile(line_pattern)
+        self.pattern = re.compile(pattern)
+        self.columns = COLUMNS_ACCESS_LOG + [
+            column
+            for column in EXTRA_VARIABLE_COLUMNS.values()
+            if column in group_columns
+        ]
+
+        # Fields of missing variables are appended to the groups of each match
+        self.defaults = tuple(
+            DEFAULT_VALUES[column]
+            for column in self.columns
+            if column not in group_columns
+        )
+        indices = []
+        default_index = len(group_columns)
+        for column in self.columns:
+            if column in group_columns:
+                indices.append(group_columns.index(column))
+            else:
+                indices.append(default_index)
+                default_index += 1
+        # No fields need to be reordered if the groups are in the order of the columns
+        self.get_fields = (
+            None if indices == list(range(len(group_columns))) else itemgetter(*indices)
+        )
+
+    def __repr__(self):
+        return f"LogFormat({self.log_format!r})"
+
+    def __reduce__(self):
+        # Compile the format again rather than pickling its patterns and getter
+        return LogFormat, (self.log_format,)
+
+    def iter_entries(self, lines):
+        # Yield the fields of each matching line as a tuple in the order of `columns`
+        match_line = self.line_pattern.match
+        search_line = self.pattern.search
+        get_fields = self.get_fields
+        defaults = self.defaults
+        for line in lines:
+            match = match_line(line) or search_line(line)
+            if match:
+                if get_fields is None:
+                    yield match.groups()
+                else:
+                    yield get_fields(match.groups() + defaults)
+
+
+class JsonLogFormat:
+    """
+    nginx `log_format` with `escape=json` writing one JSON object per line, e.g.,
+    `{"remote_addr":"$remote_addr","request":"$request",...}`.
+
+    Fields are yielded in the order of `columns` just as by `LogFormat`. Only the keys
+    of the variables of these columns are decoded, with msgspec or orjson if installed
+    and with the `json` module otherwise. Lines that are not JSON objects or lack
+    required fields are skipped.
+    """
+
+    def __init__(self, log_format):
+        """
+        :param log_format: Format string as in the `log_format` directive of nginx
+        :raise ValueError: If the format lacks the variables of required columns
+        """
+        self.log_format = log_format
+
+        column_keys = {}
+        request_key = None
+        for key, *variable in JSON_FIELD_PATTERN.findall(log_format):
+            variable = variable[0] or variable[1]
+            if variable == "request":
+                request_key = request_key or key
+            column = VARIABLE_COLUMNS.get(variable) or EXTRA_VARIABLE_COLUMNS.get(
+                variable
+            )
+            if column:
+                column_keys.setdefault(column, key)
+        # The method and the URI are taken from `$request` unless given separately
+        split_request = request_key is not None and not {
+            REQUEST_METHOD,
+            REQUEST_URI,
+        } & set(column_keys)
+
+        group_columns = list(column_keys)
+        if split_request:
+            group_columns += [REQUEST_METHOD, REQUEST_URI]
+        missing_columns = [
+            column
+            for column in COLUMNS_ACCESS_LOG
+            if column not in group_columns and column not in DEFAULT_VALUES
+        ]
+        if missing_columns:
+            raise ValueError(
+                f"Log format '{log_format}' lacks variables for {missing_columns}"
+            )
+
+        self.columns = COLUMNS_ACCESS_LOG + [
+            column
+            for column in EXTRA_VARIABLE_COLUMNS.values()
+            if column in group_columns
+        ]
+        # Values are decoded in the order of the columns, with `$request` in place of
+        # the method and the URI if they are taken from it, leaving out the columns of
+        # missing variables
+        self.keys = []
+        self.request_index = None
+        value_indices = {}
+        for column in self.columns:
+            if split_request and column == REQUEST_METHOD:
+                self.request_index = len(self.keys)
+                self.keys.append(request_key)
+            elif column in column_keys:
+                value_indices[column] = len(self.keys)
+                self.keys.append(column_keys[column])
+        # Lines lacking the keys of required columns are skipped, other values are `-`
+        required_keys = [
+            key
+            for column, key in column_keys.items()
+            if column in COLUMNS_ACCESS_LOG and column not in DEFAULT_VALUES
+        ] + ([request_key] if split_request else [])
+
+        self.decode, self.decode_errors, get_values = json_decoder(
+            self.keys, required_keys
+        )
+        self.get_request = (
+            None if self.request_index is None else get_values(self.request_index)
+        )
+
+        # Method and URI and then fields of missing variables are appended to the values
+        # before they are put in the order of the columns
+        defaults = []
+        indices = []
+        for column in self.columns:
+            if column in value_indices:
+                indices.append(value_indices[column])
+            elif split_request and column == REQUEST_METHOD:
+                indices.append(len(self.keys))
+            elif split_request and column == REQUEST_URI:
+                indices.append(len(self.keys) + 1)
+            else:
+                indices.append(len(self.keys) + 2 + len(defaults))
+                defaults.append(DEFAULT_VALUES[column])
+        self.defaults = tuple(defaults)
+        if defaults:
+            self.get_values = get_values(*range(len(self.keys)))
+            self.get_fields = itemgetter(*indices)
+        else:
+            # No fields need to be reordered if all variables are given, only the
+            # method and the URI put between the values before and after them, which
+            # are at least two each, so that their getters return tuples
+            method_index = self.columns.index(REQUEST_METHOD)
+            self.get_head = get_values(*range(method_index))
+            self.get_tail = get_values(
+                *range(method_index + split_request, len(self.keys))
+            )
+            self.get_fields = None
+
+    def __repr__(self):
+        return f"JsonLogFormat({self.log_format!r})"
+
+    def __reduce__(self):
+        # Compile the format again rather than pickling its decoder
+        return JsonLogFormat, (self.log_format,)
+
+    def iter_entries(self, lines):
+        # Yield the fields of each line as a tuple in the order of `columns`
+        decode = self.decode
+        decode_errors = self.decode_errors
+        get_request = self.get_request
+        match_request = re.compile(REQUEST_PATTERN).fullmatch
+        # Method and URI of recent requests, which repeat much more often than not
+        requests = {}
+        get_fields = self.get_fields
+        if get_fields is None:
+            no_request = ()
+            get_head = self.get_head
+            get_tail = self.get_tail
+        else:
+            no_request = (None, None)
+            get_values = self.get_values
+            defaults = self.defaults
+        for line in lines:
+            try:
+                entry = decode(line)
+            except decode_errors:
+                continue
+            if get_request is None:
+                request = no_request
+            else:
+                request_line = get_request(entry)
+                request = requests.get(request_line)
+                if request is None:
+                    match = match_request(request_line)
+                    if not match:
+                        continue
+                    if len(requests) >= MAX_CACHED_REQUESTS:
+                        requests.clear()
+                    request = requests[request_line] = match.groups()
+            # The fields are taken from the decoded entry rather than a tuple of its
+            # values unless they need to be reordered
+            if get_fields is None:
+                yield get_head(entry) + request + get_tail(entry)
+            else:
+                yield get_fields(get_values(entry) + request + defaults)
+
+
+def json_decoder(keys, required_keys):
+    # Function decoding a JSON object into an entry with the values of `keys` as
+    # strings, which are `-` if missing, the exceptions it raises for anything else,
+    # including missing `required_keys`, and a function returning a getter of the
+    # values at the given indices of `keys` from an entry
+    required = [key in required_keys for key in keys]
+
+    def strings(values):
+        # Numbers, e.g., of `"status":$status`, are turned into strings like all fields
+        if any(value is None and required for value, required in zip(values, required)):
+            raise ValueError("Required value missing")
+        return tuple("-" if value is None else str(value) for value in values)
+
+    if msgspec is not None:
+        # Only the fields of the struct are decoded, all other keys are skipped
+        # Entries only hold strings, so they need not be tracked by the garbage
+        # collector, which would otherwise run over and over while reading a file
+        fields = [f"field_{index}" for index in range(len(keys))]
+        rename = dict(zip(fields, keys))
+        log_entry = msgspec.defstruct(
+            "LogEntry",
+            [
+                (field, str) if required else (field, str, "-")
+                for field, required in zip(fields, required)
+            ],
+            kw_only=True,
+            rename=rename,
+            gc=False,
+        )
+        decode_entry = msgspec.json.Decoder(log_entry).decode
+        decode_values = msgspec.json.Decoder(
+            msgspec.defstruct(
+                "LogEntry",
+                [(field, typing.Any, None) for field in fields],
+                rename=rename,
+            )
+        ).decode
+        get_values = attrgetter(*fields)
+
+        def decode(line):
+            try:
+                return decode_entry(line)
+            except msgspec.ValidationError:
+                # Values other than strings are rare, so they are only decoded as such
+                # if decoding them as strings fails
+                values = strings(get_values(decode_values(line)))
+                return log_entry(**dict(zip(fields, values)))
+
+        def getter(*indices):
+            return attrgetter(*(fields[index] for index in indices))
+
+        return decode, (msgspec.DecodeError, ValueError), getter
+
+    loads = orjson.loads if orjson is not None else json.loads
+    get_values = itemgetter(*keys)
+
+    def decode(line):
+        entry = loads(line)
+        try:
+            values = get_values(entry)
+        except KeyError:
+            values = tuple(entry.get(key) for key in keys)
+        return strings(values)
+
+    return decode, (ValueError, TypeError, AttributeError), itemgetter
+
+
+def compile_log_format(log_format):
+    """
+    Compile an nginx `log_format` string into a parser of log lines.
+
+    :param log_format: Format string as in the `log_format` directive of nginx, or
+        `json` for LOG_FORMAT_COMBINED_JSON
+    :return: JsonLogFormat for formats of JSON objects, LogFormat otherwise
+    :raise ValueError: If the format lacks the variables of required columns
+    """
+    if log_format == "json":
+        log_format = LOG_FORMAT_COMBINED_JSON
+    if log_format.lstrip().startswith("{"):
+        return JsonLogFormat(log_format)
+    return LogFormat(log_format)
@@ -0,0 +1,308 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import zlib
+
+from hyperloglog import HyperLogLog
+from process_access_log import (
+    LOG_ENTRY_PATH,
+    aggregate_log_entries,
+    is_compressed,
+    iter_lines_read_ahead,
+    iter_log_entries,
+    merge_log_states,
+    open_log_file,
+    process_log_file_range,
+)
+
+# Increment whenever the tables or the representation of the log state change
+# State persisted with a different version is discarded
+SCHEMA_VERSION = 4
+
+# Log files are identified by their first line, which remains the same when lines
+# are appended and when the file is rotated and compressed by logrotate
+FINGERPRINT_MAX_LINE_LENGTH = 64 * 1024
+
+# Size of the blocks read when skipping or searching through log files
+BLOCK_SIZE = 1024 * 1024
+
+# Columns of the table `uris` holding the fields of the most recent log entry
+# Fields of variables in custom log formats are held as a JSON array in `extra_fields`
+# and the counts of requests in the columns following it
+ENTRY_COLUMNS = [
+    "remote_addr",
+    "remote_user",
+    "time_local",
+    "method",
+    "path",
+    "status",
+    "body_bytes_sent",
+    "http_referer",
+    "http_user_agent",
+]
+
+CREATE_TABLES = f"""
+CREATE TABLE IF NOT EXISTS uris (
+    {", ".join(f"{column} TEXT" for column in ENTRY_COLUMNS)},
+    extra_fields TEXT,
+    remote_addrs BLOB,
+    hits INTEGER,
+    first_seen INTEGER,
+    last_seen INTEGER,
+    PRIMARY KEY (path)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    fingerprint TEXT PRIMARY KEY,
+    file_path TEXT,
+    device INTEGER,
+    inode INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    offset INTEGER,
+    complete INTEGER
+);
+"""
+
+
+# Beginning of blobs holding HyperLogLog sketches rather than sets of remote addresses,
+# which cannot be that of a zlib stream
+HYPERLOGLOG_BLOB_PREFIX = b"\x00HLL"
+
+
+def encode_remote_addrs(remote_addrs):
+    if isinstance(remote_addrs, HyperLogLog):
+        return HYPERLOGLOG_BLOB_PREFIX + zlib.compress(remote_addrs.to_bytes())
+    return zlib.compress("\n".join(remote_addrs).encode("utf-8"))
+
+
+def decode_remote_addrs(blob):
+    if blob and blob.startswith(HYPERLOGLOG_BLOB_PREFIX):
+        return HyperLogLog.from_bytes(
+            zlib.decompress(blob[len(HYPERLOGLOG_BLOB_PREFIX) :])
+        )
+    return set(zlib.decompress(blob).decode("utf-8").split("\n")) if blob else set()
+
+
+class LogStateStore:
+    """
+    SQLite database persisting the log state aggregated by request URI together with
+    the offset up to which each log file has been parsed, so that subsequent runs
+    only need to parse lines appended since and log files rotated in since.
+
+    Log lines rejected while parsing are not part of the log state, the fields of
+    entries depend on the log format and distinct remote addresses are held either
+    exactly or as sketches, so the state is discarded whenever the filter rules, the
+    log format or the way remote addresses are counted change.
+    """
+
+    def __init__(self, database_file, parse_fingerprint=""):
+        """
+        :param database_file: Path of the SQLite database file
+        :param parse_fingerprint: Fingerprint of the log format, the filter rules
+            and the error of distinct counts applied while parsing, as returned by
+            `rules.rules_fingerprint`
+        """
+        self.connection = sqlite3.connect(database_file)
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS uris; DROP TABLE IF EXISTS settings;"
+                + " DROP TABLE IF EXISTS files;"
+            )
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(CREATE_TABLES)
+
+        row = self.connection.execute(
+            "SELECT value FROM settings WHERE key = 'parse_fingerprint'"
+        ).fetchone()
+        if row is not None and row[0] != parse_fingerprint:
+            # Start over, as log files need to be parsed again
+            with self.connection:
+                self.connection.execute("DELETE FROM uris")
+                self.connection.execute("DELETE FROM files")
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings VALUES ('parse_fingerprint', ?)",
+                (parse_fingerprint,),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def load_log_state(self):
+        # URIs are loaded in the order they were first seen
+        log_state = {}
+        for (
+            *entry,
+            extra_fields,
+            remote_addrs,
+            hits,
+            first_seen,
+            last_seen,
+        ) in self.connection.execute(
+            f"SELECT {', '.join(ENTRY_COLUMNS)}, extra_fields, remote_addrs,"
+            + " hits, first_seen, last_seen FROM uris ORDER BY rowid"
+        ):
+            entry = tuple(entry) + tuple(json.loads(extra_fields))
+            log_state[entry[LOG_ENTRY_PATH]] = [
+                entry,
+                decode_remote_addrs(remote_addrs),
+                hits,
+                first_seen,
+                last_seen,
+            ]
+        return log_state
+
+    def get_log_file(self, fingerprint):
+        row = self.connection.execute(
+            "SELECT offset, complete FROM files WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"offset": row[0], "complete": bool(row[1])}
+
+    def save(self, log_state, log_files):
+        # Save the log state and the offsets of the log files in one transaction,
+        # so that they are consistent even if the process is interrupted
+        with self.connection:
+            self.connection.execute("DELETE FROM uris")
+            self.connection.executemany(
+                f"INSERT INTO uris VALUES ({', '.join('?' * (len(ENTRY_COLUMNS) + 5))})",
+                (
+                    (
+                        *entry[: len(ENTRY_COLUMNS)],
+                        json.dumps(entry[len(ENTRY_COLUMNS) :]),
+                        encode_remote_addrs(remote_addrs),
+                        *counts,
+                    )
+                    for entry, remote_addrs, *counts in log_state.values()
+                ),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES "
+                + "(:fingerprint, :file_path, :device, :inode, :size, :mtime_ns, :offset, :complete)",
+                log_files,
+            )
+
+
+def log_file_fingerprint(file_path):
+    # Hash of the first line of the (decompressed) log file or `None`
+    # if the file does not yet contain a complete line
+    with open_log_file(file_path, binary=True) as file:
+        first_line = file.readline(FINGERPRINT_MAX_LINE_LENGTH)
+    if not first_line.endswith(b"\n"):
+        return None
+    return hashlib.sha256(first_line).hexdigest()
+
+
+def end_of_last_line(file_path, size):
+    # Offset just after the last complete line within the first `size` bytes,
+    # so that a line nginx is still writing is only parsed in the next run
+    with open(file_path, "rb") as file:
+        end = size
+        while end > 0:
+            start = max(end - BLOCK_SIZE, 0)
+            file.seek(start)
+            index = file.read(end - start).rfind(b"\n")
+            if index >= 0:
+                return start + index + 1
+            end = start
+    return 0
+
+
+def skip_bytes(file, count):
+    while count > 0:
+        block = file.read(min(count, BLOCK_SIZE))
+        if not block:
+            break
+        count -= len(block)
+
+
+def process_log_file_incrementally(
+    file_path,
+    log_state,
+    store,
+    jobs=1,
+    uri_filter=None,
+    log_format=None,
+    remote_addrs_factory=None,
+):
+    # Parse only the part of the log file that has not been parsed in previous runs
+    # and merge it into `log_state`, skipping lines rejected by `uri_filter`, if given,
+    # and parsing lines according to `log_format`, by default the combined format
+    # Distinct remote addresses are collected by `remote_addrs_factory` as in
+    # `aggregate_log_entries`, which needs to be the same in every run
+    # Returns the updated log state and the record of the log file to save in the store,
+    # which is `None` if nothing has been parsed
+    fingerprint = log_file_fingerprint(file_path)
+    if fingerprint is None:
+        return log_state, None
+
+    log_file = store.get_log_file(fingerprint) or {"offset": 0, "complete": False}
+    if log_file["complete"]:
+        return log_state, None
+
+    stat = os.stat(file_path)
+    offset = log_file["offset"]
+    if is_compressed(file_path):
+        # Offsets refer to the decompressed content, which is the same as that of
+        # the uncompressed file before rotation. Compressed files do not change
+        # anymore, so they are complete once parsed
+        with open_log_file(file_path, binary=True) as file:
+            skip_bytes(file, offset)
+            text_file = io.TextIOWrapper(file, encoding="utf-8")
+            lines = iter_lines_read_ahead(text_file)
+            log_state = aggregate_log_entries(
+                iter_log_entries(lines, log_format),
+                log_state,
+                uri_filter,
+                remote_addrs_factory,
+            )
+            end = file.tell()
+            text_file.detach()
+        complete = True
+    else:
+        end = end_of_last_line(file_path, stat.st_size)
+        if end < offset:
+            # The file has been truncated and rewritten since, e.g., by `copytruncate`
+            offset = 0
+        if end == offset:
+            return log_state, None
+        log_state = merge_log_states(
+            [
+                log_state,
+                process_log_file_range(
+                    file_path,
+                    offset,
+                    end,
+                    jobs,
+                    uri_filter,
+                    log_format,
+                    remote_addrs_factory,
+                ),
+            ]
+        )
+        complete = False
+
+    return log_state, {
+        "fingerprint": fingerprint,
+        "file_path": str(file_path),
+        "device": stat.st_dev,
+        "inode": stat.st_ino,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "offset": end,
+        "complete": complete,
+    }
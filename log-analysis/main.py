@@ -1,26 +1,55 @@
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
 from constants import (
     HTTP_STATUS_NOT_FOUND,
     HTTP_STATUS_OK,
     HTTP_STATUS_REDIRECT,
+    INTERMEDIATE_FORMAT_PARQUET,
     REDIRECT_STATUS,
     RESPONSE_STATUS,
     VALIDATION_FILE_NAME_PREFIX,
 )
 
 from lib import (
+    ALWAYS_COPY_ON_WRITE,
     ask_user_confirmation,
     errxit,
+    report_memory_usage,
     validate_redirects,
     vrb,
     write_redirects_file,
+    wrn,
 )
 from config import (
     get_config,
+    initialize_logging,
     parse_arguments,
+    site_name,
 )
 
-from process_access_log import process_log_file, write_to_csv
+from hyperloglog import HyperLogLog, precision_for_error
+from log_state_store import LogStateStore, process_log_file_incrementally
+from rule_cache import RuleCache
+from process_access_log import (
+    UriFilter,
+    access_log_dataframe,
+    process_log_file,
+    process_log_files,
+    write_to_csv,
+    write_to_parquet,
+)
+from rules import rules_fingerprint
 from generate_redirects import (
+    FILTER_RULES,
     apply_canonicalization,
     apply_default_redirects,
     apply_hugo_urls_and_aliases,
@@ -28,196 +57,475 @@ from generate_redirects import (
     generate_validation_data,
     get_complete_recent_frequent_redirects,
     get_recent_frequent_redirects,
-    load_access_log,
     aggregate_by_request_uri,
     clean_uris,
-    filter_uris,
+    split_uris,
     load_hugo_aliases,
     load_hugo_uris,
     apply_transformation,
+    filter_rules,
 )
 
 
-def main():
-    args = parse_arguments()
-    # Iterate over all access log file as the source of request URIs
-    for index, access_log in enumerate(args["access_log_files"]):
-        if not access_log.exists():
-            errxit(1, f"Input file / directory {access_log} does not exist")
+def create_uri_filter(args):
+    # Filter rules are applied while parsing unless rejected lines are to be kept
+    if args["keep_rejected"]:
+        return None
+    return UriFilter(filter_rules)
 
-        if index:
-            vrb("")
 
-        config = get_config(args, access_log)
+def create_remote_addrs_factory(args):
+    # Distinct remote addresses are estimated by HyperLogLog sketches if an error
+    # is given and otherwise collected in sets
+    if args["distinct_error"] is None:
+        return None
+    return functools.partial(HyperLogLog, precision_for_error(args["distinct_error"]))
 
-        intermediate_access_log_processed = config["intermediate_access_log_processed"]
-        # Ensure directory for intermediate and output files exists
-        config["intermediate_dir"].mkdir(parents=True, exist_ok=True)
-        config["output_dir"].mkdir(parents=True, exist_ok=True)
 
-        #
-        # Parse log file into a CSV file
-        #
+def open_rule_cache(args, config):
+    # Results of the rules are only persisted across runs if requested
+    if not args["rule_cache"]:
+        return contextlib.nullcontext()
+    return RuleCache(config["intermediate_rule_cache"])
 
-        logs = process_log_file(access_log)
-        write_to_csv(logs, intermediate_access_log_processed)
-        vrb(
-            "Processing access log file "
-            + str(access_log)
-            + "\nProcessed access log file written to "
-            + str(intermediate_access_log_processed)
+
+def report_rejected_lines(uri_filter):
+    if uri_filter is None:
+        return
+    vrb(
+        f"Rejected {sum(uri_filter.rejected_lines.values())} log lines while parsing: "
+        + ", ".join(
+            f"{rule} {count}" for rule, count in uri_filter.rejected_lines.most_common()
         )
+    )
 
-        #
-        # Process CSV file
-        #
 
-        # Load the data from CSV
-        df_initial = load_access_log(intermediate_access_log_processed)
-        df_filtered = filter_uris(df_initial)
-        df_cleaned = clean_uris(df_filtered)
-        df_aggregated = aggregate_by_request_uri(df_cleaned)
+def write_processed_access_log(args, config, log_state, df_initial):
+    # Write the processed access log to a Parquet or CSV file,
+    # which can be loaded with `load_access_log`
+    intermediate_access_log_processed = config["intermediate_access_log_processed"]
+    if args["intermediate_format"] == INTERMEDIATE_FORMAT_PARQUET:
+        write_to_parquet(df_initial, intermediate_access_log_processed)
         if args["debug"]:
-            # Output aggregated URIs to CSV file
-            df_aggregated.to_csv(
-                config["intermediate_aggregated_uris_file"], index=False
+            write_to_csv(
+                log_state,
+                config["intermediate_access_log_processed_csv"],
+                args["log_format"].columns,
             )
-
-        df_canonicalized = apply_canonicalization(df_aggregated)
-        df_accesslog_redirects = apply_transformation(df_canonicalized)
-        df_accesslog_redirects.to_csv(
-            config["intermediate_redirects_from_rules_file"], index=False
+    else:
+        write_to_csv(
+            log_state, intermediate_access_log_processed, args["log_format"].columns
         )
+    vrb(
+        "Processed access log file written to " + str(intermediate_access_log_processed)
+    )
+
+
+def generate_redirects_from_access_log(args, config, df_initial, rule_cache=None):
+    report_memory_usage("Processed access log", df_initial)
+    df_filtered, df_rejected = split_uris(df_initial)
+    report_memory_usage("Filtered URIs", df_filtered)
+    if args["debug"]:
+        # Output rejected URIs to CSV file together with the rule rejecting them
+        df_rejected.to_csv(config["intermediate_rejected_uris_file"], index=False)
+    df_cleaned = clean_uris(df_filtered)
+    report_memory_usage("Cleaned URIs", df_cleaned)
+    df_aggregated = aggregate_by_request_uri(df_cleaned)
+    report_memory_usage("Aggregated URIs", df_aggregated)
+    if args["debug"]:
+        # Output aggregated URIs to CSV file
+        df_aggregated.to_csv(config["intermediate_aggregated_uris_file"], index=False)
+
+    df_canonicalized = apply_canonicalization(df_aggregated, rule_cache)
+    report_memory_usage("Canonicalized URIs", df_canonicalized)
+    df_accesslog_redirects = apply_transformation(df_canonicalized, rule_cache)
+    report_memory_usage("Transformed URIs", df_accesslog_redirects)
+    df_accesslog_redirects.to_csv(
+        config["intermediate_redirects_from_rules_file"], index=False
+    )
+    if (
+        config["input_hugo_generated_urls_file"]
+        and config["input_hugo_generated_urls_file"].exists()
+    ):
+        df_hugo_valid_uris = load_hugo_uris(config["input_hugo_generated_urls_file"])
         if (
-            config["input_hugo_generated_urls_file"]
-            and config["input_hugo_generated_urls_file"].exists()
+            config["input_hugo_generated_aliases_file"]
+            and config["input_hugo_generated_aliases_file"].exists()
         ):
-            df_hugo_valid_uris = load_hugo_uris(
-                config["input_hugo_generated_urls_file"]
-            )
-            if (
+            df_hugo_aliases = load_hugo_aliases(
                 config["input_hugo_generated_aliases_file"]
-                and config["input_hugo_generated_aliases_file"].exists()
-            ):
-                df_hugo_aliases = load_hugo_aliases(
-                    config["input_hugo_generated_aliases_file"]
-                )
-            else:
-                df_hugo_aliases = None
-            df_accesslog_hugo_redirects = apply_hugo_urls_and_aliases(
-                df_accesslog_redirects, df_hugo_valid_uris, df_hugo_aliases
             )
         else:
-            df_accesslog_hugo_redirects = df_accesslog_redirects
+            df_hugo_aliases = None
+        df_accesslog_hugo_redirects = apply_hugo_urls_and_aliases(
+            df_accesslog_redirects, df_hugo_valid_uris, df_hugo_aliases
+        )
+        report_memory_usage("Redirects to Hugo URLs", df_accesslog_hugo_redirects)
+    else:
+        df_accesslog_hugo_redirects = df_accesslog_redirects
 
-        df_defaulted_redirects = apply_default_redirects(df_accesslog_hugo_redirects)
+    df_defaulted_redirects = apply_default_redirects(
+        df_accesslog_hugo_redirects, rule_cache
+    )
+    report_memory_usage("Default redirects", df_defaulted_redirects)
 
-        df_complete_redirects, df_redirects_to_existing = finalize_redirects(
-            df_defaulted_redirects,
-            args["target_uri_prefix"],
-        )
+    df_complete_redirects, df_redirects_to_existing = finalize_redirects(
+        df_defaulted_redirects,
+        args["target_uri_prefix"],
+    )
+    report_memory_usage("Complete redirects", df_complete_redirects)
 
-        # Validate against test cases
-        mismatched_redirects = []
-        # Convert to list to check if it's empty
-        validation_files = list(
-            config["validation_dir"].glob(f"{VALIDATION_FILE_NAME_PREFIX}*.csv")
-        )
-        if validation_files:
-            for validation_file in validation_files:
-                mismatches = validate_redirects(df_complete_redirects, validation_file)
-                mismatched_redirects.extend(mismatches)
-
-        # Write the DataFrame to a CSV file
-        df_complete_redirects.to_csv(
-            config["intermediate_complete_redirects_file"], index=False
-        )
+    # Validate against test cases
+    mismatched_redirects = []
+    # Convert to list to check if it's empty
+    validation_files = list(
+        config["validation_dir"].glob(f"{VALIDATION_FILE_NAME_PREFIX}*.csv")
+    )
+    if validation_files:
+        for validation_file in validation_files:
+            mismatches = validate_redirects(df_complete_redirects, validation_file)
+            mismatched_redirects.extend(mismatches)
 
-        df_recent_frequent_redirects = get_recent_frequent_redirects(
-            df_complete_redirects
-        )
+    # Write the DataFrame to a CSV file
+    df_complete_redirects.to_csv(
+        config["intermediate_complete_redirects_file"], index=False
+    )
 
-        df_required_recent_frequent_redirects = df_recent_frequent_redirects[
-            df_recent_frequent_redirects[REDIRECT_STATUS] == HTTP_STATUS_REDIRECT
-        ]
+    df_recent_frequent_redirects = get_recent_frequent_redirects(df_complete_redirects)
 
-        df_validation = generate_validation_data(
-            df_redirects_to_existing, df_required_recent_frequent_redirects
-        )
-        df_validation.to_csv(config["output_redirects_validation_file"])
-        vrb(
-            f"Proposal for validation file written to {config["output_redirects_validation_file"]}"
-        )
+    df_required_recent_frequent_redirects = df_recent_frequent_redirects[
+        df_recent_frequent_redirects[REDIRECT_STATUS] == HTTP_STATUS_REDIRECT
+    ]
 
-        df_final = get_complete_recent_frequent_redirects(
-            df_redirects_to_existing,
-            df_required_recent_frequent_redirects,
-            args["target_uri_prefix"],
-        )
+    df_validation = generate_validation_data(
+        df_redirects_to_existing, df_required_recent_frequent_redirects
+    )
+    df_validation.to_csv(config["output_redirects_validation_file"])
+    vrb(
+        f"Proposal for validation file written to {config["output_redirects_validation_file"]}"
+    )
 
-        # Write the DataFrame to a `_redirects` file for use by Netlify, Cloudflare etc.
-        write_redirects_file(
-            df_final,
-            config["output_netlify_redirects_file"],
-            args["target_uri_prefix"],
-        )
-        vrb(
-            f"Redirects file for Netlify or Cloudflare Pages written to {config["output_netlify_redirects_file"]}"
+    df_final = get_complete_recent_frequent_redirects(
+        df_redirects_to_existing,
+        df_required_recent_frequent_redirects,
+        args["target_uri_prefix"],
+    )
+
+    # Write the DataFrame to a `_redirects` file for use by Netlify, Cloudflare etc.
+    write_redirects_file(
+        df_final,
+        config["output_netlify_redirects_file"],
+        args["target_uri_prefix"],
+    )
+    vrb(
+        f"Redirects file for Netlify or Cloudflare Pages written to {config["output_netlify_redirects_file"]}"
+    )
+
+    # Write the DataFrame to a CSV file for manual inspection (easier to read than JSON)
+    df_final.to_csv(config["intermediate_hugo_data_redirects_csv_file"], index=False)
+
+    # Write the DataFrame to a JSON file in Hugo's `data` directory to enable
+    # Hugo to generate an up-to-date `_redirects` file via the template `layouts/index.redir`
+    df_final.to_json(config["output_hugo_data_redirects_json_file"], orient="records")
+
+    # Output redirects to invalid URLs to CSV file
+    invalid_redirects_mask = df_final[REDIRECT_STATUS] == HTTP_STATUS_NOT_FOUND
+    if any(invalid_redirects_mask):
+        df_redirects_invalid = df_final[invalid_redirects_mask]
+
+        df_redirects_invalid.to_csv(
+            config["output_redirects_to_invalid_file"], index=False
         )
 
-        # Write the DataFrame to a CSV file for manual inspection (easier to read than JSON)
-        df_final.to_csv(
-            config["intermediate_hugo_data_redirects_csv_file"], index=False
+    # Output redirects to valid URLs, which must not be redirected, to CSV file
+    url_was_valid_mask = df_final[RESPONSE_STATUS] == HTTP_STATUS_OK
+    url_is_valid_mask = df_final[REDIRECT_STATUS] == HTTP_STATUS_OK
+    unwanted_redirects_mask = url_was_valid_mask & url_is_valid_mask
+    if any(unwanted_redirects_mask):
+        df_redirects_unwanted = df_final[unwanted_redirects_mask]
+
+        df_redirects_unwanted.to_csv(
+            config["output_redirects_to_existing_file"], index=False
         )
 
-        # Write the DataFrame to a JSON file in Hugo's `data` directory to enable
-        # Hugo to generate an up-to-date `_redirects` file via the template `layouts/index.redir`
-        df_final.to_json(
-            config["output_hugo_data_redirects_json_file"], orient="records"
+    if (
+        len(mismatched_redirects) == 0
+        and config["output_to_hugo_data_redirects_json_file"]
+    ):
+        if not config[
+            "output_to_hugo_data_redirects_json_file"
+        ].exists() or ask_user_confirmation(
+            "The generated Hugo redirects JSON file already exists at \n"
+            + str(config["output_to_hugo_data_redirects_json_file"])
+            + "\n\nConfirm overwriting it with the new file\n    "
+            + str(config["intermediate_hugo_data_redirects_csv_file"])
+            + "\n(yes/NO): "
+        ):
+            try:
+                config["output_hugo_data_redirects_json_file"].rename(
+                    config["output_to_hugo_data_redirects_json_file"]
+                )
+                print(
+                    f"File moved to {config["output_to_hugo_data_redirects_json_file"]}"
+                )
+            except Exception as e:
+                errxit(1, f"An error occurred while moving the file: {e}")
+
+    return df_final
+
+
+def main_incremental(args):
+    # Group the access log files by the state store of their site, oldest first,
+    # so that entries from more recent files replace those from older ones
+    sites = {}
+    for access_log in sorted(
+        args["access_log_files"], key=lambda f: f.stat().st_mtime_ns
+    ):
+        config = get_config(args, access_log)
+        sites.setdefault(config["intermediate_access_log_state"], (config, []))
+        sites[config["intermediate_access_log_state"]][1].append(access_log)
+
+    for index, (config, access_logs) in enumerate(sites.values()):
+        if index:
+            vrb("")
+
+        # Ensure directory for intermediate and output files exists
+        config["intermediate_dir"].mkdir(parents=True, exist_ok=True)
+        config["output_dir"].mkdir(parents=True, exist_ok=True)
+
+        #
+        # Parse new lines of all log files of the site and merge them into the state
+        #
+
+        uri_filter = create_uri_filter(args)
+        with LogStateStore(
+            config["intermediate_access_log_state"],
+            rules_fingerprint(
+                FILTER_RULES if uri_filter else None,
+                args["log_format"].log_format,
+                args["distinct_error"],
+            ),
+        ) as store:
+            logs = store.load_log_state()
+            log_files = []
+            for access_log in access_logs:
+                logs, log_file = process_log_file_incrementally(
+                    access_log,
+                    logs,
+                    store,
+                    args["jobs"],
+                    uri_filter,
+                    args["log_format"],
+                    create_remote_addrs_factory(args),
+                )
+                if log_file:
+                    log_files.append(log_file)
+                    vrb("Processed new lines of access log file " + str(access_log))
+            store.save(logs, log_files)
+        report_rejected_lines(uri_filter)
+
+        df_initial = access_log_dataframe(logs, args["log_format"].columns)
+        if args["write_intermediate"] or args["debug"]:
+            write_processed_access_log(args, config, logs, df_initial)
+        del logs
+
+        with open_rule_cache(args, config) as rule_cache:
+            generate_redirects_from_access_log(args, config, df_initial, rule_cache)
+
+
+def main_merged(args):
+    # Parse the access log files oldest first, so that entries from more recent
+    # files replace those from older ones, and merge them into one log state
+    access_logs = sorted(args["access_log_files"], key=lambda f: f.stat().st_mtime_ns)
+    log_dir = os.path.commonpath([access_log.parent for access_log in access_logs])
+    config = get_config(args, Path(log_dir))
+
+    # Ensure directory for intermediate and output files exists
+    config["intermediate_dir"].mkdir(parents=True, exist_ok=True)
+    config["output_dir"].mkdir(parents=True, exist_ok=True)
+
+    #
+    # Parse all log files directly into a single DataFrame
+    #
+
+    uri_filter = create_uri_filter(args)
+    logs = process_log_files(
+        access_logs,
+        args["jobs"],
+        uri_filter,
+        args["log_format"],
+        create_remote_addrs_factory(args),
+    )
+    df_initial = access_log_dataframe(logs, args["log_format"].columns)
+    vrb(f"Processed {len(access_logs)} access log files")
+    report_rejected_lines(uri_filter)
+
+    if args["write_intermediate"] or args["debug"]:
+        write_processed_access_log(args, config, logs, df_initial)
+    del logs
+
+    with open_rule_cache(args, config) as rule_cache:
+        generate_redirects_from_access_log(args, config, df_initial, rule_cache)
+
+
+def process_access_log_file(args, access_log, site=None):
+    # Run the pipeline for a single access log file and return the number of
+    # request URIs parsed from it and of redirects generated
+    config = get_config(args, access_log, site)
+
+    # Ensure directory for intermediate and output files exists
+    config["intermediate_dir"].mkdir(parents=True, exist_ok=True)
+    config["output_dir"].mkdir(parents=True, exist_ok=True)
+
+    #
+    # Parse log file directly into a DataFrame
+    #
+
+    uri_filter = create_uri_filter(args)
+    logs = process_log_file(
+        access_log,
+        args["jobs"],
+        uri_filter,
+        args["log_format"],
+        create_remote_addrs_factory(args),
+    )
+    df_initial = access_log_dataframe(logs, args["log_format"].columns)
+    vrb("Processed access log file " + str(access_log))
+    report_rejected_lines(uri_filter)
+
+    # Optionally write the processed access log to an intermediate file
+    if args["write_intermediate"] or args["debug"]:
+        write_processed_access_log(args, config, logs, df_initial)
+    # Release the log state, which is no longer needed
+    del logs
+
+    #
+    # Process access log
+    #
+
+    with open_rule_cache(args, config) as rule_cache:
+        df_final = generate_redirects_from_access_log(
+            args, config, df_initial, rule_cache
         )
+    return len(df_initial), len(df_final)
 
-        # Output redirects to invalid URLs to CSV file
-        invalid_redirects_mask = df_final[REDIRECT_STATUS] == HTTP_STATUS_NOT_FOUND
-        if any(invalid_redirects_mask):
-            df_redirects_invalid = df_final[invalid_redirects_mask]
 
-            df_redirects_invalid.to_csv(
-                config["output_redirects_to_invalid_file"], index=False
-            )
+def process_access_log_file_in_worker(args, access_log, site, log_level):
+    # Run the pipeline in a worker process, which does not inherit the logging
+    # configuration of the parent process
+    initialize_logging(log_level, f"[{access_log.parent.name}/{access_log.name}] ")
+    start = time.perf_counter()
+    uri_count, redirect_count = process_access_log_file(args, access_log, site)
+    return uri_count, redirect_count, time.perf_counter() - start
 
-        # Output redirects to valid URLs, which must not be redirected, to CSV file
-        url_was_valid_mask = df_final[RESPONSE_STATUS] == HTTP_STATUS_OK
-        url_is_valid_mask = df_final[REDIRECT_STATUS] == HTTP_STATUS_OK
-        unwanted_redirects_mask = url_was_valid_mask & url_is_valid_mask
-        if any(unwanted_redirects_mask):
-            df_redirects_unwanted = df_final[unwanted_redirects_mask]
 
-            df_redirects_unwanted.to_csv(
-                config["output_redirects_to_existing_file"], index=False
+def assign_sites(args, access_logs):
+    # Site of each access log file whose files are put in a subdirectory of their
+    # own, as they would otherwise be written to the same directory as those of
+    # other files, e.g., of unrelated sites whose logs are in one directory, or
+    # `None` for files already written to a directory of their own
+    access_logs_by_root_dir = {}
+    for access_log in access_logs:
+        root_dir = get_config(args, access_log)["root_dir"]
+        access_logs_by_root_dir.setdefault(root_dir, []).append(access_log)
+    sites = {}
+    for root_dir_access_logs in access_logs_by_root_dir.values():
+        for access_log in root_dir_access_logs:
+            sites[access_log] = (
+                site_name(access_log) if len(root_dir_access_logs) > 1 else None
             )
 
-        if (
-            len(mismatched_redirects) == 0
-            and config["output_to_hugo_data_redirects_json_file"]
-        ):
-            if not config[
-                "output_to_hugo_data_redirects_json_file"
-            ].exists() or ask_user_confirmation(
-                "The generated Hugo redirects JSON file already exists at \n"
-                + str(config["output_to_hugo_data_redirects_json_file"])
-                + "\n\nConfirm overwriting it with the new file\n    "
-                + str(config["intermediate_hugo_data_redirects_csv_file"])
-                + "\n(yes/NO): "
-            ):
-                try:
-                    config["output_hugo_data_redirects_json_file"].rename(
-                        config["output_to_hugo_data_redirects_json_file"]
-                    )
-                    print(
-                        f"File moved to {config["output_to_hugo_data_redirects_json_file"]}"
-                    )
-                except Exception as e:
-                    errxit(1, f"An error occurred while moving the file: {e}")
+    # Pipelines writing to the same directories would overwrite each other's files,
+    # e.g., those of rotated files of the same site
+    root_dirs = {}
+    for access_log in access_logs:
+        root_dir = get_config(args, access_log, sites[access_log])["root_dir"]
+        if root_dir in root_dirs:
+            errxit(
+                1,
+                f"The access log files {root_dirs[root_dir]} and {access_log} "
+                + f"would both write to {root_dir}, use --merge to combine them",
+            )
+        root_dirs[root_dir] = access_log
+    return sites
+
+
+def main_parallel_files(args):
+    # Run the pipelines of the access log files, e.g., of unrelated sites, in a pool
+    # of processes, so that the total time is bounded by the largest file rather
+    # than the sum of all, and summarize their results once all have completed
+    # Workers are started from a server process as in `process_log_file_parallel`
+    access_logs = args["access_log_files"]
+    sites = assign_sites(args, access_logs)
+
+    jobs = args["parallel_files"] or os.cpu_count()
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(access_logs)),
+        mp_context=multiprocessing.get_context("forkserver"),
+        # Workers do not inherit the pandas options of this process either
+        initializer=enable_copy_on_write,
+    ) as executor:
+        futures = {
+            executor.submit(
+                process_access_log_file_in_worker,
+                args,
+                access_log,
+                sites[access_log],
+                logging.getLogger().getEffectiveLevel(),
+            ): access_log
+            for access_log in access_logs
+        }
+        results = {}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except (Exception, SystemExit) as e:
+                results[futures[future]] = e
+
+    failed = 0
+    for access_log in access_logs:
+        result = results[access_log]
+        if isinstance(result, BaseException):
+            failed += 1
+            wrn(f"{access_log}: failed: {result!r}")
+            continue
+        uri_count, redirect_count, elapsed = result
+        print(
+            f"{access_log}: {uri_count} request URIs, {redirect_count} redirects "
+            + f"in {elapsed:.1f} s"
+        )
+    if failed:
+        errxit(1, f"Processing {failed} of {len(access_logs)} access log files failed")
+
+
+def enable_copy_on_write():
+    # Stages of the pipeline derive new dataframes from their input without modifying
+    # it, so that columns they do not change are shared rather than copied
+    if not ALWAYS_COPY_ON_WRITE:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def main():
+    enable_copy_on_write()
+
+    args = parse_arguments()
+    if args["incremental"]:
+        return main_incremental(args)
+    if args["merge"]:
+        return main_merged(args)
+
+    for access_log in args["access_log_files"]:
+        if not access_log.exists():
+            errxit(1, f"Input file / directory {access_log} does not exist")
+
+    if args["parallel_files"] != 1 and len(args["access_log_files"]) > 1:
+        return main_parallel_files(args)
+
+    # Iterate over all access log file as the source of request URIs
+    for index, access_log in enumerate(args["access_log_files"]):
+        if index:
+            vrb("")
+        process_access_log_file(args, access_log)
 
 
 if __name__ == "__main__":
@@ -1,81 +1,610 @@
-import re
+import bz2
+import gzip
+import io
+import lzma
+import multiprocessing
+import os
+import queue
 import csv
-from collections import defaultdict
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 
 from constants import (
     COLUMNS_ACCESS_LOG,
+    COLUMNS_REQUEST_COUNTS,
+    LOG_FORMAT_COMBINED,
+    REQUEST_TIMESTAMP,
 )
+from lib import convert_access_log_types
+from log_format import LogFormat
 
-# Regular expression to match all relevant fields in log entries
-log_pattern = re.compile(
-    r'(\d+\.\d+\.\d+\.\d+) - (\S+) \[(.*?)\] "(GET|POST|PUT|DELETE|HEAD) (\S+) HTTP/\d\.\d" (\d{3}) (\d+) "(.*?)" "(.*?)"'
-)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Format of the access logs unless another is given
+combined_log_format = LogFormat(LOG_FORMAT_COMBINED)
+
+# Files smaller than this are not worth splitting into chunks for parallel parsing
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Size of the batches of decompressed lines handed from the reader thread to the parser
+READ_AHEAD_BATCH_SIZE = 1024 * 1024
+# Maximum number of batches of lines decompressed ahead of the parser
+READ_AHEAD_BATCHES = 8
+
+# Positions of the fields in the tuples yielded by `iter_log_entries`
+LOG_ENTRY_REMOTE_ADDR = 0
+LOG_ENTRY_TIME_LOCAL = 2
+LOG_ENTRY_PATH = 4
 
+# Positions of the fields in the lists the log state holds for each request URI:
+# the most recent entry, the set of distinct remote addresses, the number of requests
+# and the times of the first and the most recent request in seconds since the epoch
+URI_STATE_ENTRY = 0
+URI_STATE_REMOTE_ADDRS = 1
+URI_STATE_HITS = 2
+URI_STATE_FIRST_SEEN = 3
+URI_STATE_LAST_SEEN = 4
 
-def process_log_file(file_path):
-    log_entry = defaultdict(
-        lambda: {
-            "remote_addr": None,
-            "remote_user": None,
-            "datetime": None,
-            "method": None,
-            "path": None,
-            "status_code": None,
-            "body_bytes_sent": None,
-            "http_referer": None,
-            "http_user_agent": None,
-        }
+# Months as abbreviated in $time_local, which does not depend on the locale
+MONTHS = {
+    month: number
+    for number, month in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), 1
     )
+}
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
-    with open(file_path, "r", encoding="utf-8") as file:
+# Length of the fixed layout of $time_local, e.g., `18/Feb/2011:10:00:00 +0100`
+TIME_LOCAL_LENGTH = 26
+
+# Seconds since the epoch of the beginning of days in the format of $time_local,
+# e.g., `18/Feb/2011 +0100`, of UTC offsets, e.g., `+0100`, and of the most recently
+# parsed timestamps, as consecutive lines are often logged within the same second
+start_of_days = {}
+utc_offsets = {}
+time_local_cache = {}
+MAX_CACHED_TIMESTAMPS = 100_000
+
+# Maximum number of rejected paths whose rejecting rule is kept, as scanners request
+# many distinct paths that would otherwise each take up an entry
+MAX_CACHED_REJECTED_PATHS = 100_000
+
+
+def iter_log_entries(lines, log_format=None):
+    # Parse log lines one at a time and yield the fields of each matching line
+    # as a tuple in the order of the columns of the log format, which start with
+    # COLUMNS_ACCESS_LOG, without keeping any state
+    return (log_format or combined_log_format).iter_entries(lines)
+
+
+def start_of_day_seconds(time_local):
+    # Seconds since the epoch of the beginning of the day of a timestamp in the format
+    # of $time_local in its time zone, or `None` if the day or offset is not valid
+    # The fields are taken from their fixed positions rather than parsed with
+    # `strptime`, with the month looked up and each UTC offset converted only once
+    if time_local[2:7:4] != "//" or time_local[20] != " ":
+        return None
+    try:
+        day = date(int(time_local[7:11]), MONTHS[time_local[3:6]], int(time_local[:2]))
+    except (KeyError, ValueError):
+        return None
+    offset = time_local[21:]
+    utc_offset = utc_offsets.get(offset)
+    if utc_offset is None:
+        if offset[0] not in "+-" or not offset[1:].isdigit():
+            return None
+        utc_offset = int(offset[1:3]) * 3600 + int(offset[3:]) * 60
+        utc_offsets[offset] = utc_offset if offset[0] == "+" else -utc_offset
+    return (day.toordinal() - EPOCH_ORDINAL) * 86400 - utc_offsets[offset]
+
+
+def time_local_seconds(time_local):
+    # Seconds since the epoch of a timestamp in the format of $time_local, e.g.,
+    # `18/Feb/2011:10:00:00 +0100`, or `None` if it is not in that format
+    # Only the beginning of each day is converted as a date and only once
+    seconds = time_local_cache.get(time_local)
+    if seconds is not None:
+        return seconds
+
+    # The separators of the day have been checked when converting it
+    if len(time_local) != TIME_LOCAL_LENGTH or time_local[11:18:3] != ":::":
+        return None
+    day = time_local[:11] + time_local[20:]
+    start_of_day = start_of_days.get(day)
+    if start_of_day is None:
+        start_of_day = start_of_day_seconds(time_local)
+        if start_of_day is None:
+            return None
+        start_of_days[day] = start_of_day
+    try:
+        seconds = (
+            start_of_day
+            + int(time_local[12:14]) * 3600
+            + int(time_local[15:17]) * 60
+            + int(time_local[18:20])
+        )
+    except ValueError:
+        return None
+
+    if len(time_local_cache) >= MAX_CACHED_TIMESTAMPS:
+        time_local_cache.clear()
+    time_local_cache[time_local] = seconds
+    return seconds
+
+
+class UriFilter:
+    """
+    Early-reject stage for log entries whose request URI is rejected by the filter
+    rules, so that no state is kept for them, counting the rejected lines per rule.
+    The rules rejecting the most recent distinct URIs are kept, so that repeatedly
+    requested URIs are matched only once.
+    """
+
+    def __init__(self, filter_pattern):
+        """
+        :param filter_pattern: Pattern as returned by `rules.compile_filter_rules`
+        """
+        self.filter_pattern = filter_pattern
+        self.rejected_lines = Counter()
+        self.rejecting_rules = {}
+
+    def rejects(self, path):
+        rule = self.rejecting_rules.get(path)
+        if rule is None:
+            match = self.filter_pattern.match(path)
+            if not match:
+                return False
+            rule = match.lastgroup
+            if len(self.rejecting_rules) >= MAX_CACHED_REJECTED_PATHS:
+                self.rejecting_rules.clear()
+            self.rejecting_rules[path] = rule
+        self.rejected_lines[rule] += 1
+        return True
+
+
+def aggregate_log_entries(
+    entries, log_state=None, uri_filter=None, remote_addrs_factory=None
+):
+    # Aggregate log entries incrementally by request URI: for each URI, only the
+    # most recent entry, the set of distinct remote addresses, the number of requests
+    # and the times of the first and the most recent request are kept, so memory
+    # grows with the number of distinct URIs and not with the log size
+    # The most recent entry is that with the latest time rather than the last line,
+    # as lines are not strictly ordered by time, e.g., across log files, and of
+    # entries with the same time the last one is kept
+    # Lines whose time is not in the format of $time_local are skipped
+    # URIs already in the log state have been accepted, so only new ones are filtered
+    # Distinct remote addresses are collected in sets unless `remote_addrs_factory`
+    # creates another collection with `add`, `|=` and `len`, e.g., a HyperLogLog sketch
+    # Addresses added to sets are taken from a pool, so that the sets of all URIs share
+    # them rather than each holding a string per address, which unlike `sys.intern`
+    # does not keep them alive once the log state has been released
+    # Sketches hold hashes rather than addresses, so nothing is pooled for them
+    if log_state is None:
+        log_state = {}
+    new_remote_addrs = remote_addrs_factory or set
+    remote_addr_pool = {} if remote_addrs_factory is None else None
+
+    for entry in entries:
+        path = entry[LOG_ENTRY_PATH]
+        uri_state = log_state.get(path)
+        if uri_state is None and uri_filter is not None and uri_filter.rejects(path):
+            continue
+        seconds = time_local_seconds(entry[LOG_ENTRY_TIME_LOCAL])
+        if seconds is None:
+            continue
+        remote_addr = entry[LOG_ENTRY_REMOTE_ADDR]
+        if uri_state is None:
+            remote_addrs = new_remote_addrs()
+            if remote_addr_pool is not None:
+                remote_addr = remote_addr_pool.setdefault(remote_addr, remote_addr)
+            remote_addrs.add(remote_addr)
+            log_state[path] = [entry, remote_addrs, 1, seconds, seconds]
+            continue
+        remote_addrs = uri_state[URI_STATE_REMOTE_ADDRS]
+        if remote_addr_pool is None:
+            remote_addrs.add(remote_addr)
+        elif remote_addr not in remote_addrs:
+            remote_addrs.add(remote_addr_pool.setdefault(remote_addr, remote_addr))
+        uri_state[URI_STATE_HITS] += 1
+        if seconds >= uri_state[URI_STATE_LAST_SEEN]:
+            uri_state[URI_STATE_ENTRY] = entry
+            uri_state[URI_STATE_LAST_SEEN] = seconds
+        elif seconds < uri_state[URI_STATE_FIRST_SEEN]:
+            uri_state[URI_STATE_FIRST_SEEN] = seconds
+
+    return log_state
+
+
+def iter_log_rows(log_state):
+    # Yield one row per request URI with the fields of its entry followed by the
+    # columns of COLUMNS_REQUEST_COUNTS, i.e., in the order of
+    # COLUMNS_ACCESS_LOG_AGGREGATED for the combined log format
+    # The access count is the number of requests and the time of the first request
+    # is given in seconds since the epoch
+    for entry, remote_addrs, hits, first_seen, _ in log_state.values():
+        yield (*entry, hits, len(remote_addrs), first_seen)
+
+
+def merge_log_states(log_states):
+    # Merge log states aggregated from parts of log files, keeping the most recent
+    # entry of each URI as in `aggregate_log_entries`, i.e., that of the later part
+    # if their times are the same
+    merged_log_state = {}
+    for log_state in log_states:
+        for path, part_uri_state in log_state.items():
+            uri_state = merged_log_state.get(path)
+            if uri_state is None:
+                merged_log_state[path] = list(part_uri_state)
+                continue
+            entry, remote_addrs, hits, first_seen, last_seen = part_uri_state
+            uri_state[URI_STATE_REMOTE_ADDRS] |= remote_addrs
+            uri_state[URI_STATE_HITS] += hits
+            if last_seen >= uri_state[URI_STATE_LAST_SEEN]:
+                uri_state[URI_STATE_ENTRY] = entry
+                uri_state[URI_STATE_LAST_SEEN] = last_seen
+            if first_seen < uri_state[URI_STATE_FIRST_SEEN]:
+                uri_state[URI_STATE_FIRST_SEEN] = first_seen
+    return merged_log_state
+
+
+def split_log_file(file_path, chunk_count, start=0, end=None):
+    # Split the byte range from `start` up to `end` of the file into at most
+    # `chunk_count` byte ranges `(start, end)` that begin at the beginning of a line
+    if end is None:
+        end = os.path.getsize(file_path)
+    chunk_size = max((end - start) // max(chunk_count, 1), 1)
+
+    offsets = [start]
+    with open(file_path, "rb") as file:
+        for position in range(start + chunk_size, end, chunk_size):
+            if position <= offsets[-1]:
+                continue
+            # Move the boundary to the beginning of the next line
+            file.seek(position)
+            file.readline()
+            offset = file.tell()
+            if offset >= end:
+                break
+            offsets.append(offset)
+    offsets.append(end)
+
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def iter_log_file_lines(file_path, start, end):
+    # Yield the lines in the byte range from `start` up to `end` of the file
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        position = start
         for line in file:
-            match = log_pattern.search(line)
-            if match:
-                (
-                    remote_addr,
-                    remote_user,
-                    datetime,
-                    method,
-                    path,
-                    status_code,
-                    body_bytes_sent,
-                    http_referer,
-                    http_user_agent,
-                ) = match.groups()
-                key = (remote_addr, path)
-                log_entry[key].update(
-                    {
-                        "remote_addr": remote_addr,
-                        "remote_user": remote_user,
-                        "datetime": datetime,
-                        "method": method,
-                        "path": path,
-                        "status_code": status_code,
-                        "body_bytes_sent": body_bytes_sent,
-                        "http_referer": http_referer,
-                        "http_user_agent": http_user_agent,
-                    }
-                )
-
-    return log_entry
-
-
-def write_to_csv(data, output_file):
+            if position >= end:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def process_log_file_chunk(
+    file_path,
+    start,
+    end,
+    uri_filter=None,
+    log_format=None,
+    remote_addrs_factory=None,
+):
+    return aggregate_log_entries(
+        iter_log_entries(iter_log_file_lines(file_path, start, end), log_format),
+        uri_filter=uri_filter,
+        remote_addrs_factory=remote_addrs_factory,
+    )
+
+
+def process_log_file_chunk_in_worker(
+    file_path,
+    start,
+    end,
+    filter_pattern=None,
+    log_format=None,
+    remote_addrs_factory=None,
+):
+    # Parse a chunk in a worker process, which returns the lines rejected per rule
+    # along with the log state as it cannot update the filter of the parent process
+    # Without `end`, the whole file is parsed, which may be compressed
+    uri_filter = UriFilter(filter_pattern) if filter_pattern else None
+    if end is None:
+        log_state = process_log_file(
+            file_path, 1, uri_filter, log_format, remote_addrs_factory
+        )
+    else:
+        log_state = process_log_file_chunk(
+            file_path, start, end, uri_filter, log_format, remote_addrs_factory
+        )
+    return log_state, uri_filter.rejected_lines if uri_filter else Counter()
+
+
+def open_zstd(file_path, mode="rt", encoding=None):
+    if zstandard is None:
+        raise ImportError(
+            f"Reading {file_path} requires the package 'zstandard': pip install zstandard"
+        )
+    reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"))
+    if "b" in mode:
+        return io.BufferedReader(reader)
+    return io.TextIOWrapper(reader, encoding=encoding)
+
+
+# Functions to open log files for reading text, by file name suffix
+COMPRESSED_LOG_OPENERS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".zst": open_zstd,
+}
+
+
+def is_compressed(file_path):
+    return Path(file_path).suffix in COMPRESSED_LOG_OPENERS
+
+
+def open_log_file(file_path, binary=False):
+    # Open a plain or compressed log file for reading text or bytes,
+    # decompressing on the fly
+    open_function = COMPRESSED_LOG_OPENERS.get(Path(file_path).suffix, open)
+    if binary:
+        return open_function(file_path, "rb")
+    return open_function(file_path, "rt", encoding="utf-8")
+
+
+def iter_lines_read_ahead(file):
+    # Read and decompress lines in a background thread while the caller parses them
+    # The decompressors release the GIL, so decompression overlaps with parsing
+    batches = queue.Queue(maxsize=READ_AHEAD_BATCHES)
+    stop = threading.Event()
+
+    def read_batches():
+        try:
+            while not stop.is_set():
+                batch = file.readlines(READ_AHEAD_BATCH_SIZE)
+                batches.put(batch)
+                if not batch:
+                    break
+        except Exception as e:
+            batches.put(e)
+
+    reader = threading.Thread(target=read_batches, daemon=True)
+    reader.start()
+    try:
+        while True:
+            batch = batches.get()
+            if isinstance(batch, Exception):
+                raise batch
+            if not batch:
+                break
+            yield from batch
+    finally:
+        # Unblock the reader if the caller stopped consuming lines early
+        stop.set()
+        while reader.is_alive():
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                reader.join(0.01)
+
+
+def process_log_file(
+    file_path, jobs=1, uri_filter=None, log_format=None, remote_addrs_factory=None
+):
+    # Lines whose request URI is rejected by `uri_filter`, if given, are skipped
+    # Lines are parsed according to `log_format`, by default the combined format
+    # Distinct remote addresses are collected by `remote_addrs_factory`, by default in sets
+    if is_compressed(file_path):
+        # Compressed files cannot be split into chunks, but decompression
+        # can still run concurrently with parsing
+        with open_log_file(file_path) as file:
+            return aggregate_log_entries(
+                iter_log_entries(iter_lines_read_ahead(file), log_format),
+                uri_filter=uri_filter,
+                remote_addrs_factory=remote_addrs_factory,
+            )
+
+    if jobs != 1:
+        return process_log_file_range(
+            file_path,
+            0,
+            os.path.getsize(file_path),
+            jobs,
+            uri_filter,
+            log_format,
+            remote_addrs_factory,
+        )
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        return aggregate_log_entries(
+            iter_log_entries(file, log_format),
+            uri_filter=uri_filter,
+            remote_addrs_factory=remote_addrs_factory,
+        )
+
+
+def process_log_file_range(
+    file_path,
+    start,
+    end,
+    jobs=1,
+    uri_filter=None,
+    log_format=None,
+    remote_addrs_factory=None,
+):
+    # Parse the byte range from `start` up to `end` of an uncompressed log file
+    if jobs != 1:
+        jobs = jobs or os.cpu_count()
+        chunk_count = min(jobs * 4, (end - start) // MIN_CHUNK_SIZE)
+        if jobs > 1 and chunk_count > 1:
+            return process_log_file_parallel(
+                file_path,
+                jobs,
+                chunk_count,
+                start,
+                end,
+                uri_filter,
+                log_format,
+                remote_addrs_factory,
+            )
+
+    return process_log_file_chunk(
+        file_path, start, end, uri_filter, log_format, remote_addrs_factory
+    )
+
+
+def process_log_file_parallel(
+    file_path,
+    jobs,
+    chunk_count,
+    start=0,
+    end=None,
+    uri_filter=None,
+    log_format=None,
+    remote_addrs_factory=None,
+):
+    # Parse chunks of the file in a pool of processes and merge their log states
+    # Using more chunks than processes balances the load across processes
+    # Workers are forked from a server process as forking this process is
+    # unsafe once threads have been started, e.g., by pyarrow
+    chunks = split_log_file(file_path, chunk_count, start, end)
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        results = executor.map(
+            process_log_file_chunk_in_worker,
+            [file_path] * len(chunks),
+            [start for start, _ in chunks],
+            [end for _, end in chunks],
+            [uri_filter.filter_pattern if uri_filter else None] * len(chunks),
+            [log_format] * len(chunks),
+            [remote_addrs_factory] * len(chunks),
+        )
+        log_states = []
+        for log_state, rejected_lines in results:
+            log_states.append(log_state)
+            if uri_filter:
+                uri_filter.rejected_lines.update(rejected_lines)
+        return merge_log_states(log_states)
+
+
+def split_log_files(file_paths, jobs):
+    # Split the files into parts `(file_path, start, end)` to be parsed in a pool of
+    # `jobs` processes: uncompressed files are split into chunks of at least
+    # MIN_CHUNK_SIZE, and compressed files, which cannot be split, are parsed as a
+    # whole with `end` being `None`
+    parts = []
+    for file_path in file_paths:
+        if is_compressed(file_path):
+            parts.append((file_path, 0, None))
+            continue
+        size = os.path.getsize(file_path)
+        chunk_count = max(min(jobs * 4, size // MIN_CHUNK_SIZE), 1)
+        parts.extend(
+            (file_path, start, end)
+            for start, end in split_log_file(file_path, chunk_count, 0, size)
+        )
+    return parts
+
+
+def process_log_files(
+    file_paths, jobs=1, uri_filter=None, log_format=None, remote_addrs_factory=None
+):
+    # Parse several log files into a single log state, as if they were one file
+    # Files are merged in the given order, so the entry of a URI is taken from the
+    # later file if their times are the same, as in `merge_log_states`
+    # Only the log state of one file is held besides the merged one at a time
+    if len(file_paths) == 1:
+        return process_log_file(
+            file_paths[0], jobs, uri_filter, log_format, remote_addrs_factory
+        )
+    if jobs == 1:
+        return merge_log_states(
+            process_log_file(file_path, 1, uri_filter, log_format, remote_addrs_factory)
+            for file_path in file_paths
+        )
+    return process_log_files_parallel(
+        file_paths,
+        jobs or os.cpu_count(),
+        uri_filter,
+        log_format,
+        remote_addrs_factory,
+    )
+
+
+def process_log_files_parallel(
+    file_paths, jobs, uri_filter=None, log_format=None, remote_addrs_factory=None
+):
+    # Parse the files, or chunks of them, concurrently in a pool of processes and
+    # merge their log states in the order of the files as they become available
+    parts = split_log_files(file_paths, jobs)
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        results = executor.map(
+            process_log_file_chunk_in_worker,
+            [file_path for file_path, _, _ in parts],
+            [start for _, start, _ in parts],
+            [end for _, _, end in parts],
+            [uri_filter.filter_pattern if uri_filter else None] * len(parts),
+            [log_format] * len(parts),
+            [remote_addrs_factory] * len(parts),
+        )
+
+        def iter_log_states():
+            for log_state, rejected_lines in results:
+                if uri_filter:
+                    uri_filter.rejected_lines.update(rejected_lines)
+                yield log_state
+
+        return merge_log_states(iter_log_states())
+
+
+def write_to_csv(log_state, output_file, columns=COLUMNS_ACCESS_LOG):
+    # Rows are generated while writing and never materialized as a whole
+    # `columns` are those of the entries, i.e., of the log format they were parsed with
     with open(output_file, "w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
-        writer.writerow(COLUMNS_ACCESS_LOG)
-
-        for key, info in data.items():
-            writer.writerow(
-                [
-                    info["remote_addr"],
-                    info["remote_user"],
-                    info["datetime"],
-                    info["method"],
-                    info["path"],
-                    info["status_code"],
-                    info["body_bytes_sent"],
-                    info["http_referer"],
-                    info["http_user_agent"],
-                ]
-            )
+        writer.writerow(columns + COLUMNS_REQUEST_COUNTS)
+        writer.writerows(iter_log_rows(log_state))
+
+
+def log_state_columns(log_state, columns=COLUMNS_ACCESS_LOG):
+    # Transpose the rows into one list per column of the entries and COLUMNS_REQUEST_COUNTS
+    aggregated_columns = columns + COLUMNS_REQUEST_COUNTS
+    rows = list(zip(*iter_log_rows(log_state))) or [[] for _ in aggregated_columns]
+    return dict(zip(aggregated_columns, rows))
+
+
+def access_log_dataframe(log_state, columns=COLUMNS_ACCESS_LOG):
+    # Build the access log DataFrame directly from the columns of the log state,
+    # i.e., the same DataFrame `load_access_log` returns for an intermediate file
+    # The time of the entry of each URI has already been parsed while aggregating,
+    # as it is that of the most recent request, so the timestamps are given in
+    # seconds since the epoch rather than as strings to be parsed again
+    access_log_columns = log_state_columns(log_state, columns)
+    access_log_columns[REQUEST_TIMESTAMP] = np.fromiter(
+        (uri_state[URI_STATE_LAST_SEEN] for uri_state in log_state.values()),
+        dtype=np.int64,
+        count=len(log_state),
+    )
+    df = pd.DataFrame(access_log_columns)
+    return convert_access_log_types(df)
+
+
+def write_to_parquet(df, output_file):
+    # Timestamps and other columns are stored with their types and categorical
+    # columns dictionary-encoded, so loading the file requires no parsing
+    df.to_parquet(output_file, index=False)
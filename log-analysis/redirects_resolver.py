@@ -0,0 +1,166 @@
+import re
+
+import pandas as pd
+
+from constants import HTTP_STATUS_NOT_FOUND, HTTP_STATUS_OK, REQUEST_URI
+from generate_redirects import load_hugo_uris
+from live_validation import MAX_REDIRECTS, REDIRECT_STATUSES, validation_mismatch
+
+# Status of redirects in a `_redirects` file that do not give one
+DEFAULT_REDIRECT_STATUS = 302
+
+# Placeholders in sources, e.g., `:slug`, which match one segment of the path, and
+# the splat `*`, which matches the rest of it
+SOURCE_PLACEHOLDER_PATTERN = re.compile(r"(?<=/):(\w+)|\*")
+SPLAT = "*"
+
+# Placeholders in destinations, e.g., `:slug` or `:splat`, substituted with the part
+# of the path they matched, unless the source does not have them
+DESTINATION_PLACEHOLDER_PATTERN = re.compile(r":(\w+)")
+
+
+def compile_source(source):
+    # Pattern matching the paths a dynamic source matches, with a group named after
+    # each placeholder and one named `splat` for the splat
+    pattern = []
+    position = 0
+    for match in SOURCE_PLACEHOLDER_PATTERN.finditer(source):
+        pattern.append(re.escape(source[position : match.start()]))
+        if match[0] == SPLAT:
+            pattern.append("(?P<splat>.*)")
+        else:
+            pattern.append(f"(?P<{match[1]}>[^/]+)")
+        position = match.end()
+    pattern.append(re.escape(source[position:]))
+    return re.compile("".join(pattern))
+
+
+def is_dynamic(source):
+    return SOURCE_PLACEHOLDER_PATTERN.search(source) is not None
+
+
+def iter_redirects_file(redirects_file):
+    # Yield the source, destination and status of the redirects in a `_redirects`
+    # file, skipping empty lines and comments
+    with open(redirects_file, "r", encoding="utf-8") as file:
+        for line in file:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2:
+                continue
+            status = int(fields[2]) if len(fields) > 2 else DEFAULT_REDIRECT_STATUS
+            yield fields[0], fields[1], status
+
+
+class RedirectsResolver:
+    """
+    Resolver answering the status and location Cloudflare Pages would respond with
+    to a request URI, given the redirects of a `_redirects` file and the URIs of the
+    pages of the site, without deploying it.
+
+    As with Cloudflare, the first redirect whose source matches the path of the URI
+    applies, with placeholders and the splat substituted in its destination. Static
+    redirects are looked up by their path, so only the dynamic redirects preceding
+    the first static match are matched one after another, of which Cloudflare allows
+    at most 100. URIs not redirected are found if they are pages of the site.
+    """
+
+    def __init__(self, redirects, valid_uris=(), target_uri_prefix=""):
+        """
+        :param redirects: Source, destination and status of each redirect in the
+            order of the `_redirects` file
+        :param valid_uris: URIs of the pages of the site, e.g., from Hugo's `_urls`
+        :param target_uri_prefix: Prefix of destinations on the site itself, as given
+            to `write_redirects_file`, which is removed to follow them
+        """
+        # Earliest static redirect of each source, and the dynamic redirects in order,
+        # each with the position of its line
+        self.static_redirects = {}
+        self.dynamic_redirects = []
+        for position, (source, destination, status) in enumerate(redirects):
+            if is_dynamic(source):
+                self.dynamic_redirects.append(
+                    (position, compile_source(source), destination, status)
+                )
+            else:
+                self.static_redirects.setdefault(
+                    source, (position, destination, status)
+                )
+        self.valid_uris = set(valid_uris)
+        self.target_uri_prefix = target_uri_prefix
+
+    @classmethod
+    def from_files(cls, redirects_file, urls_file=None, target_uri_prefix=""):
+        """
+        :param redirects_file: `_redirects` file as written by `write_redirects_file`
+        :param urls_file: Hugo's `_urls` file with the URIs of the pages of the site
+        :param target_uri_prefix: Prefix of destinations on the site itself
+        """
+        valid_uris = load_hugo_uris(urls_file)[REQUEST_URI] if urls_file else ()
+        return cls(iter_redirects_file(redirects_file), valid_uris, target_uri_prefix)
+
+    def resolve(self, uri):
+        """
+        Determine the response to a request URI, whose query string is ignored.
+
+        :param uri: Request URI, e.g., `/blog/2011/02/hello/`
+        :return: Tuple of the status and the location, which is `None` unless the URI
+            is redirected
+        """
+        path = uri.split("?", 1)[0]
+        position, destination, status = self.static_redirects.get(
+            path, (float("inf"), None, None)
+        )
+        for dynamic_redirect in self.dynamic_redirects:
+            if dynamic_redirect[0] > position:
+                break
+            match = dynamic_redirect[1].fullmatch(path)
+            if match:
+                groups = match.groupdict()
+                return dynamic_redirect[3], DESTINATION_PLACEHOLDER_PATTERN.sub(
+                    lambda m: groups.get(m[1], m[0]), dynamic_redirect[2]
+                )
+        if destination is not None:
+            return status, destination
+        if path in self.valid_uris:
+            return HTTP_STATUS_OK, None
+        return HTTP_STATUS_NOT_FOUND, None
+
+    def follow_redirects(self, uri, max_redirects=MAX_REDIRECTS):
+        """
+        Determine the initial status of a request URI and the final status at the end
+        of its chain of redirects.
+
+        :param uri: Request URI
+        :param max_redirects: Maximum number of redirects followed
+        :return: Tuple of the initial and the final status, which is `None` if the
+            chain leaves the site
+        """
+        status_initial, location = self.resolve(uri)
+        status = status_initial
+        for _ in range(max_redirects):
+            if status not in REDIRECT_STATUSES or not location:
+                break
+            if self.target_uri_prefix and location.startswith(self.target_uri_prefix):
+                location = "/" + location[len(self.target_uri_prefix) :].lstrip("/")
+            elif not location.startswith("/"):
+                return status_initial, None
+            status, location = self.resolve(location)
+        return status_initial, status
+
+
+def validate_redirects_offline(resolver, csv_file):
+    """
+    Resolve the URIs of a validation file with a resolver rather than requesting them
+    from a live site and compare their status to the expected REDIRECT_STATUS.
+
+    :param resolver: `RedirectsResolver` of the `_redirects` file to validate
+    :param csv_file: Validation file as written by `generate_validation_data`
+    :return: List of the mismatching rows as returned by `validate_redirects_live`
+    """
+    mismatches = []
+    for row in pd.read_csv(csv_file).to_dict("records"):
+        status_initial, status_final = resolver.follow_redirects(row[REQUEST_URI])
+        mismatch = validation_mismatch(row, status_initial, status_final)
+        if mismatch is not None:
+            mismatches.append(mismatch)
+    return mismatches
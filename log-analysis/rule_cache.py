@@ -0,0 +1,166 @@
+import collections
+import sqlite3
+
+import pandas as pd
+
+from rules import rules_fingerprint
+
+# Increment whenever the tables or the representation of the results change
+# Results persisted with a different version are discarded
+SCHEMA_VERSION = 1
+
+# Maximum number of URIs whose results are kept in memory for each list of rules,
+# of which the least recently used are discarded first
+MAX_CACHED_RESULTS = 100_000
+
+# Results of each list of rules by its name, held as a tuple of the fingerprint of
+# the rules and the results by URI ordered from the least to the most recently used
+cached_results = {}
+
+CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS rule_lists (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    name TEXT,
+    uri TEXT,
+    result TEXT,
+    PRIMARY KEY (name, uri)
+) WITHOUT ROWID;
+"""
+
+
+class RuleCache:
+    """
+    SQLite database persisting the results of lists of rules for each URI, so that
+    the rules need not be applied again to URIs seen in previous runs.
+
+    The results of a list of rules are discarded whenever any of its rules changes,
+    which is recognized by the fingerprint of the rules.
+    """
+
+    def __init__(self, database_file):
+        """
+        :param database_file: Path of the SQLite database file
+        """
+        self.connection = sqlite3.connect(database_file)
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS rule_lists; DROP TABLE IF EXISTS results;"
+            )
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(CREATE_TABLES)
+        self.fingerprints = dict(
+            self.connection.execute("SELECT name, fingerprint FROM rule_lists")
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def lookup(self, name, fingerprint, uris):
+        # Results of the rules for those of the URIs that have been saved, discarding
+        # all results of the rules first if they have changed since
+        if self.fingerprints.get(name) != fingerprint:
+            with self.connection:
+                self.connection.execute("DELETE FROM results WHERE name = ?", (name,))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO rule_lists VALUES (?, ?)",
+                    (name, fingerprint),
+                )
+            self.fingerprints[name] = fingerprint
+            return {}
+
+        # Scanning all results of the rules is several times faster than looking up
+        # each URI, since most URIs of a site recur in every run
+        uris = set(uris)
+        return {
+            uri: result
+            for uri, result in self.connection.execute(
+                "SELECT uri, result FROM results WHERE name = ?", (name,)
+            )
+            if uri in uris
+        }
+
+    def save(self, name, results):
+        # Results are inserted in the order of the primary key, which is faster
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                ((name, uri, results[uri]) for uri in sorted(results)),
+            )
+
+
+def apply_rules_cached(uris, name, rules, apply_rules, rule_cache=None):
+    """
+    Apply a list of rules to each URI of a Series, reusing the results for URIs the
+    rules have been applied to before. Results are kept in memory for the most recently
+    used URIs and, if `rule_cache` is given, across runs.
+
+    :param uris: Series of URIs
+    :param name: Name of the list of rules, under which its results are cached
+    :param rules: Uncompiled list of rules, whose cached results are discarded
+        whenever any of the rules changes
+    :param apply_rules: Function applying the rules to a Series of distinct URIs,
+        which returns a Series of the results with the same index that are missing
+        for URIs none of the rules applies to
+    :param rule_cache: `RuleCache` persisting the results, if any
+    :return: Series of the results
+    """
+    fingerprint = rules_fingerprint(rules)
+    cached_fingerprint, memo = cached_results.get(name, (None, None))
+    if cached_fingerprint != fingerprint:
+        memo = collections.OrderedDict()
+        cached_results[name] = (fingerprint, memo)
+
+    results = {}
+    if memo:
+        uncached_uris = []
+        for uri in uris.unique():
+            if uri in memo:
+                memo.move_to_end(uri)
+                results[uri] = memo[uri]
+            else:
+                uncached_uris.append(uri)
+    else:
+        uncached_uris = uris.unique().tolist()
+
+    # Only the results of URIs that are strings are persisted
+    new_results = {}
+    if rule_cache is not None and uncached_uris:
+        new_results = rule_cache.lookup(
+            name, fingerprint, [uri for uri in uncached_uris if isinstance(uri, str)]
+        )
+        uncached_uris = [uri for uri in uncached_uris if uri not in new_results]
+    if uncached_uris:
+        applied_results = apply_rules(pd.Series(uncached_uris, dtype=object))
+        applied_results = dict(
+            zip(
+                uncached_uris,
+                applied_results.astype(object).where(applied_results.notnull(), None),
+            )
+        )
+        if rule_cache is not None:
+            rule_cache.save(
+                name,
+                {
+                    uri: result
+                    for uri, result in applied_results.items()
+                    if isinstance(uri, str)
+                },
+            )
+        new_results.update(applied_results)
+
+    memo.update(new_results)
+    while len(memo) > MAX_CACHED_RESULTS:
+        memo.popitem(last=False)
+
+    results.update(new_results)
+    return uris.map(results)
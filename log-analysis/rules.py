@@ -0,0 +1,131 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def compile_rewrite_rules(rules):
+    """
+    Compile a list of rewrite rules once, so they need not be looked up in the
+    cache of the `re` module for every URI.
+
+    :param rules: List of tuples `(pattern, search_pattern, replacement)`: if `pattern`
+        matches at the beginning of a URI, all occurrences of `search_pattern` or,
+        if it is `None`, of `pattern` are replaced by `replacement`
+    :return: List of tuples `(pattern, search_pattern, replacement)` with compiled patterns
+    """
+    return [
+        (
+            re.compile(pattern),
+            re.compile(search_pattern) if search_pattern else None,
+            replacement,
+        )
+        for pattern, search_pattern, replacement in rules
+    ]
+
+
+def rewrite_uri(uri, compiled_rules):
+    # Apply all rules in sequence, each to the result of the previous one
+    for pattern, search_pattern, replacement in compiled_rules:
+        match = pattern.match(uri)
+        if not match:
+            continue
+        if search_pattern:
+            uri = search_pattern.sub(replacement, uri)
+        elif match.end() == len(uri):
+            # The match starts at the beginning and extends to the end of the URI,
+            # so it is the only one and `re.sub` would expand it just the same
+            uri = match.expand(replacement)
+        else:
+            uri = pattern.sub(replacement, uri)
+    return uri
+
+
+def rewrite_uris(uris, compiled_rules):
+    # Rewrite each distinct URI of the Series only once
+    rewritten_uris = {uri: rewrite_uri(uri, compiled_rules) for uri in uris.unique()}
+    return uris.map(rewritten_uris)
+
+
+def compile_first_match_rules(rules):
+    """
+    Compile a list of rules of which only the first matching one is applied.
+
+    :param rules: List of tuples `(search_pattern, replacement)`: if `search_pattern`
+        matches at the beginning of a URI, all its occurrences are replaced by `replacement`
+    :return: List of tuples `(search_pattern, replacement)` with compiled patterns
+    """
+    return [(re.compile(pattern), replacement) for pattern, replacement in rules]
+
+
+def rewrite_uris_first_match(uris, compiled_rules):
+    """
+    Rewrite each URI of a Series with the first rule that matches it. Each rule is
+    evaluated by pandas string methods over the URIs no previous rule has matched.
+
+    :param uris: Series of URIs
+    :param compiled_rules: Rules as returned by `compile_first_match_rules`
+    :return: Tuple of the Series of rewritten URIs, where URIs no rule matches are
+        unchanged, and the boolean Series indicating which URIs a rule matched
+    """
+    rewritten_uris = uris.copy()
+    unmatched = np.ones(len(uris), dtype=bool)
+    for search_pattern, replacement in compiled_rules:
+        candidates = uris[unmatched]
+        matched = candidates.str.match(search_pattern, na=False).to_numpy()
+        if not matched.any():
+            continue
+        positions = np.flatnonzero(unmatched)[matched]
+        rewritten_uris.iloc[positions] = (
+            candidates[matched]
+            .str.replace(search_pattern, replacement, regex=True)
+            .to_numpy()
+        )
+        unmatched[positions] = False
+    return rewritten_uris, pd.Series(~unmatched, index=uris.index)
+
+
+def compile_filter_rules(rules):
+    """
+    Compile a list of filter rules into a single pattern, so that each URI is matched
+    only once against all of them. Each rule becomes a named alternative, consisting
+    of lookaheads only, that matches at the beginning of a URI if the rule rejects it.
+    Alternatives are tried in order, so the name of the matching group is that of the
+    first rule rejecting the URI.
+
+    :param rules: List of tuples `(name, ignore_pattern, keep_pattern)`: a URI is rejected
+        by rule `name` if `ignore_pattern` occurs in it unless `keep_pattern`, if it is
+        not `None`, occurs in it as well. Patterns are case-insensitive and must not
+        contain capturing groups
+    :return: Compiled pattern
+    """
+    alternatives = []
+    for name, ignore_pattern, keep_pattern in rules:
+        keep_lookahead = f"(?!.*?(?:{keep_pattern}))" if keep_pattern else ""
+        alternatives.append(f"(?P<{name}>{keep_lookahead}(?=.*?(?:{ignore_pattern})))")
+    return re.compile("|".join(alternatives), re.IGNORECASE | re.DOTALL)
+
+
+def rejecting_rules(uris, filter_pattern):
+    """
+    Determine the first filter rule rejecting each URI of a Series.
+
+    :param uris: Series of URIs
+    :param filter_pattern: Pattern as returned by `compile_filter_rules`
+    :return: Categorical Series with the names of the rules as categories, which is
+        missing for URIs no rule rejects, including URIs that are not strings
+    """
+    # Match each distinct URI only once
+    rule_names = {}
+    for uri in uris.unique():
+        match = filter_pattern.match(uri) if isinstance(uri, str) else None
+        rule_names[uri] = match.lastgroup if match else None
+    return uris.map(rule_names).astype(
+        pd.CategoricalDtype(list(filter_pattern.groupindex))
+    )
+
+
+def rules_fingerprint(*rule_lists):
+    # Hash of the uncompiled rules, which changes whenever any of the rules changes
+    return hashlib.sha256(repr(rule_lists).encode("utf-8")).hexdigest()
@@ -3,6 +3,7 @@ import pandas as pd
 
 from constants import (
     HTTP_STATUS_NOT_FOUND,
+    HTTP_STATUS_OK,
     HTTP_STATUS_REDIRECT,
     REDIRECT_STATUS,
     REDIRECT_URI,
@@ -10,16 +11,22 @@ from constants import (
     REQUEST_TIMESTAMP,
     REQUEST_URI,
     REQUEST_URI_CANONICAL,
+    REJECTING_RULE,
     RESPONSE_STATUS,
     REQUEST_REFERER,
     REQUEST_USER_AGENT,
     ACCESS_COUNT,
 )
 from generate_redirects import (
+    aggregate_by_request_uri,
     apply_default_redirects,
     apply_canonicalization,
+    apply_hugo_urls_and_aliases,
     apply_transformation,
+    clean_uris,
+    split_uris,
 )
+from lib import ALWAYS_COPY_ON_WRITE, copy_on_write_option
 
 
 # Define the fixture
@@ -51,6 +58,11 @@ canonicalization_tests = [
         "/articles/2011/02/18/time-machine-volume-uuid/",
         "/articles/time-machine-volume-uuid/",
     ),
+    ("/Page(/articles/_index.md)", "/articles/"),
+    ("/tags/time_machine", "/tags/time-machine/"),
+    ("/articles/index.html", "/articles/"),
+    ("/blog/page/2/", "/blog/"),
+    ("/research/paper.pdf", "/research/paper.pdf"),
 ]
 
 
@@ -117,3 +129,190 @@ def test_default(request_uri_canonical, expected_redirect_uri, df_base):
 
     # Assert the expected output
     assert df_defaulted[REDIRECT_URI].iloc[0] == expected_redirect_uri
+
+
+def test_default_applies_first_matching_rule_to_not_found_only():
+    df = pd.DataFrame(
+        {
+            REQUEST_URI_CANONICAL: [
+                "/articles/2011/time-machine-volume-uuid/",
+                "/articles/style-guide/",
+                "/hints/macosx/",
+                "/about/",
+            ],
+            REDIRECT_URI: ["", "", "/digitization/style/", ""],
+            REDIRECT_STATUS: [
+                HTTP_STATUS_NOT_FOUND,
+                HTTP_STATUS_NOT_FOUND,
+                HTTP_STATUS_REDIRECT,
+                HTTP_STATUS_NOT_FOUND,
+            ],
+        }
+    )
+
+    df_defaulted = apply_default_redirects(df)
+
+    assert list(df_defaulted[REDIRECT_URI]) == [
+        "/technology/time-machine-volume-uuid/",
+        "/digitization/",
+        "/digitization/style/",
+        "",
+    ]
+    assert list(df_defaulted[REDIRECT_STATUS]) == [
+        HTTP_STATUS_REDIRECT,
+        HTTP_STATUS_REDIRECT,
+        HTTP_STATUS_REDIRECT,
+        HTTP_STATUS_NOT_FOUND,
+    ]
+
+
+# Request URI, canonical URI and redirect URI followed by the expected redirect URI
+# and status for each step of the cascade in `apply_hugo_urls_and_aliases`
+hugo_tests = [
+    ("/about/", "/about/", "/about/", None, HTTP_STATUS_OK),
+    ("/about", "/about/", "/about/", "/about/", HTTP_STATUS_REDIRECT),
+    ("/old-post/", "/old-post/", "/old-post/", "/articles/post/", HTTP_STATUS_REDIRECT),
+    ("/research", "/research/", "/about/", "/about/", HTTP_STATUS_REDIRECT),
+    ("/old-post", "/old-post/", "/old-post/", "/articles/post/", HTTP_STATUS_REDIRECT),
+    ("/x", "/x/", "/older-post/", "/articles/post/", HTTP_STATUS_REDIRECT),
+    ("/paper.PDF", "/paper.PDF", "/research/paper.pdf", "/research/paper.pdf", 301),
+    ("/missing", "/missing/", "/missing/", "/missing/", HTTP_STATUS_NOT_FOUND),
+]
+
+
+def test_hugo_urls_and_aliases():
+    df = pd.DataFrame(
+        [test[:3] for test in hugo_tests],
+        columns=[REQUEST_URI, REQUEST_URI_CANONICAL, REDIRECT_URI],
+    )
+    df[REDIRECT_STATUS] = HTTP_STATUS_REDIRECT
+    df_hugo_valid_urls = pd.DataFrame({REQUEST_URI: ["/about/", "/articles/post/"]})
+    df_hugo_alias_redirects = pd.DataFrame(
+        [
+            ("/old-post/", "/articles/post/", "301"),
+            ("/older-post/", "/articles/post/", "301"),
+            ("/old-post/", "/about/", "301"),
+        ],
+        columns=[REQUEST_URI, REDIRECT_URI, REDIRECT_STATUS],
+    )
+
+    df_hugo = apply_hugo_urls_and_aliases(
+        df, df_hugo_valid_urls, df_hugo_alias_redirects
+    )
+
+    # Missing redirect URIs are `None` or `nan` depending on the version of pandas
+    assert [None if pd.isna(uri) else uri for uri in df_hugo[REDIRECT_URI]] == [
+        test[3] for test in hugo_tests
+    ]
+    assert list(df_hugo[REDIRECT_STATUS]) == [test[4] for test in hugo_tests]
+
+    # Without aliases, URIs whose canonical version is not valid are not redirected
+    df_hugo = apply_hugo_urls_and_aliases(df, df_hugo_valid_urls)
+    assert list(df_hugo[REDIRECT_STATUS][2:]) == [HTTP_STATUS_OK] * 6
+
+
+# Request URI and name of the first filter rule rejecting it, if any
+filter_tests = [
+    ("/articles/time-machine/", None),
+    ("/admin/login", "malicious"),
+    ("/wp-login.php", "malicious"),
+    ("/articles/caf%C3%A9/", "encoded"),
+    ("/Page%28/articles/_index.md%29", None),
+    ("/?url=https://example.org/", "http"),
+    ("/index.PHP?id=1", "php"),
+    # Not rejected by rule `php`, but by the next one
+    ("/doku.php?id=start", "file_extension"),
+    ("/favicon.ico", "file_extension"),
+    ("/research/paper.pdf", None),
+]
+
+
+def test_split_uris():
+    df = pd.DataFrame({REQUEST_URI: [request_uri for request_uri, _ in filter_tests]})
+
+    df_keep, df_rejected = split_uris(df)
+
+    assert list(df_keep[REQUEST_URI]) == [
+        request_uri for request_uri, rule in filter_tests if rule is None
+    ]
+    assert df_rejected[REJECTING_RULE].dtype == "category"
+    assert list(df_rejected[REJECTING_RULE]) == [
+        rule for _, rule in filter_tests if rule is not None
+    ]
+
+
+def test_aggregate_by_request_uri_keeps_most_recent_row():
+    df = pd.DataFrame(
+        {
+            REQUEST_URI: ["/b/", "/a/", "/b/", "/a/", "/b/"],
+            REQUEST_TIMESTAMP: pd.to_datetime(
+                ["2024-01-02", "2024-01-01", "2024-01-03", "2024-01-01", "2024-01-01"]
+            ),
+            REQUEST_METHOD: ["GET", "GET", "HEAD", "POST", "GET"],
+            ACCESS_COUNT: [1, 2, 3, 4, 5],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+
+    df_aggregated = aggregate_by_request_uri(df)
+
+    # Sorted by access count; of rows with the same timestamp the first one is kept
+    assert df_aggregated.to_dict("list") == {
+        REQUEST_URI: ["/b/", "/a/"],
+        REQUEST_TIMESTAMP: list(pd.to_datetime(["2024-01-03", "2024-01-01"])),
+        REQUEST_METHOD: ["HEAD", "GET"],
+        ACCESS_COUNT: [9, 6],
+    }
+
+
+@pytest.mark.parametrize(
+    "copy_on_write",
+    [
+        pytest.param(
+            False,
+            marks=pytest.mark.skipif(
+                ALWAYS_COPY_ON_WRITE, reason="pandas always copies on write"
+            ),
+        ),
+        True,
+    ],
+)
+def test_stages_leave_their_input_unchanged(copy_on_write):
+    df = pd.DataFrame(
+        {
+            REQUEST_URI: [
+                "/articles/2011/02/18/time-machine-volume-uuid?page=2",
+                "/tags/time_machine",
+                "/index.php",
+                "/articles/missing/",
+            ],
+            REQUEST_TIMESTAMP: pd.to_datetime(
+                ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+            ),
+            REQUEST_METHOD: ["GET"] * 4,
+            RESPONSE_STATUS: [HTTP_STATUS_NOT_FOUND] * 4,
+            REQUEST_REFERER: ["-"] * 4,
+            REQUEST_USER_AGENT: ["Mozilla/5.0"] * 4,
+            ACCESS_COUNT: [1, 2, 3, 4],
+        }
+    )
+
+    stages = [
+        lambda df: split_uris(df)[0],
+        clean_uris,
+        aggregate_by_request_uri,
+        apply_canonicalization,
+        apply_transformation,
+        apply_default_redirects,
+    ]
+    with copy_on_write_option(copy_on_write):
+        # Each stage derives its result from the one of the previous stage, all of
+        # which need to remain as they were when returned
+        results = [df]
+        expected_results = [df.copy(deep=True)]
+        for stage in stages:
+            results.append(stage(results[-1]))
+            expected_results.append(results[-1].copy(deep=True))
+
+        for result, expected_result in zip(results, expected_results):
+            pd.testing.assert_frame_equal(result, expected_result)
@@ -0,0 +1,54 @@
+import pickle
+
+import pytest
+
+from hyperloglog import HyperLogLog, precision_for_error
+
+
+def remote_addrs(start, stop):
+    return [f"10.{i >> 16}.{i >> 8 & 255}.{i & 255}" for i in range(start, stop)]
+
+
+def test_few_distinct_values_are_counted_exactly():
+    sketch = HyperLogLog(12)
+    sketch.update(remote_addrs(0, 100) * 3)
+    assert len(sketch) == 100
+    assert sketch.registers is None
+
+
+@pytest.mark.parametrize("count", [1_000, 20_000, 200_000])
+def test_estimate_is_within_error(count):
+    error = 0.02
+    sketch = HyperLogLog(precision_for_error(error))
+    sketch.update(remote_addrs(0, count))
+    assert sketch.registers is not None
+    assert abs(len(sketch) - count) <= 3 * error * count
+
+
+def test_merged_sketch_estimates_union():
+    sketches = []
+    for start, stop in [(0, 5_000), (2_500, 30_000), (29_990, 30_000)]:
+        sketch = HyperLogLog(12)
+        sketch.update(remote_addrs(start, stop))
+        sketches.append(sketch)
+    union = HyperLogLog(12)
+    union.update(remote_addrs(0, 30_000))
+
+    merged = HyperLogLog(12)
+    for sketch in sketches:
+        merged |= sketch
+    assert merged == union
+
+
+@pytest.mark.parametrize("count", [10, 10_000])
+def test_sketch_can_be_serialized(count):
+    sketch = HyperLogLog(10)
+    sketch.update(remote_addrs(0, count))
+    assert HyperLogLog.from_bytes(sketch.to_bytes()) == sketch
+    assert pickle.loads(pickle.dumps(sketch)) == sketch
+
+
+@pytest.mark.parametrize("error", [0, 1, -0.1])
+def test_invalid_error_is_rejected(error):
+    with pytest.raises(ValueError):
+        precision_for_error(error)
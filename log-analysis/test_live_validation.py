@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from constants import (
+    REDIRECT_STATUS,
+    REDIRECT_URI,
+    REQUEST_URI,
+    REQUEST_URI_CANONICAL,
+    VALIDATION_STATUS_FINAL,
+    VALIDATION_STATUS_INITIAL,
+)
+from live_validation import HostRateLimiter, validate_redirects_live
+
+# Responses of the stand-in site by path: status and `Location`
+SITE = {
+    "/old/": (301, "/new/"),
+    "/older/": (301, "/old/"),
+    "/new/": (200, None),
+    "/moved/": (302, "/new/"),
+    "/loop/": (301, "/loop/"),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requested_paths = Counter()
+
+    def do_GET(self):
+        self.requested_paths[self.path] += 1
+        status, location = SITE.get(self.path, (404, None))
+        body = b"stand-in"
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    pytest.importorskip("aiohttp")
+    StandInHandler.requested_paths = Counter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def validation_file(tmp_path):
+    validation_file = tmp_path / "redirects_validation.csv"
+    pd.DataFrame(
+        [
+            ("/old/", "/old/", "/new/", 301),
+            ("/older/", "/older/", "/new/", 301),
+            ("/new/", "/new/", "/new/", 200),
+            ("/moved/", "/moved/", "/new/", 301),
+            ("/missing/", "/missing/", "/new/", 301),
+        ],
+        columns=[REQUEST_URI, REQUEST_URI_CANONICAL, REDIRECT_URI, REDIRECT_STATUS],
+    ).to_csv(validation_file, index=False)
+    return validation_file
+
+
+def test_validate_redirects_live_reports_mismatches(base_url, validation_file):
+    mismatches = validate_redirects_live(base_url, validation_file, concurrency=2)
+
+    assert sorted(
+        (m[REQUEST_URI], m[VALIDATION_STATUS_INITIAL], m[VALIDATION_STATUS_FINAL])
+        for m in mismatches
+    ) == [("/missing/", 404, 404), ("/moved/", 302, 200)]
+
+
+def test_validate_redirects_live_follows_the_first_response(
+    base_url, validation_file
+):
+    validate_redirects_live(base_url, validation_file)
+
+    # Each URI is requested once, as are the URIs of the chains of redirects
+    assert StandInHandler.requested_paths == {
+        "/old/": 2,
+        "/older/": 1,
+        "/new/": 4,
+        "/moved/": 1,
+        "/missing/": 1,
+    }
+
+
+def test_validate_redirects_live_stops_following_loops(base_url, tmp_path):
+    validation_file = tmp_path / "redirects_validation.csv"
+    pd.DataFrame(
+        [("/loop/", "/loop/", "/loop/", 301)],
+        columns=[REQUEST_URI, REQUEST_URI_CANONICAL, REDIRECT_URI, REDIRECT_STATUS],
+    ).to_csv(validation_file, index=False)
+
+    assert validate_redirects_live(base_url, validation_file) == []
+    assert StandInHandler.requested_paths["/loop/"] == 11
+
+
+def test_host_rate_limiter_spaces_requests_to_each_host():
+    rate_limiter = HostRateLimiter(requests_per_second=20)
+
+    async def wait_all():
+        await asyncio.gather(
+            *(rate_limiter.wait(host) for host in ["a", "a", "a", "b", "b"])
+        )
+
+    start = time.monotonic()
+    asyncio.run(wait_all())
+    elapsed = time.monotonic() - start
+
+    assert 0.09 <= elapsed < 0.5
@@ -0,0 +1,228 @@
+import json
+import pickle
+
+import pytest
+
+import log_format as log_format_module
+from constants import (
+    LOG_FORMAT_COMBINED,
+    REQUEST_HOST,
+    REQUEST_TIME,
+    UPSTREAM_RESPONSE_TIME,
+)
+from log_format import JsonLogFormat, LogFormat, compile_log_format
+from process_access_log import access_log_dataframe, aggregate_log_entries
+
+LOG_FORMAT_TIMED = LOG_FORMAT_COMBINED + " $request_time $upstream_response_time $host"
+
+
+@pytest.mark.parametrize(
+    "line,expected_fields",
+    [
+        (
+            '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET / HTTP/1.1" 200 5 "-" "x"\n',
+            ("192.0.2.1", "GET", "/", "-", "x"),
+        ),
+        (
+            '2001:db8::1 - - [18/Feb/2011:10:00:00 +0100] "OPTIONS / HTTP/1.1" 200 5 "-" "x"\n',
+            ("2001:db8::1", "OPTIONS", "/", "-", "x"),
+        ),
+        (
+            '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "PATCH / HTTP/2.0" 200 5 "-" "x"\n',
+            ("192.0.2.1", "PATCH", "/", "-", "x"),
+        ),
+        # Lines not matched from their beginning or with quotes inside quoted fields
+        (
+            'Feb 18 10:00:00 web nginx: 192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET / HTTP/1.1" 200 5 "-" "x"\n',
+            ("192.0.2.1", "GET", "/", "-", "x"),
+        ),
+        (
+            '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET / HTTP/1.1" 200 5 "a"b" "x"\n',
+            ("192.0.2.1", "GET", "/", 'a"b', "x"),
+        ),
+        (
+            '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET / HTTP/1.1" 200 5 "-" "x "y""\n',
+            ("192.0.2.1", "GET", "/", "-", "x "),
+        ),
+        ('192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "-" 400 0 "-" "-"\n', None),
+    ],
+)
+def test_combined_log_format(line, expected_fields):
+    entries = list(LogFormat(LOG_FORMAT_COMBINED).iter_entries([line]))
+    if expected_fields is None:
+        assert entries == []
+    else:
+        (entry,) = entries
+        assert (entry[0], entry[3], entry[4], entry[7], entry[8]) == expected_fields
+        assert entry[2] == "18/Feb/2011:10:00:00 +0100"
+
+
+def test_extra_variables_are_appended():
+    log_format = LogFormat(LOG_FORMAT_TIMED)
+    lines = [
+        '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET /a HTTP/1.1" 200 5 "-" "x" 0.012 0.010 example.org\n',
+        '192.0.2.1 - - [18/Feb/2011:10:00:01 +0100] "GET /b HTTP/1.1" 200 5 "-" "x" 0.002 - example.org\n',
+        '192.0.2.1 - - [18/Feb/2011:10:00:02 +0100] "GET /c HTTP/1.1" 502 5 "-" "x" 1.500 0.500, 1.000 example.org\n',
+    ]
+
+    df = access_log_dataframe(
+        aggregate_log_entries(log_format.iter_entries(lines)), log_format.columns
+    )
+
+    assert log_format.columns[-3:] == [
+        REQUEST_TIME,
+        UPSTREAM_RESPONSE_TIME,
+        REQUEST_HOST,
+    ]
+    assert list(df[REQUEST_TIME]) == [0.012, 0.002, 1.5]
+    assert df[UPSTREAM_RESPONSE_TIME].iloc[0] == 0.01
+    # Missing times and those of more than one upstream server are missing
+    assert df[UPSTREAM_RESPONSE_TIME].iloc[1:].isna().all()
+    assert list(df[REQUEST_HOST]) == ["example.org"] * 3
+    assert df[REQUEST_HOST].dtype == "category"
+
+
+@pytest.mark.parametrize(
+    "upstream_response_time", ["0.500", "-", "0.500, 1.000", "0.500 : 1.000"]
+)
+def test_times_of_several_upstream_servers_are_one_field(upstream_response_time):
+    log_format = LogFormat(
+        "$host " + LOG_FORMAT_COMBINED + " $upstream_response_time $request_time"
+    )
+    line = (
+        'example.org 192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET /a HTTP/1.1" '
+        + f'502 5 "-" "x" {upstream_response_time} 1.500\n'
+    )
+
+    (entry,) = log_format.iter_entries([line])
+
+    assert entry[-3:] == ("1.500", upstream_response_time, "example.org")
+
+
+def test_missing_variables_are_filled_in():
+    log_format = LogFormat("$time_local|$host|$request_uri|$status")
+    (entry,) = log_format.iter_entries(
+        ["18/Feb/2011:10:00:00 +0100|example.org|/a|404"]
+    )
+    assert entry == (
+        "-",
+        "-",
+        "18/Feb/2011:10:00:00 +0100",
+        "-",
+        "/a",
+        "404",
+        "0",
+        "-",
+        "-",
+        "example.org",
+    )
+
+
+def test_required_variables():
+    with pytest.raises(ValueError):
+        LogFormat('$remote_addr [$time_local] "$http_user_agent"')
+
+
+def test_log_format_can_be_pickled():
+    log_format = pickle.loads(pickle.dumps(LogFormat(LOG_FORMAT_TIMED)))
+    assert log_format.columns == LogFormat(LOG_FORMAT_TIMED).columns
+
+
+json_lines = [
+    json.dumps(
+        {
+            "time_local": "18/Feb/2011:10:00:00 +0100",
+            "remote_addr": "2001:db8::1",
+            "remote_user": "-",
+            "request": "GET /about/ HTTP/1.1",
+            "status": "200",
+            "body_bytes_sent": "512",
+            "http_referer": "-",
+            "http_user_agent": 'Mozilla/5.0 "quoted"',
+            "server_name": "example.org",
+        }
+    )
+    + "\n",
+    # Numbers, missing optional and unknown keys
+    '{"time_local":"18/Feb/2011:10:00:01 +0100","request":"PATCH /a HTTP/2.0",'
+    + '"status":404,"body_bytes_sent":0,"ssl_protocol":"TLSv1.3"}\n',
+    # Lines that are skipped: missing status, invalid request, no JSON object
+    '{"time_local":"18/Feb/2011:10:00:02 +0100","request":"GET /b HTTP/1.1"}\n',
+    '{"time_local":"18/Feb/2011:10:00:03 +0100","request":"-","status":"400"}\n',
+    '{"time_local":"18/Feb/2011:10:00:04 +0100",\n',
+    "[]\n",
+]
+
+
+@pytest.fixture(params=["msgspec", "orjson", "json"])
+def json_decoder_module(request, monkeypatch):
+    # Fall back from msgspec to orjson and to the `json` module as if not installed
+    if request.param != "msgspec":
+        monkeypatch.setattr(log_format_module, "msgspec", None)
+    if request.param == "json":
+        monkeypatch.setattr(log_format_module, "orjson", None)
+    elif getattr(log_format_module, request.param) is None:
+        pytest.skip(f"{request.param} is not installed")
+    return request.param
+
+
+def test_json_log_format(json_decoder_module):
+    log_format = compile_log_format("json")
+    assert isinstance(log_format, JsonLogFormat)
+    assert log_format.columns == LogFormat(LOG_FORMAT_COMBINED).columns
+
+    assert list(log_format.iter_entries(json_lines)) == [
+        (
+            "2001:db8::1",
+            "-",
+            "18/Feb/2011:10:00:00 +0100",
+            "GET",
+            "/about/",
+            "200",
+            "512",
+            "-",
+            'Mozilla/5.0 "quoted"',
+        ),
+        ("-", "-", "18/Feb/2011:10:00:01 +0100", "PATCH", "/a", "404", "0", "-", "-"),
+    ]
+
+
+def test_json_log_format_with_custom_keys(json_decoder_module):
+    log_format = compile_log_format(
+        '{"ts":"$time_local","uri":"$request_uri","method":"$request_method",'
+        + '"code":$status,"rt":$request_time,"vhost":"$host"}'
+    )
+    line = '{"vhost":"example.org","rt":0.012,"code":301,"uri":"/a","method":"GET","ts":"18/Feb/2011:10:00:00 +0100"}'
+    (entry,) = log_format.iter_entries([line])
+    assert log_format.columns[-2:] == [REQUEST_TIME, REQUEST_HOST]
+    assert entry[2:6] == ("18/Feb/2011:10:00:00 +0100", "GET", "/a", "301")
+    assert entry[-2:] == ("0.012", "example.org")
+
+
+def test_json_log_format_with_all_variables(json_decoder_module):
+    log_format = compile_log_format(
+        '{"host":"$host","ua":"$http_user_agent","ref":"$http_referer",'
+        + '"bytes":$body_bytes_sent,"status":$status,"uri":"$request_uri",'
+        + '"method":"$request_method","ts":"$time_local","user":"$remote_user",'
+        + '"addr":"$remote_addr"}'
+    )
+    line = '{"addr":"192.0.2.1","user":"-","ts":"18/Feb/2011:10:00:00 +0100","method":"GET","uri":"/a","status":200,"bytes":5,"ref":"-","ua":"x","host":"example.org"}'
+    assert list(log_format.iter_entries([line, "{}"])) == [
+        (
+            "192.0.2.1",
+            "-",
+            "18/Feb/2011:10:00:00 +0100",
+            "GET",
+            "/a",
+            "200",
+            "5",
+            "-",
+            "x",
+            "example.org",
+        )
+    ]
+
+
+def test_json_log_format_can_be_pickled():
+    log_format = pickle.loads(pickle.dumps(compile_log_format("json")))
+    assert list(log_format.iter_entries(json_lines[:1]))
@@ -0,0 +1,124 @@
+import functools
+import gzip
+
+import pytest
+
+from constants import LOG_FORMAT_COMBINED
+from hyperloglog import HyperLogLog
+from log_format import LogFormat
+from log_state_store import (
+    LogStateStore,
+    log_file_fingerprint,
+    process_log_file_incrementally,
+)
+from process_access_log import aggregate_log_entries, iter_log_entries
+
+log_lines = [
+    f'192.0.2.{i % 7} - - [18/Feb/2011:10:00:{i % 60:02d} +0100] "GET /articles/{i % 5}/ HTTP/1.1" 200 512 "-" "Mozilla/5.0"\n'
+    for i in range(100)
+]
+
+
+def run_incrementally(store_file, access_logs):
+    # Same steps as `main_incremental` for a single site
+    with LogStateStore(store_file) as store:
+        log_state = store.load_log_state()
+        log_files = []
+        for access_log in access_logs:
+            log_state, log_file = process_log_file_incrementally(
+                access_log, log_state, store
+            )
+            if log_file:
+                log_files.append(log_file)
+        store.save(log_state, log_files)
+    return log_state, log_files
+
+
+@pytest.fixture
+def store_file(tmp_path):
+    return tmp_path / "access_log_state.sqlite"
+
+
+def test_only_appended_lines_are_parsed(tmp_path, store_file):
+    access_log = tmp_path / "access.log"
+    # The last line is incomplete as nginx is still writing it
+    access_log.write_text("".join(log_lines[:40]) + log_lines[40][:20])
+    run_incrementally(store_file, [access_log])
+
+    with open(access_log, "a") as file:
+        file.write(log_lines[40][20:] + "".join(log_lines[41:]))
+    log_state, log_files = run_incrementally(store_file, [access_log])
+
+    assert log_files[0]["offset"] == access_log.stat().st_size
+    assert log_state == aggregate_log_entries(iter_log_entries(log_lines))
+
+    # Nothing is parsed if nothing has been appended
+    assert run_incrementally(store_file, [access_log])[1] == []
+
+
+def test_rotated_files_are_recognized(tmp_path, store_file):
+    access_log = tmp_path / "access.log"
+    access_log.write_text("".join(log_lines[:60]))
+    run_incrementally(store_file, [access_log])
+
+    # Rotate and compress the log file after more lines have been appended to it
+    rotated_access_log = tmp_path / "access.log.1.gz"
+    rotated_access_log.write_bytes(gzip.compress("".join(log_lines[:80]).encode()))
+    access_log.write_text("".join(log_lines[80:]))
+    log_state, log_files = run_incrementally(
+        store_file, [rotated_access_log, access_log]
+    )
+
+    assert [log_file["complete"] for log_file in log_files] == [True, False]
+    assert log_state == aggregate_log_entries(iter_log_entries(log_lines))
+
+    # The compressed file is complete and not even decompressed anymore
+    assert run_incrementally(store_file, [rotated_access_log, access_log])[1] == []
+
+
+def test_state_is_discarded_when_parsing_changes(tmp_path, store_file):
+    access_log = tmp_path / "access.log"
+    access_log.write_text("".join(log_lines))
+    run_incrementally(store_file, [access_log])
+
+    with LogStateStore(store_file) as store:
+        assert store.load_log_state()
+    with LogStateStore(store_file, parse_fingerprint="changed") as store:
+        assert store.load_log_state() == {}
+        assert store.get_log_file(log_file_fingerprint(access_log)) is None
+
+
+def test_extra_fields_of_custom_log_formats_are_saved(tmp_path, store_file):
+    log_format = LogFormat(LOG_FORMAT_COMBINED + " $request_time $host")
+    access_log = tmp_path / "access.log"
+    access_log.write_text(
+        "".join(line.rstrip("\n") + " 0.012 example.org\n" for line in log_lines)
+    )
+    with LogStateStore(store_file) as store:
+        log_state, log_file = process_log_file_incrementally(
+            access_log, {}, store, log_format=log_format
+        )
+        store.save(log_state, [log_file])
+
+    with LogStateStore(store_file) as store:
+        loaded_log_state = store.load_log_state()
+    assert loaded_log_state == log_state
+    assert loaded_log_state["/articles/0/"][0][-2:] == ("0.012", "example.org")
+
+
+def test_sketches_of_remote_addrs_are_saved(tmp_path, store_file):
+    access_log = tmp_path / "access.log"
+    access_log.write_text("".join(log_lines))
+    with LogStateStore(store_file) as store:
+        log_state, log_file = process_log_file_incrementally(
+            access_log,
+            {},
+            store,
+            remote_addrs_factory=functools.partial(HyperLogLog, 4),
+        )
+        store.save(log_state, [log_file])
+
+    with LogStateStore(store_file) as store:
+        loaded_log_state = store.load_log_state()
+    assert loaded_log_state == log_state
+    assert isinstance(loaded_log_state["/articles/0/"][1], HyperLogLog)
@@ -0,0 +1,38 @@
+import pytest
+
+from constants import INTERMEDIATE_FORMAT_PARQUET
+from main import assign_sites
+
+
+@pytest.fixture
+def args(monkeypatch):
+    monkeypatch.delenv("HUGO_PROJECT_DIR", raising=False)
+    return {
+        "root_dir": None,
+        "generated_directory_prefix": "to_example.net",
+        "generated_file_prefix": "",
+        "intermediate_format": INTERMEDIATE_FORMAT_PARQUET,
+        "access_log_files": [],
+        "merge": False,
+    }
+
+
+def test_assign_sites_separates_sites_in_one_directory(args, tmp_path):
+    access_logs = [tmp_path / "example.org.log", tmp_path / "example.com.log.1.gz"]
+    other_access_log = tmp_path / "other" / "access.log"
+    args["access_log_files"] = access_logs + [other_access_log]
+
+    sites = assign_sites(args, args["access_log_files"])
+
+    assert sites == {
+        access_logs[0]: "example.org",
+        access_logs[1]: "example.com",
+        other_access_log: None,
+    }
+
+
+def test_assign_sites_rejects_files_of_the_same_site(args, tmp_path):
+    args["access_log_files"] = [tmp_path / "access.log", tmp_path / "access.log.1"]
+
+    with pytest.raises(SystemExit):
+        assign_sites(args, args["access_log_files"])
@@ -0,0 +1,342 @@
+import bz2
+import functools
+import csv
+import gzip
+import lzma
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from constants import (
+    ACCESS_COUNT,
+    ACCESS_LOG_FILE_NAME_PATTERN,
+    COLUMNS_ACCESS_LOG_AGGREGATED,
+    FIRST_REQUEST_TIMESTAMP,
+    REMOTE_ADDR_COUNT,
+    REQUEST_METHOD,
+    REQUEST_TIMESTAMP,
+    REQUEST_URI,
+    REQUEST_USER_AGENT,
+    RESPONSE_STATUS,
+    TIME_LOCAL_FORMAT,
+)
+from hyperloglog import HyperLogLog
+import process_access_log
+from process_access_log import (
+    UriFilter,
+    access_log_dataframe,
+    aggregate_log_entries,
+    iter_log_entries,
+    merge_log_states,
+    process_log_file,
+    process_log_file_parallel,
+    process_log_files,
+    split_log_files,
+    split_log_file,
+    time_local_seconds,
+    write_to_csv,
+    write_to_parquet,
+)
+from generate_redirects import filter_rules, load_access_log
+
+log_lines = [
+    '192.0.2.1 - - [18/Feb/2011:10:00:00 +0100] "GET /about/ HTTP/1.1" 200 512 "-" "Mozilla/5.0"\n',
+    '192.0.2.2 - - [18/Feb/2011:10:00:01 +0100] "GET /about/ HTTP/1.1" 200 512 "-" "curl/8.0"\n',
+    '192.0.2.1 - - [18/Feb/2011:10:00:02 +0100] "HEAD /about/ HTTP/1.1" 304 0 "https://example.org/" "Mozilla/5.0"\n',
+    "not a log line\n",
+    '192.0.2.1 - - [18/Feb/2011:10:00:03 +0100] "GET /research/ HTTP/1.1" 404 128 "-" "Mozilla/5.0"\n',
+]
+
+
+@pytest.fixture
+def log_state():
+    return aggregate_log_entries(iter_log_entries(log_lines))
+
+
+def test_iter_log_entries_skips_unmatched_lines():
+    entries = list(iter_log_entries(log_lines))
+    assert len(entries) == 4
+    assert entries[0][4] == "/about/"
+
+
+@pytest.mark.parametrize(
+    "time_local",
+    [
+        "18/Feb/2011:10:00:00 +0100",
+        "01/Jan/1970:00:00:00 +0000",
+        "29/Feb/2024:23:59:59 -0700",
+        "31/Dec/2023:18:30:15 +0530",
+    ],
+)
+def test_time_local_seconds_matches_strptime(time_local):
+    expected_seconds = datetime.strptime(time_local, TIME_LOCAL_FORMAT).timestamp()
+    assert time_local_seconds(time_local) == expected_seconds
+
+
+@pytest.mark.parametrize(
+    "time_local",
+    [
+        "18/Foo/2011:10:00:00 +0100",
+        "30/Feb/2011:10:00:00 +0100",
+        "18/Feb/2011 10:00:00 +0100",
+        "18/Feb/2011:10:00:00 0100",
+        "18/Feb/2011:10:00:00",
+        "2011-02-18T10:00:00+01:00",
+    ],
+)
+def test_time_local_seconds_rejects_other_formats(time_local):
+    assert time_local_seconds(time_local) is None
+
+
+def test_aggregate_log_entries_keeps_most_recent_entry(log_state):
+    assert list(log_state) == ["/about/", "/research/"]
+    entry, remote_addrs, hits, first_seen, last_seen = log_state["/about/"]
+    assert entry[3] == "HEAD"
+    assert remote_addrs == {"192.0.2.1", "192.0.2.2"}
+    assert hits == 3
+    assert last_seen - first_seen == 2
+
+
+def test_aggregate_log_entries_keeps_latest_entry_of_unordered_lines(log_state):
+    # Lines from a log file of the previous day, e.g., parsed after the current one
+    earlier_lines = [
+        '192.0.2.9 - - [17/Feb/2011:23:59:59 -0500] "POST /about/ HTTP/1.1" 200 64 "-" "curl/8.0"\n',
+        '192.0.2.9 - - [17/Feb/2011:10:00:00 +0100] "PUT /about/ HTTP/1.1" 200 64 "-" "curl/8.0"\n',
+    ]
+    log_state = aggregate_log_entries(iter_log_entries(earlier_lines), log_state)
+    entry, remote_addrs, hits, first_seen, last_seen = log_state["/about/"]
+
+    # 17/Feb/2011:23:59:59 -0500 is 18/Feb/2011:05:59:59 +0100
+    assert entry[3] == "HEAD"
+    assert hits == 5
+    assert len(remote_addrs) == 3
+    assert last_seen - first_seen == 24 * 3600 + 2
+
+
+def test_aggregate_log_entries_shares_remote_addrs_across_uris(log_state):
+    (about_addr,) = log_state["/about/"][1] - {"192.0.2.2"}
+    (research_addr,) = log_state["/research/"][1]
+    assert about_addr is research_addr
+
+
+def test_merge_log_states_adds_up_counts(log_state):
+    more_log_state = aggregate_log_entries(iter_log_entries(log_lines[:2]))
+    merged_log_state = merge_log_states([more_log_state, log_state])
+
+    entry, remote_addrs, hits, first_seen, last_seen = merged_log_state["/about/"]
+    assert entry == log_state["/about/"][0]
+    assert hits == 5
+    assert (first_seen, last_seen) == tuple(log_state["/about/"][3:])
+
+
+def test_aggregate_log_entries_is_incremental(log_state):
+    more_lines = [
+        '192.0.2.3 - - [18/Feb/2011:10:00:04 +0100] "GET /about/ HTTP/1.1" 200 512 "-" "Mozilla/5.0"\n',
+    ]
+    log_state = aggregate_log_entries(iter_log_entries(more_lines), log_state)
+    assert len(log_state["/about/"][1]) == 3
+    assert log_state["/about/"][2] == 4
+
+
+def test_write_to_csv(log_state, tmp_path):
+    output_file = tmp_path / "access_log.csv"
+    write_to_csv(log_state, output_file)
+
+    with open(output_file, newline="") as file:
+        rows = list(csv.DictReader(file))
+
+    assert list(rows[0]) == COLUMNS_ACCESS_LOG_AGGREGATED
+    assert [
+        (row[REQUEST_URI], row[ACCESS_COUNT], row[REMOTE_ADDR_COUNT]) for row in rows
+    ] == [
+        ("/about/", "3", "2"),
+        ("/research/", "1", "1"),
+    ]
+
+
+def test_parquet_and_csv_load_identically(log_state, tmp_path):
+    pytest.importorskip("pyarrow")
+    write_to_parquet(access_log_dataframe(log_state), tmp_path / "access_log.parquet")
+    write_to_csv(log_state, tmp_path / "access_log.csv")
+
+    df_parquet = load_access_log(tmp_path / "access_log.parquet")
+    df_csv = load_access_log(tmp_path / "access_log.csv")
+
+    assert str(df_parquet[REQUEST_TIMESTAMP].dtype) == "datetime64[ns, UTC]"
+    assert df_parquet[REQUEST_METHOD].dtype == "category"
+    assert df_parquet[RESPONSE_STATUS].dtype == "category"
+    assert df_parquet[REQUEST_USER_AGENT].dtype == "category"
+    assert df_parquet[FIRST_REQUEST_TIMESTAMP][0] == pd.Timestamp(
+        "2011-02-18 09:00:00", tz="UTC"
+    )
+    pd.testing.assert_frame_equal(df_parquet, df_csv)
+
+
+def test_access_log_dataframe_matches_loaded_file(log_state, tmp_path):
+    write_to_csv(log_state, tmp_path / "access_log.csv")
+    df = access_log_dataframe(log_state)
+    assert str(df[REQUEST_TIMESTAMP].dtype) == "datetime64[ns, UTC]"
+    assert str(df[FIRST_REQUEST_TIMESTAMP].dtype) == "datetime64[ns, UTC]"
+    pd.testing.assert_frame_equal(df, load_access_log(tmp_path / "access_log.csv"))
+
+
+def test_access_log_dataframe_of_empty_log():
+    df = access_log_dataframe({})
+    assert list(df.columns) == COLUMNS_ACCESS_LOG_AGGREGATED
+    assert df.empty
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    log_file = tmp_path / "access.log"
+    log_file.write_text("".join(log_lines * 50), encoding="utf-8")
+    return log_file
+
+
+@pytest.mark.parametrize("chunk_count", [1, 3, 7, 1000])
+def test_split_log_file_aligns_chunks_on_lines(log_file, chunk_count):
+    chunks = split_log_file(log_file, chunk_count)
+    content = log_file.read_bytes()
+
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == len(content)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        assert content[start - 1 : start] == b"\n"
+
+
+def test_process_log_file_parallel_matches_serial(log_file):
+    log_state = process_log_file(log_file)
+    parallel_log_state = process_log_file_parallel(log_file, jobs=2, chunk_count=5)
+    assert parallel_log_state == log_state
+
+
+def test_process_log_file_estimates_distinct_remote_addrs(log_file):
+    remote_addrs_factory = functools.partial(HyperLogLog, 4)
+    log_state = process_log_file(log_file, remote_addrs_factory=remote_addrs_factory)
+    parallel_log_state = process_log_file_parallel(
+        log_file, jobs=2, chunk_count=5, remote_addrs_factory=remote_addrs_factory
+    )
+
+    assert parallel_log_state == log_state
+    remote_addrs = log_state["/about/"][1]
+    assert isinstance(remote_addrs, HyperLogLog)
+    assert len(remote_addrs) == 2
+
+
+rejected_log_lines = [
+    '192.0.2.9 - - [18/Feb/2011:10:00:04 +0100] "GET /wp-login.php HTTP/1.1" 404 0 "-" "curl/8.0"\n',
+    '192.0.2.9 - - [18/Feb/2011:10:00:05 +0100] "GET /wp-login.php HTTP/1.1" 404 0 "-" "curl/8.0"\n',
+    '192.0.2.9 - - [18/Feb/2011:10:00:06 +0100] "GET /favicon.ico HTTP/1.1" 200 0 "-" "curl/8.0"\n',
+]
+
+
+@pytest.fixture
+def filtered_log_file(tmp_path):
+    log_file = tmp_path / "access.log"
+    log_file.write_text("".join((log_lines + rejected_log_lines) * 50))
+    return log_file
+
+
+def test_process_log_file_rejects_filtered_uris(filtered_log_file):
+    uri_filter = UriFilter(filter_rules)
+
+    log_state = process_log_file(filtered_log_file, uri_filter=uri_filter)
+
+    assert list(log_state) == ["/about/", "/research/"]
+    assert uri_filter.rejected_lines == {"malicious": 100, "file_extension": 50}
+
+
+def test_uri_filter_bounds_rejected_paths(monkeypatch):
+    monkeypatch.setattr(process_access_log, "MAX_CACHED_REJECTED_PATHS", 10)
+    uri_filter = UriFilter(filter_rules)
+
+    for i in range(100):
+        assert uri_filter.rejects(f"/wp-login.php?id={i}")
+    assert not uri_filter.rejects("/about/")
+
+    assert len(uri_filter.rejecting_rules) <= 10
+    assert uri_filter.rejected_lines == {"malicious": 100}
+
+
+def test_process_log_file_parallel_counts_rejected_lines(filtered_log_file):
+    uri_filter = UriFilter(filter_rules)
+    parallel_uri_filter = UriFilter(filter_rules)
+
+    log_state = process_log_file(filtered_log_file, uri_filter=uri_filter)
+    parallel_log_state = process_log_file_parallel(
+        filtered_log_file, jobs=2, chunk_count=5, uri_filter=parallel_uri_filter
+    )
+
+    assert parallel_log_state == log_state
+    assert parallel_uri_filter.rejected_lines == uri_filter.rejected_lines
+
+
+def compress_zstd(data):
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+compress = {
+    ".gz": gzip.compress,
+    ".bz2": bz2.compress,
+    ".xz": lzma.compress,
+    ".zst": compress_zstd,
+}
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zst"])
+def test_process_log_file_reads_compressed_files(log_file, suffix):
+    compressed_log_file = log_file.with_name(log_file.name + ".1" + suffix)
+    compressed_log_file.write_bytes(compress[suffix](log_file.read_bytes()))
+
+    assert process_log_file(compressed_log_file) == process_log_file(log_file)
+
+
+@pytest.fixture
+def log_files(log_file):
+    # The lines of `log_file` split across a plain and a compressed rotated file
+    content = log_file.read_bytes()
+    middle = content.index(b"\n", len(content) // 2) + 1
+    rotated_log_file = log_file.with_name(log_file.name + ".1.gz")
+    rotated_log_file.write_bytes(gzip.compress(content[:middle]))
+    current_log_file = log_file.with_name(log_file.name + ".0")
+    current_log_file.write_bytes(content[middle:])
+    return [rotated_log_file, current_log_file]
+
+
+def test_split_log_files_parses_compressed_files_as_a_whole(log_files):
+    parts = split_log_files(log_files, 2)
+    assert parts[0] == (log_files[0], 0, None)
+    assert [part[0] for part in parts[1:]] == [log_files[1]]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_process_log_files_matches_single_file(log_file, log_files, jobs):
+    uri_filter = UriFilter(filter_rules)
+    merged_uri_filter = UriFilter(filter_rules)
+
+    log_state = process_log_file(log_file, uri_filter=uri_filter)
+    merged_log_state = process_log_files(
+        log_files, jobs=jobs, uri_filter=merged_uri_filter
+    )
+
+    assert merged_log_state == log_state
+    assert merged_uri_filter.rejected_lines == uri_filter.rejected_lines
+
+
+@pytest.mark.parametrize(
+    "file_name,is_access_log",
+    [
+        ("access.log", True),
+        ("access.log.1", True),
+        ("access.log.2.gz", True),
+        ("access.log-20240101.zst", True),
+        ("error.log.3.bz2", True),
+        ("access.log.tar", False),
+        ("access_log.csv", False),
+    ],
+)
+def test_access_log_file_name_pattern(file_name, is_access_log):
+    assert bool(ACCESS_LOG_FILE_NAME_PATTERN.search(file_name)) == is_access_log
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+from constants import (
+    REDIRECT_STATUS,
+    REDIRECT_URI,
+    REQUEST_URI,
+    REQUEST_URI_CANONICAL,
+    VALIDATION_STATUS_FINAL,
+    VALIDATION_STATUS_INITIAL,
+)
+from lib import write_redirects_file
+from redirects_resolver import RedirectsResolver, validate_redirects_offline
+
+REDIRECTS = [
+    ("/blog/:year/:slug/", "/posts/:slug/", 301),
+    ("/old/", "/new/", 301),
+    ("/feed/*", "/index.xml?path=:splat", 301),
+    ("/archive/*", "/", 302),
+    ("/archive/2011/", "/posts/", 301),
+    ("/old/", "/newer/", 302),
+    ("/moved/", "https://example.org/new/", 301),
+    ("/away/", "https://example.com/", 301),
+    ("/loop/", "/loop/", 301),
+]
+
+
+@pytest.fixture
+def resolver():
+    return RedirectsResolver(
+        REDIRECTS, ["/new/", "/posts/hello/"], "https://example.org/"
+    )
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("/blog/2011/hello/", (301, "/posts/hello/")),
+        ("/blog/2011/hello/world/", (404, None)),
+        ("/old/", (301, "/new/")),
+        ("/old/?page=2", (301, "/new/")),
+        ("/feed/atom/", (301, "/index.xml?path=atom/")),
+        ("/archive/2011/", (302, "/")),
+        ("/new/", (200, None)),
+        ("/missing/", (404, None)),
+    ],
+)
+def test_resolve_applies_first_matching_redirect(resolver, uri, expected):
+    assert resolver.resolve(uri) == expected
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("/blog/2011/hello/", (301, 200)),
+        ("/moved/", (301, 200)),
+        ("/away/", (301, None)),
+        ("/loop/", (301, 301)),
+        ("/missing/", (404, 404)),
+    ],
+)
+def test_follow_redirects(resolver, uri, expected):
+    assert resolver.follow_redirects(uri) == expected
+
+
+def test_from_files_reads_written_redirects_file(tmp_path):
+    redirects_file = tmp_path / "_redirects"
+    write_redirects_file(
+        pd.DataFrame(
+            [("/old/", "/new/", 301), ("/older/", "/new/", 302)],
+            columns=[REQUEST_URI, REDIRECT_URI, REDIRECT_STATUS],
+        ),
+        redirects_file,
+        "https://example.org",
+    )
+    urls_file = tmp_path / "_urls"
+    urls_file.write_text("# Pages\n/new/\n")
+
+    resolver = RedirectsResolver.from_files(
+        redirects_file, urls_file, "https://example.org"
+    )
+
+    assert resolver.resolve("/older/") == (302, "https://example.org/new/")
+    assert resolver.follow_redirects("/old/") == (301, 200)
+
+
+def test_validate_redirects_offline_reports_mismatches(resolver, tmp_path):
+    validation_file = tmp_path / "redirects_validation.csv"
+    pd.DataFrame(
+        [
+            ("/old/", "/old/", "/new/", 301),
+            ("/new/", "/new/", "/new/", 200),
+            ("/archive/2011/", "/archive/2011/", "/posts/", 301),
+        ],
+        columns=[REQUEST_URI, REQUEST_URI_CANONICAL, REDIRECT_URI, REDIRECT_STATUS],
+    ).to_csv(validation_file, index=False)
+
+    mismatches = validate_redirects_offline(resolver, validation_file)
+
+    assert [
+        (m[REQUEST_URI], m[VALIDATION_STATUS_INITIAL], m[VALIDATION_STATUS_FINAL])
+        for m in mismatches
+    ] == [("/archive/2011/", 302, 404)]
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+import rule_cache
+from rule_cache import RuleCache, apply_rules_cached
+
+RULES = [(r"^/old/(.*)", r"/new/\1")]
+
+
+@pytest.fixture(autouse=True)
+def cached_results(monkeypatch):
+    monkeypatch.setattr(rule_cache, "cached_results", {})
+    return rule_cache.cached_results
+
+
+@pytest.fixture
+def database_file(tmp_path):
+    return tmp_path / "rule_cache.sqlite"
+
+
+class RecordingRules:
+    # Rewrites URIs starting with `/old/`, recording the URIs it is applied to
+    def __init__(self):
+        self.applied_uris = []
+
+    def __call__(self, uris):
+        self.applied_uris.extend(uris)
+        return uris.str.replace(r"^/old/", "/new/", regex=True).where(
+            uris.str.startswith("/old/")
+        )
+
+
+uris = pd.Series(["/old/a", "/b", "/old/a", "/old/c"], index=[3, 5, 7, 9])
+
+
+def test_results_are_applied_to_distinct_uris_once():
+    apply_rules = RecordingRules()
+
+    results = apply_rules_cached(uris, "test", RULES, apply_rules)
+    assert results.index.equals(uris.index)
+    assert pd.isna(results[5])
+    assert results[[3, 7, 9]].tolist() == ["/new/a", "/new/a", "/new/c"]
+    assert apply_rules.applied_uris == ["/old/a", "/b", "/old/c"]
+
+    # URIs without result are cached as well
+    apply_rules_cached(uris, "test", RULES, apply_rules)
+    assert len(apply_rules.applied_uris) == 3
+
+
+def test_results_are_persisted_until_rules_change(database_file, cached_results):
+    with RuleCache(database_file) as cache:
+        apply_rules_cached(uris, "test", RULES, RecordingRules(), cache)
+
+    # Results are looked up in the database in a new process
+    cached_results.clear()
+    apply_rules = RecordingRules()
+    with RuleCache(database_file) as cache:
+        results = apply_rules_cached(
+            pd.Series(["/old/c", "/b", "/old/d"]), "test", RULES, apply_rules, cache
+        )
+    assert results[0] == "/new/c" and pd.isna(results[1]) and results[2] == "/new/d"
+    assert apply_rules.applied_uris == ["/old/d"]
+
+    cached_results.clear()
+    apply_rules = RecordingRules()
+    with RuleCache(database_file) as cache:
+        apply_rules_cached(uris, "test", RULES + [("^/b", "/")], apply_rules, cache)
+    assert apply_rules.applied_uris == ["/old/a", "/b", "/old/c"]
+
+
+def test_least_recently_used_results_are_discarded(monkeypatch, cached_results):
+    monkeypatch.setattr(rule_cache, "MAX_CACHED_RESULTS", 2)
+    apply_rules_cached(pd.Series(["/a", "/b"]), "test", RULES, RecordingRules())
+    apply_rules_cached(pd.Series(["/a", "/c"]), "test", RULES, RecordingRules())
+
+    assert list(cached_results["test"][1]) == ["/a", "/c"]
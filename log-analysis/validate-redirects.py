@@ -1,68 +1,84 @@
 # %%
-import pandas as pd
-import requests
-from urllib.parse import urljoin
+import argparse
+import os
+from pathlib import Path
+
+import dotenv
 
 from constants import (
-    HTTP_STATUS_OK,
     VALIDATION_FILE_NAME_PREFIX,
-    REQUEST_URI,
-    REQUEST_URI_CANONICAL,
-    REDIRECT_URI,
-    REDIRECT_STATUS,
-    TARGET_BASE_URL,
     VALIDATION_DIR,
-    VALIDATION_STATUS_FINAL,
-    VALIDATION_STATUS_INITIAL,
 )
 from lib import errxit
+from live_validation import DEFAULT_CONCURRENCY, validate_redirects_live
+from redirects_resolver import RedirectsResolver, validate_redirects_offline
 
+parser = argparse.ArgumentParser(
+    description="Validate redirects against the live site by requesting the URIs "
+    + "of the validation files, or offline against a `_redirects` file"
+)
+parser.add_argument(
+    "--redirects-file",
+    type=Path,
+    default=None,
+    help="Resolve the URIs with the redirects of this `_redirects` file as Cloudflare "
+    + "Pages would rather than requesting them from the live site",
+)
+parser.add_argument(
+    "--urls-file",
+    type=Path,
+    default=None,
+    help="Hugo's `_urls` file with the URIs of the pages of the site when validating "
+    + "offline, which are otherwise not found",
+)
+parser.add_argument(
+    "--target-base-url",
+    default=None,
+    help="Base URL of the site to validate (default: TARGET_BASE_URL)",
+)
+parser.add_argument(
+    "--validation-dir",
+    type=Path,
+    default=Path(VALIDATION_DIR),
+    help="Directory of the validation files",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=DEFAULT_CONCURRENCY,
+    help="Maximum number of requests in flight at a time",
+)
+parser.add_argument(
+    "--rate-limit",
+    type=float,
+    default=None,
+    help="Maximum number of requests per second to each host (default: unlimited)",
+)
+args = parser.parse_args()
 
-def validate_redirects(base_url, csv_file):
-    df = pd.read_csv(csv_file)
-
-    mismatches = []
-    for index, row in df.iterrows():
-        try:
-            uri = row[REQUEST_URI]
-            url = urljoin(base_url, uri)
-
-            status_initial_expected = row[REDIRECT_STATUS]
-            response_initial = requests.get(url, allow_redirects=False)
-            status_initial = response_initial.status_code
-
-            response_final = requests.get(url, allow_redirects=True)
-            status_final = response_final.status_code
-
-            if status_final != HTTP_STATUS_OK:
-                print(
-                    f"Redirect {row[REQUEST_URI]} -> {row[REDIRECT_URI]}: initial: expected {status_initial_expected}, got {status_initial} final: {status_final}"
-                )
-
-            if status_initial != status_initial_expected:
-                mismatches.append(
-                    {
-                        REQUEST_URI: row[REQUEST_URI],
-                        REQUEST_URI_CANONICAL: row[REQUEST_URI_CANONICAL],
-                        REDIRECT_URI: row[REDIRECT_URI],
-                        REDIRECT_STATUS: row[REDIRECT_STATUS],
-                        VALIDATION_STATUS_INITIAL: status_initial,
-                        VALIDATION_STATUS_FINAL: status_final,
-                    }
-                )
-        except requests.RequestException as e:
-            print(f"Error checking {row[REQUEST_URI]}: {e}")
-
-    return mismatches
+dotenv.load_dotenv(override=True)
+target_base_url = args.target_base_url or os.getenv("TARGET_BASE_URL", None)
+if not target_base_url and not args.redirects_file:
+    errxit(1, "Please provide the base URL via --target-base-url or TARGET_BASE_URL")
 
+if args.redirects_file:
+    # Destinations on the site itself may be prefixed with its base URL
+    resolver = RedirectsResolver.from_files(
+        args.redirects_file, args.urls_file, target_base_url or ""
+    )
 
 mismatched_redirects = []
-validation_files = list(VALIDATION_DIR.glob(f"{VALIDATION_FILE_NAME_PREFIX}*.csv"))
+validation_files = list(args.validation_dir.glob(f"{VALIDATION_FILE_NAME_PREFIX}*.csv"))
 if not validation_files:
     errxit(1, f"No files found to validate")
 
 for validation_file in validation_files:
-    mismatches = validate_redirects(TARGET_BASE_URL, validation_file)
+    if args.redirects_file:
+        mismatches = validate_redirects_offline(resolver, validation_file)
+    else:
+        mismatches = validate_redirects_live(
+            target_base_url, validation_file, args.concurrency, args.rate_limit
+        )
     mismatched_redirects.extend(mismatches)
 
 # Output the results